@@ -0,0 +1,121 @@
+from datetime import date
+
+GROUP_BY_FIELDS = ['author', 'issue', 'parent', 'date', 'week', 'month']
+AGGREGATED_FIELD_NAMES = ['time_spent', 'original_estimate', 'total_time_spent']
+
+
+def parse_group_by(group_by):
+    """
+    Parses the fields to group the work logs by
+    :param group_by: a comma separated string of fields, e.g. author,parent,week
+    :return: the list of fields
+    """
+    fields = [field.strip() for field in group_by.split(",") if field.strip()]
+    unknown_fields = [field for field in fields if field not in GROUP_BY_FIELDS]
+    if not fields or unknown_fields:
+        raise ValueError("invalid group by fields " + ", ".join(unknown_fields) + ", choose from " +
+                         ", ".join(GROUP_BY_FIELDS))
+    return fields
+
+
+def format_week(started_ordinal):
+    """
+    Formats the ISO week of a date
+    :param started_ordinal: the date as a proleptic Gregorian ordinal
+    :return: the ISO week, format yyyy-Www
+    """
+    iso_year, iso_week, _ = date.fromordinal(started_ordinal).isocalendar()
+    return "%d-W%02d" % (iso_year, iso_week)
+
+
+class KeyPartCache(dict):
+    """A KeyPartCache object computes the part of the group by values derived from one value of a work log once
+    """
+    def __init__(self, key_part_function):
+        """
+        :param key_part_function: the function which computes the tuple of group by values of a value
+        """
+        super().__init__()
+        self.key_part_function = key_part_function
+
+    def __missing__(self, value):
+        key_part = self[value] = self.key_part_function(value)
+        return key_part
+
+
+def create_key_function(issue_index, group_by):
+    """
+    Creates the function which determines the group by values of a work log. The values derived from the issue and the
+    started date are computed once per issue and date. The values are ordered author, issue fields, date fields.
+    :param issue_index: the issues by issue key
+    :param group_by: the list of fields to group by
+    :return: the function and the list of fields in the order of the values it returns
+    """
+    issue_fields = [field for field in group_by if field in ('issue', 'parent')]
+    date_fields = [field for field in group_by if field in ('date', 'week', 'month')]
+    issue_field_functions = {
+        'issue': lambda issue_key: issue_key,
+        'parent': lambda issue_key: issue_index[issue_key].parent_key
+    }
+    date_field_functions = {
+        'date': lambda started_ordinal: date.fromordinal(started_ordinal).strftime('%Y-%m-%d'),
+        'week': format_week,
+        'month': lambda started_ordinal: date.fromordinal(started_ordinal).strftime('%Y-%m')
+    }
+    issue_parts = KeyPartCache(lambda issue_key: tuple(issue_field_functions[field](issue_key)
+                                                       for field in issue_fields))
+    date_parts = KeyPartCache(lambda started_ordinal: tuple(date_field_functions[field](started_ordinal)
+                                                            for field in date_fields))
+
+    if 'author' in group_by:
+        def key_function(work_log):
+            return (work_log.author,) + issue_parts[work_log.issue_key] + date_parts[work_log.started_ordinal]
+        return key_function, ['author'] + issue_fields + date_fields
+
+    def key_function(work_log):
+        return issue_parts[work_log.issue_key] + date_parts[work_log.started_ordinal]
+    return key_function, issue_fields + date_fields
+
+
+def aggregate_work_logs(issue_index, work_logs, group_by):
+    """Aggregate the work logs per group
+
+    The work logs are aggregated in a single pass into a hash table on the group by fields. Per group, the time spent
+    of the work logs is summed and the original estimate and total time spent of the distinct issues of the group are
+    summed.
+
+    :param issue_index: the issues by issue key
+    :param work_logs: an iterable of the work logs to aggregate
+    :param group_by: the list of fields to group by
+    :return: the list of aggregated rows as dictionaries, sorted on the group by fields
+    """
+    key_function, key_fields = create_key_function(issue_index, group_by)
+    time_spent = {}
+    issue_keys = {}
+    for work_log in work_logs:
+        key = key_function(work_log)
+        if key in time_spent:
+            time_spent[key] += work_log.time_spent
+            issue_keys[key].add(work_log.issue_key)
+        else:
+            time_spent[key] = work_log.time_spent
+            issue_keys[key] = {work_log.issue_key}
+
+    # Reorder the values of the groups to the requested order of the fields
+    key_indexes = [key_fields.index(field) for field in group_by]
+    time_spent = {tuple(key[i] for i in key_indexes): value for key, value in time_spent.items()}
+    issue_keys = {tuple(key[i] for i in key_indexes): value for key, value in issue_keys.items()}
+
+    rows = []
+    # None values are sorted before all other values
+    for key in sorted(time_spent, key=lambda group: tuple((value is not None, value or "") for value in group)):
+        issues = [issue_index[issue_key] for issue_key in issue_keys[key]]
+        original_estimates = [issue.original_estimate for issue in issues if issue.original_estimate is not None]
+        total_time_spent = [issue.time_spent for issue in issues if issue.time_spent is not None]
+        row = dict(zip(group_by, key))
+        row[AGGREGATED_FIELD_NAMES[0]] = time_spent[key]
+        row[AGGREGATED_FIELD_NAMES[1]] = sum(original_estimates) if original_estimates else None
+        row[AGGREGATED_FIELD_NAMES[2]] = sum(total_time_spent) if total_time_spent else None
+        rows.append(row)
+
+    return rows
@@ -0,0 +1,147 @@
+import asyncio
+import ssl
+import time
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+from jiraclient import RateLimiter, get_retry_delay, DEFAULT_BACKOFF_FACTOR, DEFAULT_MAX_RETRIES, DEFAULT_POOL_SIZE, \
+    NODE_HEADER, RETRY_STATUS_CODES
+
+
+class AsyncJiraClient:
+    """An AsyncJiraClient object will perform the requests to the Jira API without blocking the event loop
+
+    It behaves like the JiraClient: the connections to the Jira server are kept alive in a pool, throttled requests are
+    retried after the time requested by Jira or otherwise after an exponential backoff with jitter and the responses
+    are requested compressed. A semaphore limits the number of requests which are sent concurrently. The client must be
+    used and closed within one event loop, it requires httpx to be installed.
+    """
+    def __init__(self, jira_url, user_name, api_token, ssl_certificate=None, concurrency=DEFAULT_POOL_SIZE,
+                 pool_size=None, rate_limit=None, max_retries=DEFAULT_MAX_RETRIES,
+                 backoff_factor=DEFAULT_BACKOFF_FACTOR, profiler=None):
+        """
+        :param jira_url: The base Jira URL
+        :param user_name The user name to use for connecting to Jira
+        :param api_token The API token to use for connecting to Jira
+        :param ssl_certificate The location of the SSL certificate, needed in case of self-signed certificates
+        :param concurrency The maximum number of requests to send concurrently
+        :param pool_size The maximum number of connections to keep alive, by default the concurrency
+        :param rate_limit The maximum number of requests per second, None for no limit
+        :param max_retries The maximum number of retries of a throttled request
+        :param backoff_factor The number of seconds to wait before the first retry when Jira does not request a time
+        :param profiler The Profiler to record every request with, None for no profiling
+        """
+        if httpx is None:
+            raise ImportError("the async client requires httpx, install it with: pip install httpx")
+
+        self.jira_url = jira_url
+        self.concurrency = concurrency
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.rate_limiter = RateLimiter(rate_limit)
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.profiler = profiler
+        self.requests = 0
+        self.retries = 0
+        self.throttle_wait = 0.0
+        self.bytes_received = 0
+        self.bytes_decoded = 0
+
+        pool_size = max(pool_size or concurrency, concurrency)
+        self.client = httpx.AsyncClient(
+            auth=httpx.BasicAuth(user_name, api_token),
+            headers={
+                "Accept": "application/json",
+                "Accept-Encoding": "gzip, deflate"
+            },
+            verify=ssl.create_default_context(cafile=ssl_certificate) if ssl_certificate else True,
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size))
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+        return False
+
+    async def get(self, url, params):
+        """Perform the GET request to the Jira server
+
+        :param url: the Jira URL relative to the base Jira URL for invoking the request
+        :param params: the parameters to be added to the Jira URL
+        :return: the complete response as returned from the Jira API
+        """
+        return await self.request("GET", url, params=params)
+
+    async def post(self, url, json_body):
+        """Perform the POST request to the Jira server
+
+        :param url: the Jira URL relative to the base Jira URL for invoking the request
+        :param json_body: the object to send as JSON body of the request
+        :return: the complete response as returned from the Jira API
+        """
+        return await self.request("POST", url, json_body=json_body)
+
+    async def request(self, method, url, params=None, json_body=None):
+        """Perform the request to the Jira server
+
+        :param method: the HTTP method of the request
+        :param url: the Jira URL relative to the base Jira URL for invoking the request
+        :param params: the parameters to be added to the Jira URL
+        :param json_body: the object to send as JSON body of the request
+        :return: the complete response as returned from the Jira API
+        """
+        attempt = 0
+        while True:
+            async with self.semaphore:
+                waited = self.rate_limiter.reserve()
+                if waited > 0:
+                    await asyncio.sleep(waited)
+                start = time.perf_counter()
+                response = await self.client.request(method, self.jira_url + url, params=params, json=json_body)
+            bytes_decoded = len(response.content)
+            # The number of bytes read from the connection, which is less than decoded when the response is compressed
+            bytes_received = response.num_bytes_downloaded
+            retried = response.status_code in RETRY_STATUS_CODES and attempt < self.max_retries
+            if self.profiler:
+                self.profiler.record_request(method, url, response.status_code, start, time.perf_counter() - start,
+                                             bytes_received, retried, response.headers.get(NODE_HEADER))
+
+            self.requests += 1
+            self.throttle_wait += waited
+            self.bytes_received += bytes_received
+            self.bytes_decoded += bytes_decoded
+            if not retried:
+                break
+
+            self.retries += 1
+            self.rate_limiter.pause(get_retry_delay(response, attempt, self.backoff_factor))
+            attempt += 1
+
+        response.raise_for_status()
+        return response
+
+    def request_statistics(self):
+        """
+        Counts the requests which have been sent to the Jira server
+        :return: a dictionary containing the number of requests, retries, the seconds waited because of throttling and
+        the number of bytes received and decoded
+        """
+        return {'requests': self.requests, 'retries': self.retries, 'throttle_wait': self.throttle_wait,
+                'bytes_received': self.bytes_received, 'bytes_decoded': self.bytes_decoded}
+
+    def connection_statistics(self):
+        """
+        The connections opened by httpx are not counted
+        :return: None
+        """
+        return None
+
+    async def close(self):
+        """
+        Closes all pooled connections to the Jira server
+        """
+        await self.client.aclose()
@@ -0,0 +1,319 @@
+import asyncio
+from collections import deque
+from datetime import datetime
+
+import retrieval
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+
+async def get_updated_issues(client, project, from_date, to_date, jql=None, page_size=None, authors=None,
+                             groups=None, enricher=None):
+    """Retrieve the updated issues from Jira without blocking the event loop
+
+    The same issues as by jiratimereport.get_updated_issues are returned, in the same order.
+
+    :param client: the AsyncJiraClient to use
+    :param project The Jira project to retrieve the time report, a comma separated string or list of projects
+    :param from_date The date to start the time report, format yyyy-mm-dd
+    :param to_date The date to end the time report (the end date is inclusive), format yyyy-mm-dd
+    :param jql: a list of JQL filters for retrieving issues in addition to the issues of the projects
+    :param page_size: the number of issues to request per page, None for the default of Jira
+    :param authors: a list of account ids or user names, only issues with work logs of these authors are retrieved
+    :param groups: a list of Jira groups, only issues with work logs of members of these groups are retrieved
+    :param enricher: the IssueEnricher to retrieve the extra fields of the issues for, None for no extra fields
+    :return: a list of issues
+    """
+    return [issue async for issue in iter_updated_issues(client, project, from_date, to_date, jql, page_size, authors,
+                                                         groups, enricher)]
+
+
+async def iter_updated_issues(client, project, from_date, to_date, jql=None, page_size=None, authors=None,
+                              groups=None, enricher=None):
+    """Retrieve the updated issues from Jira page by page without blocking the event loop
+
+    The pages after the first one are retrieved concurrently, as many as the concurrency of the client allows. The
+    issues of a page are yielded as soon as the page and the preceding pages have been retrieved. Issues which shift
+    between the pages during pagination are handled like by jiratimereport.iter_updated_issues.
+
+    :param client: the AsyncJiraClient to use
+    :param project The Jira project to retrieve the time report, a comma separated string or list of projects
+    :param from_date The date to start the time report, format yyyy-mm-dd
+    :param to_date The date to end the time report (the end date is inclusive), format yyyy-mm-dd
+    :param jql: a list of JQL filters for retrieving issues in addition to the issues of the projects
+    :param page_size: the number of issues to request per page, None for the default of Jira
+    :param authors: a list of account ids or user names, only issues with work logs of these authors are retrieved
+    :param groups: a list of Jira groups, only issues with work logs of members of these groups are retrieved
+    :param enricher: the IssueEnricher to retrieve the extra fields of the issues for, None for no extra fields
+    :return: an async generator of issues
+    """
+    issue_jql = retrieval.create_issue_jql(project, jql, from_date, to_date, authors, groups)
+    pages = retrieval.IssuePages(enricher)
+    fields = enricher.search_fields if enricher else None
+
+    async def get_page(start_at):
+        response = await client.get("/rest/api/2/search",
+                                    retrieval.create_issue_page_query(issue_jql, start_at, page_size, fields))
+        return retrieval.decode_response(client, response)
+
+    first_page_json = await get_page(0)
+    start_ats = pages.get_start_ats(first_page_json)
+    for issue in pages.add_page(0, first_page_json):
+        yield issue
+    page_jsons = ordered_map(get_page, start_ats, client.concurrency)
+    for start_at in start_ats:
+        for issue in pages.add_page(start_at, await anext(page_jsons)):
+            yield issue
+
+    start_at = pages.get_rewalk_start_at()
+    while start_at is not None:
+        page_json = await get_page(start_at)
+        for issue in pages.add_page(start_at, page_json):
+            yield issue
+        start_at = pages.get_next_rewalk_start_at(start_at, page_json)
+
+
+async def get_work_logs(client, from_date, to_date, issues, cache=None, author_ids=None, narrow=False):
+    """Retrieve the work logs from Jira without blocking the event loop
+
+    The same work logs as by jiratimereport.get_work_logs are returned, in the same order. The issues can be an async
+    iterable, e.g. iter_updated_issues, so that the work logs of the first issues are retrieved while the next pages of
+    issues are being retrieved.
+
+    :param client: the AsyncJiraClient to use
+    :param from_date The date to start the time report, format yyyy-mm-dd
+    :param to_date The date to end the time report (the end date is inclusive), format yyyy-mm-dd
+    :param issues: an iterable or async iterable of issues
+    :param cache: the WorkLogCache to use, when omitted the work logs of all issues are retrieved from Jira
+    :param author_ids: a set of account ids or user names, only the work logs of these authors are used, None for all
+    authors
+    :param narrow: whether to retrieve only the work logs started between the from and to date from Jira
+    :return: the list of work logs which has been requested and the list of issues
+    """
+    retrieved_issues = []
+
+    async def retrieve_issues():
+        async for issue in iterate(issues):
+            retrieved_issues.append(issue)
+            yield issue
+
+    work_logs = [work_log async for work_log in iter_work_logs(client, from_date, to_date, retrieve_issues(), cache,
+                                                               author_ids, narrow)]
+    return work_logs, retrieved_issues
+
+
+async def iter_work_logs(client, from_date, to_date, issues, cache=None, author_ids=None, narrow=False):
+    """Retrieve the work logs from Jira issue by issue without blocking the event loop
+
+    The work logs of as many issues as the concurrency of the client allows are retrieved concurrently. The work logs of
+    an issue are yielded as soon as they and the work logs of the preceding issues have been retrieved. The issue start
+    date of an issue is set before its work logs are yielded.
+
+    :param client: the AsyncJiraClient to use
+    :param from_date The date to start the time report, format yyyy-mm-dd
+    :param to_date The date to end the time report (the end date is inclusive), format yyyy-mm-dd
+    :param issues: an iterable or async iterable of issues
+    :param cache: the WorkLogCache to use, when omitted the work logs of all issues are retrieved from Jira
+    :param author_ids: a set of account ids or user names, only the work logs of these authors are used, None for all
+    authors
+    :param narrow: whether to retrieve only the work logs started between the from and to date from Jira
+    :return: an async generator of work logs
+    """
+    from_date = datetime.strptime(from_date, "%Y-%m-%d")
+    to_date = retrieval.convert_to_date(to_date)
+
+    async def get_work_logs_of_issue(issue):
+        return await get_issue_work_logs(client, issue, from_date, to_date, cache, author_ids, narrow)
+
+    async for issue_work_logs in ordered_map(get_work_logs_of_issue, issues, client.concurrency):
+        for work_log in issue_work_logs:
+            yield work_log
+
+
+async def get_issue_work_logs(client, issue, from_date, to_date, cache=None, author_ids=None, narrow=False):
+    """Retrieve the work logs of a single issue without blocking the event loop
+
+    The work logs are selected like by jiratimereport.get_issue_work_logs. The cache is a local SQLite database which is
+    read and written from the event loop.
+
+    :param client: the AsyncJiraClient to use
+    :param issue: the issue to retrieve the work logs for
+    :param from_date The datetime to start the time report
+    :param to_date The datetime to end the time report (exclusive)
+    :param cache: the WorkLogCache to use, None for always retrieving the work logs from Jira
+    :param author_ids: a set of account ids or user names, only the work logs of these authors are used, None for all
+    authors
+    :param narrow: whether to retrieve only the work logs started between the from and to date from Jira
+    :return: the list of work logs of the issue which have been started between the from and to date
+    """
+    return await perform(client, retrieval.issue_work_logs_requests(issue, from_date, to_date, cache, author_ids,
+                                                                        narrow))
+
+
+async def get_issue_start_date(client, issue, cache=None):
+    """Retrieve the date of the first work log of a single issue without blocking the event loop
+
+    :param client: the AsyncJiraClient to use
+    :param issue: the issue to retrieve the date of the first work log for
+    :param cache: the WorkLogCache to use, None for always retrieving the date from Jira
+    :return: the datetime of the first work log, None if the issue has no work logs
+    """
+    return await perform(client, retrieval.issue_start_date_requests(issue, cache))
+
+
+async def fetch_issue_work_logs(client, issue_key, started_after=None, started_before=None):
+    """Retrieve all work logs of a single issue from Jira without blocking the event loop
+
+    :param client: the AsyncJiraClient to use
+    :param issue_key: the key of the issue to retrieve the work logs for
+    :param started_after: the datetime from which the work logs are retrieved, None for all work logs
+    :param started_before: the datetime before which the work logs are retrieved, None for all work logs
+    :return: the list of all work logs of the issue in the order returned by Jira
+    """
+    return await perform(client, retrieval.work_logs_requests(issue_key, started_after, started_before))
+
+
+async def enrich_issues(client, issues, enricher):
+    """Add the extra fields of the issues without blocking the event loop, see jiratimereport.enrich_issues
+
+    :param client: the AsyncJiraClient to use
+    :param issues: the list of issues retrieved with the enricher
+    :param enricher: the IssueEnricher which has converted the issues
+    """
+    batches = retrieval.create_lookup_batches(enricher, issues)
+
+    async def search_batch(batch):
+        return await fetch_related_issues(client, batch, enricher.related_fields)
+
+    batch_index = 0
+    async for issues_json in ordered_map(search_batch, batches, client.concurrency):
+        enricher.add_related_issues(batches[batch_index], issues_json)
+        batch_index += 1
+    for issue in issues:
+        enricher.enrich(issue)
+
+
+async def fetch_related_issues(client, keys, fields):
+    """Search the parents or epics of issues by their keys without blocking the event loop
+
+    :param client: the AsyncJiraClient to use
+    :param keys: the list of keys to search
+    :param fields: the list of ids of the fields to retrieve
+    :return: the list of JSON issues found, the keys which do not exist are left out
+    """
+    return await perform(client, retrieval.related_issues_requests(keys, fields))
+
+
+async def get_author_ids(client, authors=None, groups=None):
+    """Retrieve the ids of authors and of the members of groups without blocking the event loop
+
+    :param client: the AsyncJiraClient to use
+    :param authors: a list of account ids or user names
+    :param groups: a list of Jira groups
+    :return: the set of account ids or user names, see jiratimereport.get_author_ids
+    :raise AuthorNotFoundError: when an author or group does not exist
+    """
+    return await perform(client, retrieval.author_ids_requests(authors, groups))
+
+
+async def get_user_id(client, author):
+    """
+    Retrieves the id of a user, by account id on Jira Cloud or else by user name
+    :param client: the AsyncJiraClient to use
+    :param author: the account id or user name
+    :return: the account id or user name, see retrieval.get_author_id
+    :raise AuthorNotFoundError: when the user does not exist
+    """
+    return await perform(client, retrieval.user_id_requests(author))
+
+
+async def perform(client, request_generator):
+    """Perform the requests of a request generator one after another without blocking the event loop
+
+    :param client: the AsyncJiraClient to use
+    :param request_generator: the request generator, see jiratimereport.perform
+    :return: the result of the request generator
+    """
+    response_json = None
+    while True:
+        try:
+            jira_request = request_generator.send(response_json)
+        except StopIteration as stop:
+            return stop.value
+        try:
+            response = await client.get(jira_request.url, jira_request.params)
+        except httpx.HTTPStatusError as error:
+            if jira_request.missing_ok and error.response.status_code in retrieval.MISSING_STATUS_CODES:
+                response_json = None
+                continue
+            raise
+        response_json = retrieval.decode_response(client, response)
+
+
+async def retrieve(client, project, from_date, to_date, jql=None, page_size=None, authors=None, groups=None,
+                   cache=None, narrow=False, enricher=None):
+    """Retrieve the issues and work logs of a time report and close the client afterwards
+
+    The issues are searched while the work logs of the issues found so far are being retrieved.
+
+    :param client: the AsyncJiraClient to use
+    :param project The Jira project to retrieve the time report, a comma separated string or list of projects
+    :param from_date The date to start the time report, format yyyy-mm-dd
+    :param to_date The date to end the time report (the end date is inclusive), format yyyy-mm-dd
+    :param jql: a list of JQL filters for retrieving issues in addition to the issues of the projects
+    :param page_size: the number of issues to request per page, None for the default of Jira
+    :param authors: a list of account ids or user names, only the work logs of these authors are retrieved
+    :param groups: a list of Jira groups, only the work logs of members of these groups are retrieved
+    :param cache: the WorkLogCache to use, when omitted the work logs of all issues are retrieved from Jira
+    :param narrow: whether to retrieve only the work logs started between the from and to date from Jira
+    :param enricher: the IssueEnricher to add the extra fields of the issues with, None for no extra fields
+    :return: the list of work logs and the list of issues
+    """
+    async with client:
+        author_ids = await get_author_ids(client, authors, groups) if authors or groups else None
+        issues = iter_updated_issues(client, project, from_date, to_date, jql, page_size, authors, groups, enricher)
+        work_logs, issues = await get_work_logs(client, from_date, to_date, issues, cache, author_ids, narrow)
+        if enricher:
+            await enrich_issues(client, issues, enricher)
+        return work_logs, issues
+
+
+async def ordered_map(function, items, concurrency):
+    """Apply a coroutine function to items concurrently and yield the results in the order of the items
+
+    At most twice the concurrency items are being processed or waiting to be yielded at the same time, like by
+    jiratimereport.ordered_map. The tasks which have not been yielded are cancelled when the iteration stops early.
+
+    :param function: the coroutine function to apply to each item
+    :param items: an iterable or async iterable of items
+    :param concurrency: the maximum number of items to process concurrently
+    :return: an async generator of the results
+    """
+    tasks = deque()
+    try:
+        async for item in iterate(items):
+            tasks.append(asyncio.ensure_future(function(item)))
+            if len(tasks) >= 2 * concurrency:
+                yield await tasks.popleft()
+        while tasks:
+            yield await tasks.popleft()
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def iterate(items):
+    """
+    Iterates an iterable or an async iterable asynchronously
+    :param items: an iterable or async iterable
+    :return: an async generator of the items
+    """
+    if hasattr(items, '__aiter__'):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
@@ -0,0 +1,92 @@
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+
+import decoding
+import jiratimereport
+
+DEFAULT_NUMBER_OF_WORK_LOGS = 100000
+PAGE_SIZE = 1000
+TEST_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "test")
+
+
+class PageResponse:
+    """A PageResponse object will contain the body of a Jira response like a requests response does
+    """
+    def __init__(self, content):
+        self.content = content
+
+
+class FixtureClient:
+    """A FixtureClient object will serve pages of work logs instead of a Jira server
+    """
+    def __init__(self, pages):
+        self.pages = pages
+        self.profiler = None
+
+    def get(self, url, params):
+        return PageResponse(self.pages[int(params['startAt']) // PAGE_SIZE])
+
+
+def create_work_log_pages(number_of_work_logs):
+    """Create pages of work logs by repeating the work logs of the test fixtures
+
+    :param number_of_work_logs: the total number of work logs
+    :return: the list of pages as bytes
+    """
+    work_logs_json = []
+    for fixture in ("work_logs_first_issue_one_page.json", "work_logs_second_issue_one_page.json",
+                    "work_logs_multiple_first_page.json", "work_logs_multiple_second_page.json"):
+        with open(os.path.join(TEST_DIRECTORY, fixture), "r") as fixture_file:
+            work_logs_json.extend(json.loads(fixture_file.read())['worklogs'])
+
+    pages = []
+    for start_at in range(0, number_of_work_logs, PAGE_SIZE):
+        page_work_logs_json = []
+        for i in range(start_at, min(start_at + PAGE_SIZE, number_of_work_logs)):
+            started = "2020-%02d-%02dT10:00:00.000+0100" % (1 + i % 12, 1 + i % 28)
+            page_work_logs_json.append(dict(work_logs_json[i % len(work_logs_json)], id=str(i), started=started))
+        pages.append(json.dumps({'startAt': start_at, 'maxResults': PAGE_SIZE, 'total': number_of_work_logs,
+                                 'worklogs': page_work_logs_json}).encode())
+    return pages
+
+
+def main():
+    """Benchmark decoding work log pages with every available JSON backend
+
+    Run from the repository root with: python -m benchmark.decoding
+    """
+    parser = argparse.ArgumentParser(description='Benchmark decoding work log pages.')
+    parser.add_argument('--work_logs', type=int, default=DEFAULT_NUMBER_OF_WORK_LOGS,
+                        help='The number of work logs to decode')
+    args = parser.parse_args()
+
+    client = FixtureClient(create_work_log_pages(args.work_logs))
+    print("Work logs: %d in %d pages of %.1f MiB" %
+          (args.work_logs, len(client.pages), sum(len(page) for page in client.pages) / 2 ** 20))
+
+    default_backend = decoding.json_backend
+    for backend in sorted(decoding.JSON_BACKENDS):
+        decoding.set_json_backend(backend)
+        start = time.perf_counter()
+        work_logs = jiratimereport.fetch_issue_work_logs(client, "MYB-1")
+        print("%-7s decoding and conversion: %.3f s" % (backend, time.perf_counter() - start))
+    decoding.set_json_backend(default_backend)
+
+    started = [work_log_json['started'] for page in client.pages for work_log_json in json.loads(page)['worklogs']]
+    start = time.perf_counter()
+    strptime_dates = [datetime.strptime(date_time[0:10], "%Y-%m-%d") for date_time in started]
+    strptime_duration = time.perf_counter() - start
+    start = time.perf_counter()
+    parsed_dates = [decoding.parse_date(date_time) for date_time in started]
+    parse_date_duration = time.perf_counter() - start
+    assert strptime_dates == parsed_dates
+    assert len(work_logs) == args.work_logs
+    print("strptime dates:   %.3f s" % strptime_duration)
+    print("parse_date dates: %.3f s" % parse_date_duration)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+import jiratimereport
+from benchmark import fakejira
+from jiraclient import JiraClient, DEFAULT_POOL_SIZE
+from profiling import Profiler
+
+DEFAULT_RESULTS_FILE_NAME = "benchmark-results.jsonl"
+OUTPUTS = {'console': ("console", False, None),
+           'csv': ("csv", False, None),
+           'excel': ("excel", False, None),
+           'streaming_excel': ("excel", True, None),
+           'jsonl': ("jsonl", False, None),
+           'parquet': ("parquet", False, None),
+           'aggregation': ("csv", False, ["author", "parent", "week"])}
+COMPARED_RESULTS = ['work_logs_per_second', 'search_seconds', 'work_logs_seconds', 'output_seconds', 'peak_rss_mib']
+
+
+def get_peak_rss():
+    """
+    :return: the peak resident set size of the process in MiB, None when it cannot be determined
+    """
+    if resource is None:
+        return None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    return peak_rss / 2 ** 20 if platform.system() == "Darwin" else peak_rss / 2 ** 10
+
+
+def get_commit():
+    """
+    :return: the abbreviated hash of the checked out commit, None when it cannot be determined
+    """
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(url, project, outputs, engine="issue", workers=1):
+    """Generate the time report of the synthetic projects in every output format and measure it
+
+    :param url: the base URL of the fake Jira
+    :param project: the comma separated projects to report
+    :param outputs: the list of outputs to generate, the keys of OUTPUTS
+    :param engine: the way to retrieve the work logs, issue or bulk
+    :param workers: the maximum number of pages of issues or issues retrieved concurrently
+    :return: a dictionary containing the measurements
+    """
+    profiler = Profiler()
+    client = JiraClient(url, "user_name", "api_token", pool_size=max(workers, DEFAULT_POOL_SIZE), max_retries=20,
+                        backoff_factor=0.01, profiler=profiler)
+
+    start = time.perf_counter()
+    issues = jiratimereport.get_updated_issues(None, None, None, project, fakejira.DEFAULT_FROM_DATE,
+                                               fakejira.DEFAULT_TO_DATE, None, client, workers=workers)
+    search_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    if engine == "bulk":
+        work_logs, issues = jiratimereport.get_work_logs_bulk(None, None, None, fakejira.DEFAULT_FROM_DATE,
+                                                              fakejira.DEFAULT_TO_DATE, None, issues, workers, client)
+    else:
+        work_logs, issues = jiratimereport.get_work_logs(None, None, None, fakejira.DEFAULT_FROM_DATE,
+                                                         fakejira.DEFAULT_TO_DATE, None, issues, workers, client)
+    work_logs_seconds = time.perf_counter() - start
+    client.close()
+
+    output_results = {}
+    with tempfile.TemporaryDirectory() as output_dir:
+        for name in outputs:
+            output, streaming_excel, group_by = OUTPUTS[name]
+            if output == "parquet" and not jiratimereport.has_pyarrow():
+                continue
+            file_name = os.path.join(output_dir, name)
+            start = time.perf_counter()
+            if output == "console":
+                with open(file_name, 'w', encoding='utf-8') as console:
+                    jiratimereport.process_work_logs(output, issues, work_logs, streaming_excel=streaming_excel,
+                                                     group_by=group_by, output_file=console)
+            else:
+                jiratimereport.process_work_logs(output, issues, work_logs, streaming_excel=streaming_excel,
+                                                 group_by=group_by, output_file=file_name)
+            output_results[name] = {'seconds': time.perf_counter() - start, 'bytes': os.path.getsize(file_name)}
+
+    request_statistics = client.request_statistics()
+    endpoints = profiler.to_dict()['endpoints']
+    return {'issues': len(issues),
+            'work_logs': len(work_logs),
+            'requests': request_statistics['requests'],
+            'retries': request_statistics['retries'],
+            'bytes_received': request_statistics['bytes_received'],
+            'search_seconds': search_seconds,
+            'work_logs_seconds': work_logs_seconds,
+            'work_logs_per_second': len(work_logs) / (search_seconds + work_logs_seconds),
+            'latency_ms': {endpoint: {percentile: statistics['latency'][percentile]
+                                      for percentile in ('p50', 'p95', 'p99', 'max')}
+                           for endpoint, statistics in endpoints.items()},
+            'outputs': output_results,
+            'output_seconds': sum(output_result['seconds'] for output_result in output_results.values()),
+            'peak_rss_mib': get_peak_rss()}
+
+
+def find_previous_result(results_file_name, parameters):
+    """
+    Finds the latest recorded result of a run with the same parameters
+    :param results_file_name: the name of the JSON Lines file with the recorded results
+    :param parameters: the parameters of the run
+    :return: the previous result, None if there is none
+    """
+    if not os.path.exists(results_file_name):
+        return None
+    previous_result = None
+    with open(results_file_name, 'r', encoding='utf-8') as results_file:
+        for line in results_file:
+            result = json.loads(line)
+            if result.get('parameters') == parameters:
+                previous_result = result
+    return previous_result
+
+
+def main():
+    """Benchmark the time report end to end against a fake Jira serving synthetic projects
+
+    The fake Jira runs in a process of its own. The issues and work logs are retrieved and written in every output
+    format, the throughput, the request latencies, the time per output and the peak memory are printed and appended to
+    a JSON Lines file, together with the change compared to the previous run with the same parameters.
+
+    Run from the repository root with: python -m benchmark.endtoend --issues 1000 --work_logs 50 --latency 20
+    """
+    parser = argparse.ArgumentParser(description='Benchmark the time report end to end against a fake Jira.')
+    fakejira.add_arguments(parser)
+    parser.add_argument('--engine', choices=["issue", "bulk"], default="issue",
+                        help='The way to retrieve the work logs, per issue or by means of the bulk work log API')
+    parser.add_argument('--workers', type=int, default=8,
+                        help='The maximum number of pages of issues or issues retrieved concurrently')
+    parser.add_argument('--outputs', default=",".join(OUTPUTS),
+                        help='The comma separated outputs to generate, from ' + ", ".join(OUTPUTS))
+    parser.add_argument('--results', default=DEFAULT_RESULTS_FILE_NAME,
+                        help='The JSON Lines file to append the results to')
+    parser.add_argument('--label',
+                        help='A label to record with the results, e.g. the change being measured')
+    args = parser.parse_args()
+    outputs = [output.strip() for output in args.outputs.split(",") if output.strip()]
+    unknown_outputs = [output for output in outputs if output not in OUTPUTS]
+    if unknown_outputs:
+        parser.error("invalid outputs " + ", ".join(unknown_outputs) + ", choose from " + ", ".join(OUTPUTS))
+
+    fake_jira_arguments = fakejira.get_fake_jira_arguments(args)
+    process, url, number_of_work_logs = fakejira.start_process(**fake_jira_arguments)
+    try:
+        project = ",".join("P" + str(project) for project in range(args.projects))
+        results = run(url, project, outputs, args.engine, args.workers)
+    finally:
+        process.terminate()
+        process.join()
+
+    parameters = dict(fake_jira_arguments, engine=args.engine, workers=args.workers, outputs=outputs)
+    previous_result = find_previous_result(args.results, parameters)
+    result = dict(results, timestamp=datetime.now().isoformat(timespec='seconds'), commit=get_commit(),
+                  python=platform.python_version(), label=args.label, parameters=parameters)
+    with open(args.results, 'a', encoding='utf-8') as results_file:
+        results_file.write(json.dumps(result) + "\n")
+
+    print("Issues: %d, work logs: %d of %d, requests: %d, retries: %d, received: %.1f MiB" %
+          (results['issues'], results['work_logs'], number_of_work_logs, results['requests'], results['retries'],
+           results['bytes_received'] / 2 ** 20))
+    print("Search: %.3f s, work logs: %.3f s, %.0f work logs/s" %
+          (results['search_seconds'], results['work_logs_seconds'], results['work_logs_per_second']))
+    for endpoint, latency in results['latency_ms'].items():
+        print("%-40s p50 %7.1f ms, p95 %7.1f ms, max %7.1f ms" % (endpoint, latency['p50'], latency['p95'],
+                                                                 latency['max']))
+    for name, output_result in results['outputs'].items():
+        print("%-16s %7.3f s %10.1f KiB" % (name + ":", output_result['seconds'], output_result['bytes'] / 2 ** 10))
+    if results['peak_rss_mib'] is not None:
+        print("Peak RSS: %.1f MiB" % results['peak_rss_mib'])
+    if previous_result:
+        print("Compared to %s (%s):" % (previous_result['timestamp'], previous_result['commit']))
+        for name in COMPARED_RESULTS:
+            if previous_result.get(name) and results.get(name) is not None:
+                print("  %-22s %+6.1f %%" % (name + ":", 100 * (results[name] / previous_result[name] - 1)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,445 @@
+import argparse
+import bisect
+import gzip
+import json
+import multiprocessing
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+DEFAULT_PROJECTS = 2
+DEFAULT_ISSUES = 500
+DEFAULT_WORK_LOGS = 20
+DEFAULT_AUTHORS = 50
+DEFAULT_PAGE_SIZE = 100
+DEFAULT_WORK_LOG_PAGE_SIZE = 1000
+DEFAULT_FROM_DATE = "2020-01-01"
+DEFAULT_TO_DATE = "2020-12-31"
+ISSUES_PER_PARENT = 10
+UPDATED_PAGE_SIZE = 1000
+TIME_ZONE = timezone(timedelta(hours=1))
+
+
+class FakeJira:
+    """A FakeJira object will serve synthetic projects like a Jira server does
+
+    The issue search, the work logs per issue and the bulk work log API are served, an issue matches the search of its
+    project when it has work logs in the searched period and every work log is started between the from and to date.
+    The work logs are generated at start up from the seed, so the same parameters serve the same projects. Requests can
+    be delayed and throttled with 429 responses, the Jira node which handles a request is returned in the X-ANODEID
+    header. Like Jira Cloud, the responses can be compressed and sent in chunks without a Content-Length.
+    """
+    def __init__(self, projects=DEFAULT_PROJECTS, issues=DEFAULT_ISSUES, work_logs=DEFAULT_WORK_LOGS,
+                 authors=DEFAULT_AUTHORS, page_size=DEFAULT_PAGE_SIZE, work_log_page_size=DEFAULT_WORK_LOG_PAGE_SIZE,
+                 latency=0.0, throttle_rate=0.0, nodes=1, from_date=DEFAULT_FROM_DATE, to_date=DEFAULT_TO_DATE,
+                 seed=0, compress=False):
+        """
+        :param projects: the number of projects, the project keys are P0, P1, ...
+        :param issues: the number of issues per project
+        :param work_logs: the number of work logs per issue
+        :param authors: the number of authors of the work logs
+        :param page_size: the maximum number of issues per page of the issue search
+        :param work_log_page_size: the maximum number of work logs per page of the work logs of an issue
+        :param latency: the mean number of seconds to delay every response
+        :param throttle_rate: the fraction of the requests to answer with 429 Too Many Requests
+        :param nodes: the number of Jira nodes handling the requests
+        :param from_date: the first date of the work logs, format yyyy-mm-dd
+        :param to_date: the last date of the work logs, format yyyy-mm-dd
+        :param seed: the seed of the generated projects
+        :param compress: whether to gzip the responses to requests which accept it and send them in chunks
+        """
+        self.page_size = page_size
+        self.compress = compress
+        self.work_log_page_size = work_log_page_size
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.nodes = nodes
+        self.random = random.Random(seed)
+        self.random_lock = threading.Lock()
+        self.http_server = None
+        self.thread = None
+
+        generator = random.Random(seed)
+        first_date = datetime.strptime(from_date, "%Y-%m-%d").replace(hour=9, tzinfo=TIME_ZONE)
+        number_of_days = (datetime.strptime(to_date, "%Y-%m-%d") - datetime.strptime(from_date, "%Y-%m-%d")).days + 1
+        self.project_keys = ["P" + str(project) for project in range(projects)]
+        self.issues_by_project = {}
+        self.issues_by_key = {}
+        self.work_logs = []
+        self.work_logs_by_issue = {}
+        for project_key in self.project_keys:
+            project_issues = []
+            for number in range(1, issues + 1):
+                issue_id = str(10000 + len(self.issues_by_key))
+                issue_work_logs = []
+                for _ in range(work_logs):
+                    started = first_date + timedelta(days=generator.randrange(number_of_days),
+                                                     minutes=15 * generator.randrange(32))
+                    work_log = (str(len(self.work_logs) + 1), issue_id, started, 900 * generator.randint(1, 16),
+                                "Author " + str(generator.randrange(authors)))
+                    issue_work_logs.append(work_log)
+                    self.work_logs.append(work_log)
+                issue_work_logs.sort(key=lambda work_log: work_log[2])
+                parent_number = number - (number - 1) % ISSUES_PER_PARENT
+                issue = (issue_id, project_key + "-" + str(number),
+                         project_key + "-" + str(parent_number) if parent_number != number else None,
+                         900 * generator.randint(1, 64) if generator.random() < 0.8 else None,
+                         sum(work_log[3] for work_log in issue_work_logs),
+                         issue_work_logs[-1][2] if issue_work_logs and generator.random() < 0.5 else None)
+                project_issues.append(issue)
+                self.issues_by_key[issue[1]] = issue
+                self.work_logs_by_issue[issue[1]] = issue_work_logs
+            self.issues_by_project[project_key] = project_issues
+        self.work_log_dates_by_issue = {key: [work_log[2].date().isoformat() for work_log in issue_work_logs]
+                                        for key, issue_work_logs in self.work_logs_by_issue.items()}
+        self.work_logs_by_id = {work_log[0]: work_log for work_log in self.work_logs}
+        self.work_logs_by_updated = sorted(self.work_logs, key=lambda work_log: (work_log[2], int(work_log[0])))
+        # The updated times are made unique, so that paging by the until time of a page does not skip work logs
+        self.updated_times = []
+        for work_log in self.work_logs_by_updated:
+            self.updated_times.append(max(updated_time(work_log),
+                                          self.updated_times[-1] + 1 if self.updated_times else 0))
+
+    def number_of_work_logs(self):
+        """
+        :return: the total number of work logs of all projects
+        """
+        return len(self.work_logs)
+
+    def search(self, parameters):
+        """
+        Searches the issues of the projects with work logs between the worklogDate bounds or the issues by key in the
+        JQL, other JQL filters are ignored
+        :param parameters: the query parameters of the request
+        :return: the JSON response
+        """
+        jql = parameters.get('jql', [""])[0]
+        key_match = re.match(r"key in \(([^)]*)\)", jql)
+        project_match = re.search(r"project in \(([^)]*)\)", jql)
+        if key_match:
+            keys = re.findall(r'"((?:[^"\\]|\\.)*)"', key_match.group(1))
+            issues = [self.issues_by_key[key] for key in sorted(keys) if key in self.issues_by_key]
+        else:
+            project_keys = re.findall(r'"((?:[^"\\]|\\.)*)"', project_match.group(1)) if project_match else []
+            issues = [issue for project_key in project_keys for issue in self.issues_by_project.get(project_key, [])]
+            date_match = re.search(r'worklogDate >= "([^"]*)" and worklogDate < "([^"]*)"', jql)
+            if date_match:
+                issues = [issue for issue in issues if has_date_between(self.work_log_dates_by_issue[issue[1]],
+                                                                        date_match.group(1), date_match.group(2))]
+        start_at = int(parameters.get('startAt', ["0"])[0])
+        max_results = min(int(parameters.get('maxResults', [str(self.page_size)])[0]), self.page_size)
+        return {'startAt': start_at, 'maxResults': max_results, 'total': len(issues),
+                'issues': [self.create_issue_json(issue) for issue in issues[start_at:start_at + max_results]]}
+
+    def create_issue_json(self, issue):
+        """
+        :param issue: the generated issue
+        :return: the issue as JSON
+        """
+        issue_id, key, parent_key, original_estimate, time_spent, resolution_date = issue
+        fields = {'summary': "Summary of issue " + key,
+                  'timeoriginalestimate': original_estimate,
+                  'timespent': time_spent,
+                  'resolutiondate': format_date_time(resolution_date) if resolution_date else None,
+                  'updated': "2021-01-01T09:00:00.000+0100"}
+        if parent_key:
+            fields['parent'] = {'id': self.issues_by_key[parent_key][0], 'key': parent_key,
+                                'fields': {'summary': "Summary of issue " + parent_key}}
+        return {'expand': "operations,versionedRepresentations,editmeta,changelog,renderedFields", 'id': issue_id,
+                'self': "https://jira/rest/api/2/issue/" + issue_id, 'key': key, 'fields': fields}
+
+    def issue_work_logs(self, key, parameters):
+        """
+        :param key: the key of the issue
+        :param parameters: the query parameters of the request
+        :return: the JSON response with a page of work logs of the issue started between startedAfter and
+        startedBefore, None if the issue does not exist
+        """
+        if key not in self.work_logs_by_issue:
+            return None
+        work_logs = self.work_logs_by_issue[key]
+        if 'startedAfter' in parameters or 'startedBefore' in parameters:
+            started_after = int(parameters.get('startedAfter', ["0"])[0])
+            started_before = int(parameters['startedBefore'][0]) if 'startedBefore' in parameters else None
+            work_logs = [work_log for work_log in work_logs
+                         if started_after <= started_time(work_log) and
+                         (started_before is None or started_time(work_log) < started_before)]
+        start_at = int(parameters.get('startAt', ["0"])[0])
+        max_results = min(int(parameters.get('maxResults', [str(self.work_log_page_size)])[0]),
+                          self.work_log_page_size)
+        return {'startAt': start_at, 'maxResults': max_results, 'total': len(work_logs),
+                'worklogs': [create_work_log_json(work_log) for work_log in work_logs[start_at:start_at + max_results]]}
+
+    def updated_work_logs(self, parameters):
+        """
+        :param parameters: the query parameters of the request
+        :return: the JSON response with a page of the ids of the work logs updated since the given time
+        """
+        since = int(parameters.get('since', ["0"])[0])
+        start = bisect.bisect_left(self.updated_times, since)
+        values = [{'worklogId': int(work_log[0]), 'updatedTime': updated_time, 'properties': []}
+                  for work_log, updated_time in zip(self.work_logs_by_updated[start:start + UPDATED_PAGE_SIZE],
+                                                    self.updated_times[start:start + UPDATED_PAGE_SIZE])]
+        last_page = start + UPDATED_PAGE_SIZE >= len(self.updated_times)
+        response_json = {'values': values, 'since': since, 'lastPage': last_page}
+        if values:
+            response_json['until'] = values[-1]['updatedTime'] + 1
+        return response_json
+
+    def list_work_logs(self, body):
+        """
+        :param body: the JSON body of the request containing the ids of the work logs
+        :return: the JSON response with the work logs
+        """
+        return [create_work_log_json(self.work_logs_by_id[str(work_log_id)]) for work_log_id in body['ids']
+                if str(work_log_id) in self.work_logs_by_id]
+
+    def delay(self):
+        """
+        Decides how to answer a request
+        :return: the number of seconds to delay the response, whether to throttle it and the node which handles it
+        """
+        with self.random_lock:
+            return (self.latency * self.random.uniform(0.5, 1.5) if self.latency else 0.0,
+                    self.random.random() < self.throttle_rate,
+                    "node" + str(self.random.randrange(self.nodes) + 1))
+
+    def start(self, host="127.0.0.1", port=0):
+        """
+        Starts serving in a thread
+        :param host: the host name or address to listen on
+        :param port: the port to listen on, 0 for any free port
+        :return: the base URL of the fake Jira
+        """
+        self.http_server = ThreadingHTTPServer((host, port), FakeJiraRequestHandler)
+        self.http_server.daemon_threads = True
+        self.http_server.fake_jira = self
+        self.thread = threading.Thread(target=self.http_server.serve_forever, daemon=True)
+        self.thread.start()
+        return "http://%s:%d" % self.http_server.server_address[:2]
+
+    def close(self):
+        """
+        Stops serving
+        """
+        self.http_server.shutdown()
+        self.http_server.server_close()
+        self.thread.join()
+
+
+class FakeJiraRequestHandler(BaseHTTPRequestHandler):
+    """The FakeJiraRequestHandler handles the requests to the FakeJira
+    """
+    protocol_version = "HTTP/1.1"
+    # The headers and the body are written separately, without Nagle the body is not delayed
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parameters = parse_qs(url.query)
+        fake_jira = self.server.fake_jira
+        work_log_match = re.fullmatch(r"/rest/api/2/issue/([^/]+)/worklog/?", url.path)
+        if url.path == "/rest/api/2/search":
+            self.respond(lambda: fake_jira.search(parameters))
+        elif work_log_match:
+            self.respond(lambda: fake_jira.issue_work_logs(work_log_match.group(1), parameters))
+        elif url.path == "/rest/api/2/worklog/updated":
+            self.respond(lambda: fake_jira.updated_work_logs(parameters))
+        else:
+            self.respond(lambda: None)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b"{}")
+        if urlparse(self.path).path == "/rest/api/2/worklog/list":
+            self.respond(lambda: self.server.fake_jira.list_work_logs(body))
+        else:
+            self.respond(lambda: None)
+
+    def respond(self, create_response_json):
+        """
+        Sends the response after the latency, or a 429 response when the request is throttled
+        :param create_response_json: the function which creates the JSON response, returning None for a 404 response
+        """
+        delay, throttled, node = self.server.fake_jira.delay()
+        if delay:
+            time.sleep(delay)
+        if throttled:
+            self.send_json(429, {'errorMessages': ["Rate limit exceeded"]}, node, {'Retry-After': "0"})
+            return
+        response_json = create_response_json()
+        if response_json is None:
+            self.send_json(404, {'errorMessages': ["Not found"]}, node)
+        else:
+            self.send_json(200, response_json, node)
+
+    def send_json(self, status_code, response_json, node, headers=None):
+        content = json.dumps(response_json).encode('utf-8')
+        compressed = self.server.fake_jira.compress and "gzip" in self.headers.get('Accept-Encoding', "")
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json;charset=UTF-8")
+        if compressed:
+            content = gzip.compress(content)
+            self.send_header("Content-Encoding", "gzip")
+            self.send_header("Transfer-Encoding", "chunked")
+        else:
+            self.send_header("Content-Length", str(len(content)))
+        self.send_header("X-ANODEID", node)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if compressed:
+            self.wfile.write(b"%x\r\n%s\r\n0\r\n\r\n" % (len(content), content))
+        else:
+            self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def format_date_time(date_time):
+    """
+    :param date_time: a datetime with time zone
+    :return: the date time in the format of Jira, yyyy-mm-ddThh:mm:ss.sss+zzzz
+    """
+    return date_time.strftime("%Y-%m-%dT%H:%M:%S.000%z")
+
+
+def has_date_between(dates, from_date, to_date):
+    """
+    :param dates: the sorted list of dates, format yyyy-mm-dd
+    :param from_date: the first date, format yyyy-mm-dd
+    :param to_date: the date after the last date, format yyyy-mm-dd
+    :return: whether a date is between the from and to date
+    """
+    index = bisect.bisect_left(dates, from_date)
+    return index < len(dates) and dates[index] < to_date
+
+
+def started_time(work_log):
+    """
+    :param work_log: the generated work log
+    :return: the time the work log has been started in milliseconds since the epoch
+    """
+    return int(work_log[2].timestamp() * 1000)
+
+
+def updated_time(work_log):
+    """
+    :param work_log: the generated work log
+    :return: the time the work log has been updated in milliseconds since the epoch, which is the time it started
+    """
+    return started_time(work_log)
+
+
+def create_work_log_json(work_log):
+    """
+    :param work_log: the generated work log
+    :return: the work log as JSON
+    """
+    work_log_id, issue_id, started, time_spent, author = work_log
+    author_json = {'accountId': "account-" + author[7:], 'displayName': author, 'active': True,
+                   'timeZone': "Europe/Amsterdam"}
+    return {'self': "https://jira/rest/api/2/issue/" + issue_id + "/worklog/" + work_log_id,
+            'author': author_json,
+            'updateAuthor': author_json,
+            'comment': "Work on issue " + issue_id,
+            'created': format_date_time(started),
+            'updated': format_date_time(started),
+            'started': format_date_time(started),
+            'timeSpent': str(time_spent // 60) + "m",
+            'timeSpentSeconds': time_spent,
+            'id': work_log_id,
+            'issueId': issue_id}
+
+
+def serve(fake_jira_arguments, urls):
+    """
+    Runs a FakeJira until the process is terminated, the target of start_process
+    :param fake_jira_arguments: the keyword arguments of the FakeJira
+    :param urls: the queue to put the base URL of the FakeJira on once it serves
+    """
+    fake_jira = FakeJira(**fake_jira_arguments)
+    urls.put((fake_jira.start(), fake_jira.number_of_work_logs()))
+    fake_jira.thread.join()
+
+
+def start_process(**fake_jira_arguments):
+    """
+    Starts a FakeJira in a process of its own, so that it does not take CPU time or memory of the benchmarked process
+    :param fake_jira_arguments: the keyword arguments of the FakeJira
+    :return: the process, the base URL of the FakeJira and the total number of work logs
+    """
+    context = multiprocessing.get_context("spawn")
+    urls = context.Queue()
+    process = context.Process(target=serve, args=(fake_jira_arguments, urls), daemon=True)
+    process.start()
+    url, number_of_work_logs = urls.get()
+    return process, url, number_of_work_logs
+
+
+def add_arguments(parser):
+    """
+    Adds the arguments of the synthetic projects to an argument parser
+    :param parser: the ArgumentParser
+    """
+    parser.add_argument('--projects', type=int, default=DEFAULT_PROJECTS,
+                        help='The number of projects')
+    parser.add_argument('--issues', type=int, default=DEFAULT_ISSUES,
+                        help='The number of issues per project')
+    parser.add_argument('--work_logs', type=int, default=DEFAULT_WORK_LOGS,
+                        help='The number of work logs per issue')
+    parser.add_argument('--authors', type=int, default=DEFAULT_AUTHORS,
+                        help='The number of authors of the work logs')
+    parser.add_argument('--page_size', type=int, default=DEFAULT_PAGE_SIZE,
+                        help='The maximum number of issues per page of the issue search')
+    parser.add_argument('--work_log_page_size', type=int, default=DEFAULT_WORK_LOG_PAGE_SIZE,
+                        help='The maximum number of work logs per page of the work logs of an issue')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='The mean number of milliseconds to delay every response')
+    parser.add_argument('--throttle_rate', type=float, default=0.0,
+                        help='The fraction of the requests to answer with 429 Too Many Requests')
+    parser.add_argument('--nodes', type=int, default=1,
+                        help='The number of Jira nodes handling the requests')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='The seed of the generated projects')
+    parser.add_argument('--compress', action='store_true',
+                        help='Compress the responses and send them in chunks like Jira Cloud')
+
+
+def get_fake_jira_arguments(args):
+    """
+    :param args: the parsed arguments added by add_arguments
+    :return: the keyword arguments of the FakeJira
+    """
+    return {'projects': args.projects, 'issues': args.issues, 'work_logs': args.work_logs, 'authors': args.authors,
+            'page_size': args.page_size, 'work_log_page_size': args.work_log_page_size,
+            'latency': args.latency / 1000, 'throttle_rate': args.throttle_rate, 'nodes': args.nodes,
+            'seed': args.seed, 'compress': args.compress}
+
+
+def main():
+    """Serve synthetic projects like a Jira server does
+
+    Run from the repository root with: python -m benchmark.fakejira --port 8081
+    """
+    parser = argparse.ArgumentParser(description='Serve synthetic Jira projects.')
+    add_arguments(parser)
+    parser.add_argument('--port', type=int, default=8081,
+                        help='The port to listen on')
+    args = parser.parse_args()
+
+    fake_jira = FakeJira(**get_fake_jira_arguments(args))
+    print("Serving %d work logs of projects %s on %s" %
+          (fake_jira.number_of_work_logs(), ", ".join(fake_jira.project_keys), fake_jira.start(port=args.port)))
+    try:
+        fake_jira.thread.join()
+    except KeyboardInterrupt:
+        fake_jira.close()
+
+
+if __name__ == "__main__":
+    main()
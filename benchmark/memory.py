@@ -0,0 +1,83 @@
+import argparse
+import sys
+import time
+from datetime import datetime
+
+from worklog import WorkLog
+
+DEFAULT_NUMBER_OF_WORK_LOGS = 1000000
+
+
+class DictWorkLog:
+    """The WorkLog representation with a per-instance dictionary, a copy of the author and a datetime per work log
+    """
+    def __init__(self, issue_key, started, time_spent, author):
+        self.issue_key = issue_key
+        self.started = started
+        self.time_spent = time_spent
+        self.author = author
+
+
+def create_work_logs(work_log_class, number_of_work_logs):
+    """Create work logs like they are created when decoding the Jira responses
+
+    Every decoded work log contains its own copies of the issue key, the author and the started date.
+
+    :param work_log_class: the class of the work logs to create
+    :param number_of_work_logs: the number of work logs to create
+    :return: the list of work logs
+    """
+    return [work_log_class("MYB-" + str(i % 5000),
+                           datetime(2020, 1, 1 + i % 28),
+                           3600,
+                           "Author " + str(i % 300))
+            for i in range(number_of_work_logs)]
+
+
+def measure_work_logs(work_logs):
+    """Measure the memory of work logs
+
+    The size of the work log objects, their dictionaries and all distinct attribute values are counted. The started
+    property of the slotted work log is not counted, as it creates a datetime on access only.
+
+    :param work_logs: the list of work logs
+    :return: the number of bytes used by the work logs and their values
+    """
+    seen = set()
+    size = sys.getsizeof(work_logs)
+    for work_log in work_logs:
+        size += sys.getsizeof(work_log)
+        if hasattr(work_log, '__dict__'):
+            size += sys.getsizeof(vars(work_log))
+            values = vars(work_log).values()
+        else:
+            values = [getattr(work_log, attribute) for attribute in work_log.__slots__]
+        for value in values:
+            if id(value) not in seen:
+                seen.add(id(value))
+                size += sys.getsizeof(value)
+    return size
+
+
+def main():
+    """Compare the memory of the work log representations
+
+    Run from the repository root with: python -m benchmark.memory
+    """
+    parser = argparse.ArgumentParser(description='Compare the memory of the work log representations.')
+    parser.add_argument('--work_logs', type=int, default=DEFAULT_NUMBER_OF_WORK_LOGS,
+                        help='The number of work logs to create')
+    args = parser.parse_args()
+
+    for name, work_log_class in (("Dictionary based", DictWorkLog), ("Slotted and interned", WorkLog)):
+        start = time.perf_counter()
+        work_logs = create_work_logs(work_log_class, args.work_logs)
+        duration = time.perf_counter() - start
+        size = measure_work_logs(work_logs)
+        print("%-21s %8.1f MiB, %4d bytes per work log, created in %.2f s" %
+              (name + ":", size / 2 ** 20, size // args.work_logs, duration))
+        del work_logs
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime
+
+import jiratimereport
+from issue import Issue
+from worklog import WorkLog
+
+DEFAULT_NUMBER_OF_ISSUES = 1000
+DEFAULT_WORK_LOGS_PER_ISSUE = 4
+DEFAULT_GROWTH = 8
+REPETITIONS = 3
+# A linear scan of the issues per work log grows with the square of the growth, a linear output with the growth
+MAX_GROWTH_FACTOR = 3
+
+
+def create_report(number_of_issues, work_logs_per_issue):
+    """Create synthetic issues and work logs
+
+    :param number_of_issues: the number of issues
+    :param work_logs_per_issue: the number of work logs per issue
+    :return: the issue index and the list of work logs
+    """
+    issues = [Issue(i, "MYB-" + str(i), "Summary of issue MYB-" + str(i), None, None, 3600, 900, None)
+              for i in range(number_of_issues)]
+    work_logs = [WorkLog("MYB-" + str(i % number_of_issues), datetime(2020, 1, 1 + i % 28), 3600, "John Doe")
+                 for i in range(work_logs_per_issue * number_of_issues)]
+    return {issue.key: issue for issue in issues}, work_logs
+
+
+def output_duration(number_of_issues, work_logs_per_issue, output_dir):
+    """Time writing the CSV file of a synthetic report
+
+    :param number_of_issues: the number of issues
+    :param work_logs_per_issue: the number of work logs per issue
+    :param output_dir: the directory to write the CSV file in
+    :return: the fastest of REPETITIONS durations in seconds
+    """
+    issue_index, work_logs = create_report(number_of_issues, work_logs_per_issue)
+    durations = []
+    for _ in range(REPETITIONS):
+        start = time.perf_counter()
+        jiratimereport.output_to_csv(issue_index, work_logs, os.path.join(output_dir, jiratimereport.CSV_FILE_NAME))
+        durations.append(time.perf_counter() - start)
+    return min(durations)
+
+
+def main():
+    """Benchmark the output of a growing number of issues and work logs, the output time must grow linearly
+
+    Run from the repository root with: python -m benchmark.output
+    """
+    parser = argparse.ArgumentParser(description='Benchmark the output of a growing report.')
+    parser.add_argument('--issues', type=int, default=DEFAULT_NUMBER_OF_ISSUES,
+                        help='The number of issues of the small report')
+    parser.add_argument('--work_logs', type=int, default=DEFAULT_WORK_LOGS_PER_ISSUE,
+                        help='The number of work logs per issue')
+    parser.add_argument('--growth', type=int, default=DEFAULT_GROWTH,
+                        help='The number of times the large report is larger than the small report')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        small_duration = output_duration(args.issues, args.work_logs, output_dir)
+        large_duration = output_duration(args.growth * args.issues, args.work_logs, output_dir)
+
+    growth_factor = large_duration / small_duration
+    print("Output of %d work logs: %.3f s" % (args.issues * args.work_logs, small_duration))
+    print("Output of %d work logs: %.3f s" % (args.growth * args.issues * args.work_logs, large_duration))
+    print("Growth of the output time: %.1f times for %d times the work logs" % (growth_factor, args.growth))
+    if growth_factor > MAX_GROWTH_FACTOR * args.growth:
+        parser.exit(1, "The output time grows faster than linearly\n")
+
+
+if __name__ == "__main__":
+    main()
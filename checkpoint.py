@@ -0,0 +1,137 @@
+import json
+import os
+import threading
+
+from decoding import decode_json, parse_date_part
+from worklog import WorkLog
+
+
+class CheckpointJournal:
+    """A CheckpointJournal object will record the progress of a run, so that a run which has died can be resumed
+
+    The journal is a JSON Lines file. The first line contains the parameters of the run, every following line a page of
+    issues as received from Jira or the issue start date and the work logs of the time report of one issue. Every line
+    is written as soon as the page or issue is complete, so a run which dies only loses the pages and issues which were
+    being retrieved. A resumed run takes the completed pages and issues from the journal and retrieves the others from
+    Jira, the report is the same as the report of a run which has not been interrupted.
+    """
+    def __init__(self, file_name, parameters, resume=False):
+        """
+        :param file_name: the name of the journal file
+        :param parameters: a dictionary of the parameters which determine the issues and work logs of the run, a journal
+        can only be resumed with the same parameters
+        :param resume: whether to resume the journal when it exists, otherwise a new journal is started
+        """
+        self.file_name = file_name
+        self.lock = threading.Lock()
+        self.issue_pages = {}
+        self.issue_work_logs = {}
+        self.resumed_pages = 0
+        self.resumed_issues = 0
+
+        if resume and os.path.exists(file_name):
+            self.load(parameters)
+            self.file = open(file_name, 'a', encoding='utf-8')
+        else:
+            self.file = open(file_name, 'w', encoding='utf-8')
+            self.write({'parameters': parameters})
+
+    def load(self, parameters):
+        """
+        Reads the pages and issues completed by the run which is resumed
+        :param parameters: the parameters of the run, which must be the parameters of the journal
+        """
+        with open(self.file_name, 'r+b') as journal_file:
+            data = journal_file.read()
+            # The last line is incomplete when the run died while writing it, it is removed before appending
+            end = data.rfind(b"\n") + 1
+            if end < len(data):
+                journal_file.truncate(end)
+
+        records = [decode_json(line) for line in data[:end].decode('utf-8').splitlines()]
+        if not records or records[0].get('parameters') != json.loads(json.dumps(parameters)):
+            raise ValueError("the checkpoint " + self.file_name + " has been made by a run with other parameters, "
+                             "start a new run without --resume")
+
+        for record in records[1:]:
+            if 'page' in record:
+                self.issue_pages[record['start_at']] = record['page']
+            else:
+                self.issue_work_logs[record['issue']] = record
+
+    def write(self, record):
+        """
+        Appends a record to the journal, the lock must be held unless the journal is being created
+        :param record: the JSON serializable record
+        """
+        self.file.write(json.dumps(record, separators=(',', ':')) + "\n")
+        self.file.flush()
+
+    def get_issue_page(self, start_at):
+        """
+        Retrieves a page of issues completed before the run was resumed
+        :param start_at: the index of the first issue of the page
+        :return: the JSON page of issues as received from Jira, None when it must be retrieved from Jira
+        """
+        with self.lock:
+            page_json = self.issue_pages.get(start_at)
+            if page_json is not None:
+                self.resumed_pages += 1
+            return page_json
+
+    def put_issue_page(self, start_at, page_json):
+        """
+        Records a completed page of issues
+        :param start_at: the index of the first issue of the page
+        :param page_json: the JSON page of issues as received from Jira
+        """
+        with self.lock:
+            self.write({'start_at': start_at, 'page': page_json})
+
+    def get_work_logs(self, issue):
+        """
+        Retrieves the work logs of an issue completed before the run was resumed and sets its issue start date
+        :param issue: the issue to retrieve the work logs for
+        :return: the list of work logs of the time report of the issue, None when they must be retrieved from Jira
+        """
+        with self.lock:
+            record = self.issue_work_logs.get(issue.key)
+            if record is None:
+                return None
+            self.resumed_issues += 1
+
+        if record['start_date'] is not None:
+            issue.issue_start_date = parse_date_part(record['start_date'])
+        return [WorkLog(issue.key, parse_date_part(started), time_spent, author)
+                for started, time_spent, author in record['work_logs']]
+
+    def put_work_logs(self, issue, work_logs):
+        """
+        Records the completed work logs of an issue together with its issue start date
+        :param issue: the issue the work logs belong to
+        :param work_logs: the list of work logs of the time report of the issue
+        """
+        start_date = issue.issue_start_date.strftime('%Y-%m-%d') if issue.issue_start_date is not None else None
+        record = {'issue': issue.key, 'start_date': start_date,
+                  'work_logs': [(work_log.started.strftime('%Y-%m-%d'), work_log.time_spent, work_log.author)
+                                for work_log in work_logs]}
+        with self.lock:
+            self.write(record)
+
+    def statistics(self):
+        """
+        Counts the pages and issues taken from the journal
+        :return: a dictionary containing the number of resumed pages and issues
+        """
+        with self.lock:
+            return {'pages': self.resumed_pages, 'issues': self.resumed_issues}
+
+    def close(self, remove=False):
+        """
+        Closes the journal
+        :param remove: whether to remove the journal, e.g. because the run has been completed
+        """
+        with self.lock:
+            self.file.close()
+            if remove:
+                os.remove(self.file_name)
@@ -0,0 +1,69 @@
+import json
+from datetime import datetime
+from functools import lru_cache
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+JSON_BACKENDS = {'json': json.loads}
+if ujson is not None:
+    JSON_BACKENDS['ujson'] = ujson.loads
+if orjson is not None:
+    JSON_BACKENDS['orjson'] = orjson.loads
+
+json_backend = 'orjson' if orjson is not None else 'ujson' if ujson is not None else 'json'
+
+
+def set_json_backend(backend):
+    """
+    Selects the library to decode JSON with
+    :param backend: json, ujson or orjson, ujson and orjson can only be used when they are installed
+    """
+    global json_backend
+    if backend not in JSON_BACKENDS:
+        raise ValueError("JSON backend " + backend + " is not available, available are " + ", ".join(JSON_BACKENDS))
+    json_backend = backend
+
+
+def get_json_backend():
+    """
+    :return: the name of the library JSON is decoded with, e.g. to select the same library in another process
+    """
+    return json_backend
+
+
+def decode_json(data):
+    """
+    Decodes JSON with the fastest installed library, orjson, ujson or else the standard library
+    :param data: the JSON as bytes or str
+    :return: the decoded JSON
+    """
+    return JSON_BACKENDS[json_backend](data)
+
+
+def parse_date(date_time):
+    """
+    Parses the date of a Jira date time
+    :param date_time: the Jira date time, format yyyy-mm-ddThh:mm:ss.sss+zzzz, only the date part is used
+    :return: the date as a datetime at time 00:00:00
+    """
+    return parse_date_part(date_time[0:10])
+
+
+@lru_cache(maxsize=4096)
+def parse_date_part(date):
+    """
+    Parses a date, the dates of a time report repeat a lot so the parsed dates are cached
+    :param date: the date, format yyyy-mm-dd
+    :return: the date as a datetime at time 00:00:00
+    """
+    if len(date) != 10 or date[4] != '-' or date[7] != '-':
+        raise ValueError("time data '" + date + "' does not match format '%Y-%m-%d'")
+    return datetime(int(date[0:4]), int(date[5:7]), int(date[8:10]))
@@ -0,0 +1,127 @@
+import re
+
+EPIC_LINK_FIELD = "customfield_10014"
+LOOKUP_BATCH_SIZE = 100
+RELATIONS = ['parent', 'epic']
+FIELD_PATTERN = re.compile(r"^(?:(" + "|".join(RELATIONS) + r")\.)?([A-Za-z][A-Za-z0-9_]*)$")
+
+
+def parse_fields(fields, reserved_names=()):
+    """
+    Parses the extra fields to add to the time report
+    :param fields: a comma separated string of Jira field ids, the fields of the parent or epic of an issue are prefixed
+    by parent. or epic., e.g. components,labels,parent.timeoriginalestimate,epic.summary
+    :param reserved_names: the names of the columns the time report already contains
+    :return: the list of fields
+    """
+    fields = [field.strip() for field in fields.split(",") if field.strip()]
+    invalid_fields = [field for field in fields if not FIELD_PATTERN.match(field) or field in reserved_names]
+    if not fields or invalid_fields or len(set(fields)) != len(fields):
+        raise ValueError("invalid fields " + ", ".join(invalid_fields) + ", use distinct Jira field ids, optionally "
+                         "prefixed by " + " or ".join(relation + "." for relation in RELATIONS) +
+                         ", which are not a column of the time report already")
+    return fields
+
+
+def format_field_value(value):
+    """
+    Formats the JSON value of a Jira field as text
+    :param value: the JSON value
+    :return: the text, the values of a list are separated by commas and of an object its value, name, display name or
+    key is used, None for an empty field
+    """
+    if value is None:
+        return None
+    if isinstance(value, list):
+        values = [text for text in map(format_field_value, value) if text is not None]
+        return ", ".join(values) if values else None
+    if isinstance(value, dict):
+        for name in ('value', 'name', 'displayName', 'key'):
+            if name in value:
+                return format_field_value(value[name])
+        return None
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+class IssueEnricher:
+    """An IssueEnricher object will add extra fields of issues and of their parents and epics to the issues
+
+    The fields of the issues themselves are retrieved by the search of the issues. The parents and epics of the issues
+    are looked up afterwards by searching their keys in batches, so the number of requests does not grow with the
+    number of issues. Each parent or epic is looked up once during the run. The extra fields are formatted as text.
+    """
+    def __init__(self, fields, epic_link_field=EPIC_LINK_FIELD):
+        """
+        :param fields: the list of fields as returned by parse_fields
+        :param epic_link_field: the id of the Jira field containing the key of the epic of an issue
+        """
+        self.fields = fields
+        self.epic_link_field = epic_link_field
+        self.columns = [tuple(FIELD_PATTERN.match(field).groups()) for field in fields]
+        self.relations = {relation for relation, _ in self.columns if relation is not None}
+        self.search_fields = list(dict.fromkeys([field_id for relation, field_id in self.columns if relation is None] +
+                                                ([epic_link_field] if 'epic' in self.relations else [])))
+        self.related_fields = list(dict.fromkeys(field_id for relation, field_id in self.columns if relation))
+        self.epic_keys = {}
+        self.related_issues = {}
+        self.number_of_lookups = 0
+
+    def convert(self, issue, fields_json):
+        """
+        Adds the extra fields of an issue itself, the fields of its parent and epic are added by enrich
+        :param issue: the issue
+        :param fields_json: the JSON fields of the issue as received from the search
+        """
+        if 'epic' in self.relations:
+            epic_key = format_field_value(fields_json.get(self.epic_link_field))
+            if epic_key is not None:
+                self.epic_keys[issue.key] = epic_key
+        issue.extra_fields = tuple(format_field_value(fields_json.get(field_id)) if relation is None else None
+                                   for relation, field_id in self.columns)
+
+    def get_related_keys(self, issue):
+        """
+        :param issue: the issue
+        :return: the key of the parent and the key of the epic of the issue, None when it has none
+        """
+        return issue.parent_key, self.epic_keys.get(issue.key)
+
+    def get_missing_keys(self, issues):
+        """
+        Determines the parents and epics which have not been looked up yet
+        :param issues: the list of issues
+        :return: the sorted list of keys of the parents and epics to look up
+        """
+        missing_keys = set()
+        for issue in issues:
+            for relation, key in zip(RELATIONS, self.get_related_keys(issue)):
+                if key is not None and relation in self.relations and key not in self.related_issues:
+                    missing_keys.add(key)
+        return sorted(missing_keys)
+
+    def add_related_issues(self, keys, issues_json):
+        """
+        Adds the looked up parents and epics, the keys which are not found are not looked up again
+        :param keys: the list of keys which have been looked up
+        :param issues_json: the list of JSON issues found
+        """
+        self.number_of_lookups += 1
+        for issue_json in issues_json:
+            fields_json = issue_json.get('fields', {})
+            self.related_issues[issue_json['key']] = {field_id: format_field_value(fields_json.get(field_id))
+                                                      for field_id in self.related_fields}
+        for key in keys:
+            self.related_issues.setdefault(key, None)
+
+    def enrich(self, issue):
+        """
+        Adds the extra fields of the parent and epic of an issue, which must have been looked up
+        :param issue: the issue converted by convert
+        """
+        related_issues = dict(zip(RELATIONS, (self.related_issues.get(key) if key is not None else None
+                                              for key in self.get_related_keys(issue))))
+        issue.extra_fields = tuple(value if relation is None else
+                                   related_issues[relation].get(field_id) if related_issues[relation] else None
+                                   for (relation, field_id), value in zip(self.columns, issue.extra_fields))
@@ -0,0 +1,63 @@
+import heapq
+import pickle
+import tempfile
+
+SPILL_CHUNK_SIZE = 128
+
+
+def external_sort(items, key, buffer_size):
+    """Sort items which do not necessarily fit in memory
+
+    The items are collected in a buffer. Each time the buffer is full, it is sorted and spilled to a temporary file.
+    Finally, the sorted runs are merged. The sort is stable, the result is the same as sorted(items, key=key).
+
+    :param items: an iterable of picklable items
+    :param key: the function which determines the sort key of an item
+    :param buffer_size: the maximum number of items to keep in memory
+    :return: a generator of the sorted items
+    """
+    buffer = []
+    run_files = []
+    try:
+        for item in items:
+            buffer.append(item)
+            if len(buffer) >= buffer_size:
+                buffer.sort(key=key)
+                run_files.append(spill_run(buffer))
+                buffer = []
+
+        buffer.sort(key=key)
+        # The runs are passed in input order, heapq.merge takes equal items from the first run first
+        runs = [read_run(run_file) for run_file in run_files]
+        runs.append(buffer)
+        yield from heapq.merge(*runs, key=key)
+    finally:
+        for run_file in run_files:
+            run_file.close()
+
+
+def spill_run(sorted_items):
+    """Write sorted items to a temporary file
+
+    :param sorted_items: the list of sorted items
+    :return: the temporary file, positioned at the start
+    """
+    run_file = tempfile.TemporaryFile()
+    for i in range(0, len(sorted_items), SPILL_CHUNK_SIZE):
+        pickle.dump(sorted_items[i:i + SPILL_CHUNK_SIZE], run_file, pickle.HIGHEST_PROTOCOL)
+    run_file.seek(0)
+    return run_file
+
+
+def read_run(run_file):
+    """Read the sorted items from a temporary file
+
+    :param run_file: the temporary file written by spill_run
+    :return: a generator of the sorted items
+    """
+    while True:
+        try:
+            chunk = pickle.load(run_file)
+        except EOFError:
+            return
+        yield from chunk
@@ -0,0 +1,296 @@
+import math
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.auth import HTTPBasicAuth
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BACKOFF_FACTOR = 0.5
+MAX_BACKOFF = 60
+RETRY_STATUS_CODES = {429, 502, 503, 504}
+NODE_HEADER = "X-ANODEID"
+
+
+class RateLimiter:
+    """A RateLimiter object will schedule the requests of all workers by means of a token bucket
+
+    Besides the rate limit, the requests can be paused for all workers, e.g. when Jira requests to retry after some time.
+    """
+    def __init__(self, rate=None, burst=None):
+        """
+        :param rate: the maximum number of requests per second, None for no limit
+        :param burst: the maximum number of requests which can be sent at once, by default the rate rounded up
+        """
+        self.rate = rate
+        self.capacity = burst if burst else max(1, math.ceil(rate)) if rate else None
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Waits until a request may be sent
+        :return: the number of seconds waited
+        """
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def reserve(self):
+        """
+        Reserves the sending of a request without waiting, e.g. for waiting without blocking in an event loop
+        :return: the number of seconds to wait before the request may be sent
+        """
+        with self.lock:
+            now = time.monotonic()
+            wait = max(0.0, self.paused_until - now)
+            if self.rate:
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                # Reserve the token, a negative number of tokens is the backlog of the waiting workers
+                self.tokens -= 1
+                if self.tokens < 0:
+                    wait = max(wait, -self.tokens / self.rate)
+        return wait
+
+    def pause(self, seconds):
+        """
+        Pauses the requests of all workers
+        :param seconds: the number of seconds to pause
+        """
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+def get_retry_delay(response, attempt, backoff_factor=DEFAULT_BACKOFF_FACTOR):
+    """
+    Determines the number of seconds to wait before retrying a throttled request
+    :param response: the response of the throttled request, a requests or httpx response
+    :param attempt: the number of retries which already have been done for the request
+    :param backoff_factor: the number of seconds to wait before the first retry when Jira does not request a time
+    :return: the time to wait as requested in the Retry-After header or else an exponential backoff with jitter
+    """
+    retry_after = response.headers.get('Retry-After')
+    if retry_after:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            try:
+                retry_at = parsedate_to_datetime(retry_after)
+                return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+            except (TypeError, ValueError):
+                pass
+
+    return random.uniform(0, min(MAX_BACKOFF, backoff_factor * 2 ** attempt))
+
+
+class CountingAdapter(HTTPAdapter):
+    """A CountingAdapter will let the responses of requests count the bytes received before decompression"""
+    def build_response(self, req, resp):
+        """
+        Builds the response of requests with a CountingBody as raw response
+        :param req: the PreparedRequest of the response
+        :param resp: the urllib3 response
+        :return: the response of requests
+        """
+        response = super().build_response(req, resp)
+        response.raw = CountingBody(resp)
+        return response
+
+
+class CountingBody:
+    """A CountingBody object will stream the body of a urllib3 response so that tell counts the bytes received
+
+    urllib3 streams a chunked body without counting the bytes read from the connection, so the body is streamed by
+    reading it in parts instead, which urllib3 counts for chunked and other bodies alike. requests reads the content
+    from the stream, so read errors are translated into exceptions of requests as usual. Everything else is left to the
+    urllib3 response.
+    """
+    def __init__(self, raw):
+        """
+        :param raw: the urllib3 response
+        """
+        self.raw = raw
+
+    def stream(self, amt, decode_content=None):
+        """
+        Reads the body in parts
+        :param amt: the maximum number of bytes per part
+        :param decode_content: whether to decompress the body
+        :return: an iterator of the parts of the body
+        """
+        while True:
+            data = self.raw.read(amt, decode_content=decode_content)
+            if not data:
+                return
+            yield data
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+
+class JiraClient:
+    """A JiraClient object will perform the requests to the Jira API
+
+    The requests share one session, the authentication, headers and SSL certificate are set once and the connections to
+    the Jira server are kept alive in a pool in order to reuse them for subsequent requests. Requests which are
+    throttled or rejected because the server is unavailable, are retried after the time requested by Jira or otherwise
+    after an exponential backoff with jitter. The responses are requested compressed, the number of bytes received
+    and the number of bytes after decompression are counted.
+    """
+    def __init__(self, jira_url, user_name, api_token, ssl_certificate=None, pool_size=DEFAULT_POOL_SIZE,
+                 rate_limit=None, max_retries=DEFAULT_MAX_RETRIES, backoff_factor=DEFAULT_BACKOFF_FACTOR,
+                 profiler=None):
+        """
+        :param jira_url: The base Jira URL
+        :param user_name The user name to use for connecting to Jira
+        :param api_token The API token to use for connecting to Jira
+        :param ssl_certificate The location of the SSL certificate, needed in case of self-signed certificates
+        :param pool_size The maximum number of connections to keep alive, use at least the number of workers
+        :param rate_limit The maximum number of requests per second, None for no limit
+        :param max_retries The maximum number of retries of a throttled request
+        :param backoff_factor The number of seconds to wait before the first retry when Jira does not request a time
+        :param profiler The Profiler to record every request with, None for no profiling
+        """
+        self.jira_url = jira_url
+        self.rate_limiter = RateLimiter(rate_limit)
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.profiler = profiler
+        self.statistics_lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.throttle_wait = 0.0
+        self.bytes_received = 0
+        self.bytes_decoded = 0
+        self.adapter = CountingAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+
+        self.session = requests.Session()
+        self.session.auth = HTTPBasicAuth(user_name, api_token)
+        self.session.headers.update({
+            "Accept": "application/json",
+            "Accept-Encoding": "gzip, deflate"
+        })
+        if ssl_certificate:
+            self.session.verify = ssl_certificate
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+
+    def get(self, url, params):
+        """Perform the GET request to the Jira server
+
+        :param url: the Jira URL relative to the base Jira URL for invoking the request
+        :param params: the parameters to be added to the Jira URL
+        :return: the complete response as returned from the Jira API
+        """
+        return self.request("GET", url, params=params)
+
+    def post(self, url, json_body):
+        """Perform the POST request to the Jira server
+
+        :param url: the Jira URL relative to the base Jira URL for invoking the request
+        :param json_body: the object to send as JSON body of the request
+        :return: the complete response as returned from the Jira API
+        """
+        return self.request("POST", url, json_body=json_body)
+
+    def request(self, method, url, params=None, json_body=None):
+        """Perform the request to the Jira server
+
+        :param method: the HTTP method of the request
+        :param url: the Jira URL relative to the base Jira URL for invoking the request
+        :param params: the parameters to be added to the Jira URL
+        :param json_body: the object to send as JSON body of the request
+        :return: the complete response as returned from the Jira API
+        """
+        attempt = 0
+        while True:
+            waited = self.rate_limiter.acquire()
+            start = time.perf_counter()
+            response = self.session.request(method, self.jira_url + url, params=params, json=json_body)
+            bytes_decoded = len(response.content)
+            bytes_received = response.raw.tell()
+            retried = response.status_code in RETRY_STATUS_CODES and attempt < self.max_retries
+            if self.profiler:
+                self.profiler.record_request(method, url, response.status_code, start, time.perf_counter() - start,
+                                             bytes_received, retried, response.headers.get(NODE_HEADER))
+
+            with self.statistics_lock:
+                self.requests += 1
+                self.throttle_wait += waited
+                self.bytes_received += bytes_received
+                self.bytes_decoded += bytes_decoded
+                if retried:
+                    self.retries += 1
+
+            if not retried:
+                break
+
+            self.rate_limiter.pause(self.retry_delay(response, attempt))
+            attempt += 1
+
+        response.raise_for_status()
+        return response
+
+    def retry_delay(self, response, attempt):
+        """
+        Determines the number of seconds to wait before retrying a throttled request
+        :param response: the response of the throttled request
+        :param attempt: the number of retries which already have been done for the request
+        :return: the time to wait as requested in the Retry-After header or else an exponential backoff with jitter
+        """
+        return get_retry_delay(response, attempt, self.backoff_factor)
+
+    def request_statistics(self):
+        """
+        Counts the requests which have been sent to the Jira server
+        :return: a dictionary containing the number of requests, retries, the seconds waited because of throttling and
+        the number of bytes received and decoded
+        """
+        with self.statistics_lock:
+            return {'requests': self.requests, 'retries': self.retries, 'throttle_wait': self.throttle_wait,
+                    'bytes_received': self.bytes_received, 'bytes_decoded': self.bytes_decoded}
+
+    def add_request_statistics(self, statistics):
+        """
+        Counts the requests which have been sent to the Jira server by another client, e.g. in another process
+        :param statistics: the request statistics of the other client
+        """
+        with self.statistics_lock:
+            self.requests += statistics['requests']
+            self.retries += statistics['retries']
+            self.throttle_wait += statistics['throttle_wait']
+            self.bytes_received += statistics['bytes_received']
+            self.bytes_decoded += statistics['bytes_decoded']
+
+    def connection_statistics(self):
+        """
+        Counts the connections to the Jira server which have been opened and which have been reused
+        :return: a dictionary containing the number of opened and reused connections
+        """
+        opened = 0
+        requests_sent = 0
+        pools = self.adapter.poolmanager.pools
+        for pool_key in pools.keys():
+            try:
+                pool = pools[pool_key]
+            except KeyError:
+                continue
+            opened += pool.num_connections
+            requests_sent += pool.num_requests
+
+        return {'opened': opened, 'reused': requests_sent - opened}
+
+    def close(self):
+        """
+        Closes all pooled connections to the Jira server
+        """
+        self.session.close()
@@ -1,148 +1,370 @@
 import argparse
+import asyncio
 import csv
+import heapq
+import importlib.util
+import itertools
 import json
-from datetime import datetime, timedelta
+import multiprocessing
+import os
+import subprocess
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import nullcontext
+from datetime import date, datetime
 from operator import attrgetter
 
 import requests
 import xlsxwriter as xlsxwriter
-from requests.auth import HTTPBasicAuth
 
-from issue import Issue
+import asyncjiratimereport
+from aggregation import aggregate_work_logs, parse_group_by, KeyPartCache, AGGREGATED_FIELD_NAMES
+from asyncjiraclient import AsyncJiraClient, httpx
+from checkpoint import CheckpointJournal
+from decoding import parse_date, set_json_backend, get_json_backend, json_backend, JSON_BACKENDS
+from enrichment import IssueEnricher, parse_fields, EPIC_LINK_FIELD
+from externalsort import external_sort
+from jiraclient import JiraClient, DEFAULT_MAX_RETRIES, DEFAULT_POOL_SIZE
+from profiling import Profiler
+from retrieval import author_ids_requests, convert_to_date, create_issue_jql, create_issue_page_query, \
+    create_lookup_batches, decode_response, get_author_id, issue_start_date_requests, issue_work_logs_requests, \
+    related_issues_requests, strip_order_by, user_id_requests, work_logs_requests, AuthorNotFoundError, IssuePages, \
+    MISSING_STATUS_CODES
+from sharding import split_date_range, split_into_chunks, SHARD_UNITS
 from worklog import WorkLog
+from worklogcache import WorkLogCache
 
 CSV_FILE_NAME = "jira-time-report.csv"
 EXCEL_COLUMN_WIDTH = 16
 EXCEL_FILE_NAME = "jira-time-report.xlsx"
+JSONL_FILE_NAME = "jira-time-report.jsonl"
+PARQUET_FILE_NAME = "jira-time-report.parquet"
+RECORD_BATCH_SIZE = 65536
+DEFAULT_SORT_BUFFER_SIZE = 100000
+CONSOLE_BUFFER_LINES = 4096
+TIME_COLUMNS = (3, 4, 5)
+DEFAULT_PAGER = "less -FRSX"
+WORK_LOG_LIST_MAX_IDS = 1000
+WORK_LOG_ORDER = attrgetter('author', 'started_ordinal', 'issue_key')
 FIELD_NAMES = ['author', 'date', 'issue', 'time_spent', 'original_estimate', 'total_time_spent', 'issue_start_date', 'issue_end_date', 'summary', 'parent', 'parent_summary']
 
 
-def get_request(jira_url, user_name, api_token, ssl_certificate, url, params):
-    """Perform the GET request to the Jira server
+def get_updated_issues(jira_url, user_name, api_token, project, from_date, to_date, ssl_certificate, client=None,
+                       jql=None, workers=1, page_size=None, authors=None, groups=None, enricher=None, journal=None):
+    """Retrieve the updated issues from Jira
+
+    Only the updated issues containing time spent and between the given from and to date are retrieved.
 
     :param jira_url: The base Jira URL
     :param user_name The user name to use for connecting to Jira
     :param api_token The API token to use for connecting to Jira
+    :param project The Jira project to retrieve the time report, a comma separated string or list of projects
+    :param from_date The date to start the time report, format yyyy-mm-dd
+    :param to_date The date to end the time report (the end date is inclusive), format yyyy-mm-dd
     :param ssl_certificate The location of the SSL certificate, needed in case of self-signed certificates
-    :param url: the complete Jira URL for invoking the request
-    :param params: the parameters to be added to the Jira URL
-    :return: the complete response as returned from the Jira API
+    :param client: the JiraClient to use, when omitted a client is created for the given connection parameters
+    :param jql: a list of JQL filters for retrieving issues in addition to the issues of the projects
+    :param workers: the maximum number of pages of issues which are retrieved concurrently
+    :param page_size: the number of issues to request per page, None for the default of Jira
+    :param authors: a list of account ids or user names, only issues with work logs of these authors are retrieved
+    :param groups: a list of Jira groups, only issues with work logs of members of these groups are retrieved
+    :param enricher: the IssueEnricher to retrieve the extra fields of the issues for, None for no extra fields
+    :param journal: the CheckpointJournal to take completed pages from and to record pages in, None for no checkpoint
+    :return: a list of issues
     """
-    auth = HTTPBasicAuth(user_name, api_token)
+    return list(iter_updated_issues(jira_url, user_name, api_token, project, from_date, to_date, ssl_certificate,
+                                    client, jql, workers, page_size, authors, groups, enricher, journal))
 
-    headers = {
-        "Accept": "application/json"
-    }
 
-    if ssl_certificate:
+def iter_updated_issues(jira_url, user_name, api_token, project, from_date, to_date, ssl_certificate, client=None,
+                        jql=None, workers=1, page_size=None, authors=None, groups=None, enricher=None, journal=None):
+    """Retrieve the updated issues from Jira page by page
 
-        response = requests.request(
-            "GET",
-            jira_url + url,
-            headers=headers,
-            params=params,
-            auth=auth,
-            verify=ssl_certificate
-        )
+    Only the updated issues containing time spent and between the given from and to date are retrieved. The issues of
+    all projects and JQL filters are retrieved by one search, so each issue is yielded once even when it matches more
+    than one filter. The first page tells how many issues match, the other pages are retrieved concurrently. The issues
+    of a page are yielded as soon as the page and the preceding pages have been retrieved.
 
-    else:
+    When issues start or stop matching during pagination, the issues on the later pages shift. Issues can then be
+    returned twice, which are yielded once, or be skipped. The pages overlap by one issue to detect the shifts, see
+    IssuePages, and after a shift the pages are retrieved once more one after another, yielding the issues which were
+    missed.
+
+    :param jira_url: The base Jira URL
+    :param user_name The user name to use for connecting to Jira
+    :param api_token The API token to use for connecting to Jira
+    :param project The Jira project to retrieve the time report, a comma separated string or list of projects
+    :param from_date The date to start the time report, format yyyy-mm-dd
+    :param to_date The date to end the time report (the end date is inclusive), format yyyy-mm-dd
+    :param ssl_certificate The location of the SSL certificate, needed in case of self-signed certificates
+    :param client: the JiraClient to use, when omitted a client is created for the given connection parameters
+    :param jql: a list of JQL filters for retrieving issues in addition to the issues of the projects
+    :param workers: the maximum number of pages of issues which are retrieved concurrently
+    :param page_size: the number of issues to request per page, None for the default of Jira
+    :param authors: a list of account ids or user names, only issues with work logs of these authors are retrieved
+    :param groups: a list of Jira groups, only issues with work logs of members of these groups are retrieved
+    :param enricher: the IssueEnricher to retrieve the extra fields of the issues for, None for no extra fields
+    :param journal: the CheckpointJournal to take completed pages from and to record pages in, None for no checkpoint
+    :return: a generator of issues
+    """
+    if client is None:
+        client = JiraClient(jira_url, user_name, api_token, ssl_certificate, max(workers, DEFAULT_POOL_SIZE))
+
+    issue_jql = create_issue_jql(project, jql, from_date, to_date, authors, groups)
+    pages = IssuePages(enricher)
+
+    def get_page(start_at):
+        page_json = journal.get_issue_page(start_at) if journal else None
+        if page_json is None:
+            page_json = get_issue_page(client, issue_jql, start_at, page_size,
+                                       enricher.search_fields if enricher else None)
+            if journal:
+                journal.put_issue_page(start_at, page_json)
+        return page_json
+
+    first_page_json = get_page(0)
+    start_ats = pages.get_start_ats(first_page_json)
+    for start_at, page_json in zip(itertools.chain([0], start_ats),
+                                   itertools.chain([first_page_json], ordered_map(get_page, start_ats, workers))):
+        yield from pages.add_page(start_at, page_json)
+
+    start_at = pages.get_rewalk_start_at()
+    while start_at is not None:
+        page_json = get_page(start_at)
+        yield from pages.add_page(start_at, page_json)
+        start_at = pages.get_next_rewalk_start_at(start_at, page_json)
+
+
+def get_issue_page(client, issue_jql, start_at, page_size, fields=None):
+    """Retrieve one page of issues from Jira
+
+    :param client: the JiraClient to use
+    :param issue_jql: the JQL of the issues to retrieve
+    :param start_at: the index of the first issue of the page
+    :param page_size: the number of issues to request, None for the default of Jira
+    :param fields: a list of ids of extra fields to retrieve, None for no extra fields
+    :return: the JSON response of Jira
+    """
+    response = client.get("/rest/api/2/search", create_issue_page_query(issue_jql, start_at, page_size, fields))
+    return decode_response(client, response)
+
+
+def perform(client, request_generator):
+    """Perform the requests of a request generator one after another
+
+    A request generator contains the logic of retrieving something which takes one or more requests, without performing
+    the requests itself, so the same logic is used by the sync and the async retrieval. It yields JiraRequests, is sent
+    the decoded JSON of each response and returns the result.
+
+    :param client: the JiraClient to use
+    :param request_generator: the request generator
+    :return: the result of the request generator
+    """
+    response_json = None
+    while True:
+        try:
+            jira_request = request_generator.send(response_json)
+        except StopIteration as stop:
+            return stop.value
+        try:
+            response = client.get(jira_request.url, jira_request.params)
+        except requests.HTTPError as error:
+            if jira_request.missing_ok and error.response is not None and \
+                    error.response.status_code in MISSING_STATUS_CODES:
+                response_json = None
+                continue
+            raise
+        response_json = decode_response(client, response)
+
+
+def enrich_issues(client, issues, enricher, workers=1):
+    """Add the extra fields of the issues, including the fields of their parents and epics
+
+    The parents and epics which have not been looked up before during the run are searched by their keys, in batches
+    of LOOKUP_BATCH_SIZE keys. The batches are searched concurrently.
+
+    :param client: the JiraClient to use
+    :param issues: the list of issues retrieved with the enricher
+    :param enricher: the IssueEnricher which has converted the issues
+    :param workers: the maximum number of batches which are searched concurrently
+    """
+    batches = create_lookup_batches(enricher, issues)
+
+    def search_batch(batch):
+        return fetch_related_issues(client, batch, enricher.related_fields)
+
+    for batch, issues_json in zip(batches, ordered_map(search_batch, batches, workers)):
+        enricher.add_related_issues(batch, issues_json)
+    for issue in issues:
+        enricher.enrich(issue)
 
-        response = requests.request(
-            "GET",
-            jira_url + url,
-            headers=headers,
-            params=params,
-            auth=auth
-        )
 
-    return response
+def fetch_related_issues(client, keys, fields):
+    """Search the parents or epics of issues by their keys
+
+    :param client: the JiraClient to use
+    :param keys: the list of keys to search
+    :param fields: the list of ids of the fields to retrieve
+    :return: the list of JSON issues found, the keys which do not exist are left out
+    """
+    return perform(client, related_issues_requests(keys, fields))
 
 
-def convert_to_date(to_date):
-    """Convert the to_date argument
+def get_work_logs(jira_url, user_name, api_token, from_date, to_date, ssl_certificate, issues, workers=1, client=None,
+                  cache=None, author_ids=None, narrow=False, journal=None):
+    """Retrieve the work logs from Jira
 
-    The to_date argument is an up and including date. The easiest way to cope with this, is to strip of the time and
-    to add one day to the given to_date. This will make it easier to use in queries.
+    All work logs from the list of issues are retrieved. Only the work logs which have been started between the from and
+    to date are used, the other work logs are not taken into account. The work logs of several issues can be retrieved
+    concurrently, the returned work logs are always in the same order as the list of issues.
 
+    :param jira_url: The base Jira URL
+    :param user_name The user name to use for connecting to Jira
+    :param api_token The API token to use for connecting to Jira
+    :param from_date The date to start the time report, format yyyy-mm-dd
     :param to_date The date to end the time report (the end date is inclusive), format yyyy-mm-dd
-    :return: the to_date plus one day at time 00:00:00
+    :param ssl_certificate The location of the SSL certificate, needed in case of self-signed certificates
+    :param issues: a list of issues
+    :param workers: the maximum number of issues for which the work logs are retrieved concurrently
+    :param client: the JiraClient to use, when omitted a client is created for the given connection parameters
+    :param cache: the WorkLogCache to use, when omitted the work logs of all issues are retrieved from Jira
+    :param author_ids: a set of account ids or user names, only the work logs of these authors are used, None for all
+    authors
+    :param narrow: whether to retrieve only the work logs started between the from and to date from Jira
+    :param journal: the CheckpointJournal to take completed issues from and to record issues in, None for no checkpoint
+    :return: the list of work logs which has been requested and the updated list of issues
     """
-    if to_date:
-        converted_to_date = datetime.strptime(to_date, "%Y-%m-%d") + timedelta(days=1)
-    else:
-        converted_to_date = datetime.now() + timedelta(days=1)
-    return converted_to_date
+    work_logs = list(iter_work_logs(jira_url, user_name, api_token, from_date, to_date, ssl_certificate, issues, workers,
+                                    client, cache, author_ids, narrow, journal))
+    return work_logs, issues
 
 
-def get_updated_issues(jira_url, user_name, api_token, project, from_date, to_date, ssl_certificate):
-    """Retrieve the updated issues from Jira
+def iter_work_logs(jira_url, user_name, api_token, from_date, to_date, ssl_certificate, issues, workers=1,
+                   client=None, cache=None, author_ids=None, narrow=False, journal=None):
+    """Retrieve the work logs from Jira issue by issue
 
-    Only the updated issues containing time spent and between the given from and to date are retrieved.
+    The same work logs as by get_work_logs are yielded, in the same order. The work logs of an issue are yielded as soon
+    as they and the work logs of the preceding issues have been retrieved. The issue start date of an issue is set
+    before its work logs are yielded.
 
     :param jira_url: The base Jira URL
     :param user_name The user name to use for connecting to Jira
     :param api_token The API token to use for connecting to Jira
-    :param project The Jira project to retrieve the time report
     :param from_date The date to start the time report, format yyyy-mm-dd
     :param to_date The date to end the time report (the end date is inclusive), format yyyy-mm-dd
     :param ssl_certificate The location of the SSL certificate, needed in case of self-signed certificates
-    :return: a list of issues
+    :param issues: an iterable of issues
+    :param workers: the maximum number of issues for which the work logs are retrieved concurrently
+    :param client: the JiraClient to use, when omitted a client is created for the given connection parameters
+    :param cache: the WorkLogCache to use, when omitted the work logs of all issues are retrieved from Jira
+    :param author_ids: a set of account ids or user names, only the work logs of these authors are used, None for all
+    authors
+    :param narrow: whether to retrieve only the work logs started between the from and to date from Jira
+    :param journal: the CheckpointJournal to take completed issues from and to record issues in, None for no checkpoint
+    :return: a generator of work logs
     """
+    if client is None:
+        client = JiraClient(jira_url, user_name, api_token, ssl_certificate, max(workers, DEFAULT_POOL_SIZE))
 
-    issues = []
-    start_at = 0
+    from_date = datetime.strptime(from_date, "%Y-%m-%d")
+    to_date = convert_to_date(to_date)
 
-    while True:
+    def get_work_logs_of_issue(issue):
+        issue_work_logs = journal.get_work_logs(issue) if journal else None
+        if issue_work_logs is None:
+            issue_work_logs = get_issue_work_logs(client, issue, from_date, to_date, cache, author_ids, narrow)
+            if journal:
+                journal.put_work_logs(issue, issue_work_logs)
+        return issue_work_logs
 
-        query = {
-            'jql': 'project = "' + project + '" and timeSpent is not null and worklogDate >= "' + from_date +
-                   '"' + ' and worklogDate < "' + convert_to_date(to_date).strftime("%Y-%m-%d") + '"',
-            'fields': 'id,key,summary,parent,timeoriginalestimate,timespent,resolutiondate',
-            'startAt': str(start_at)
-        }
+    for issue_work_logs in ordered_map(get_work_logs_of_issue, issues, workers):
+        yield from issue_work_logs
 
-        response = get_request(jira_url, user_name, api_token, ssl_certificate, "/rest/api/2/search", query)
-        response_json = json.loads(response.text)
-        issues.extend(convert_json_to_issues(response_json))
 
-        # Verify whether it is necessary to invoke the API request again because of pagination
-        total_number_of_issues = int(response_json['total'])
-        max_results = int(response_json['maxResults'])
-        max_number_of_issues_processed = start_at + max_results
-        if max_number_of_issues_processed < total_number_of_issues:
-            start_at = max_number_of_issues_processed
-        else:
-            break
+def ordered_map(function, items, workers):
+    """Apply a function to items concurrently and yield the results in the order of the items
+
+    At most twice the number of workers items are being processed or waiting to be yielded at the same time, so the
+    number of results kept in memory does not grow with the number of items.
+
+    :param function: the function to apply to each item
+    :param items: an iterable of items
+    :param workers: the maximum number of items to process concurrently
+    :return: a generator of the results
+    """
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = deque()
+        for item in items:
+            futures.append(executor.submit(function, item))
+            if len(futures) >= 2 * workers:
+                yield futures.popleft().result()
+        while futures:
+            yield futures.popleft().result()
+
+
+def get_issue_work_logs(client, issue, from_date, to_date, cache=None, author_ids=None, narrow=False):
+    """Retrieve the work logs of a single issue
+
+    The work logs are taken from the cache when the issue has not been updated since they were cached, otherwise they
+    are retrieved from Jira. The issue start date of the issue is set to the date of the first work log of the issue.
+
+    When narrowed, only the work logs started between the from and to date are retrieved from Jira. The from and to date
+    are local datetimes, while the date of a work log is the date in the time zone of its author, so the narrowed period
+    is widened by NARROW_MARGIN on both sides and the work logs are selected by date afterwards. The cache only
+    contains all work logs of issues, so it is not used for the work logs when narrowed, the issue start date is taken
+    from the cache or retrieved from Jira with a single work log instead.
+
+    :param client: the JiraClient to use
+    :param issue: the issue to retrieve the work logs for
+    :param from_date The datetime to start the time report
+    :param to_date The datetime to end the time report (exclusive)
+    :param cache: the WorkLogCache to use, None for always retrieving the work logs from Jira
+    :param author_ids: a set of account ids or user names, only the work logs of these authors are used, None for all
+    authors
+    :param narrow: whether to retrieve only the work logs started between the from and to date from Jira
+    :return: the list of work logs of the issue which have been started between the from and to date
+    """
+    return perform(client, issue_work_logs_requests(issue, from_date, to_date, cache, author_ids, narrow))
 
-    return issues
 
+def get_issue_start_date(client, issue, cache=None):
+    """Retrieve the date of the first work log of a single issue
 
-def convert_json_to_issues(response_json):
+    The date is taken from the cache when the issue has not been updated since it was cached, otherwise only the first
+    work log of the issue is retrieved from Jira, which returns the work logs in the order they have been started.
+
+    :param client: the JiraClient to use
+    :param issue: the issue to retrieve the date of the first work log for
+    :param cache: the WorkLogCache to use, None for always retrieving the date from Jira
+    :return: the datetime of the first work log, None if the issue has no work logs
     """
-    Convert JSON issues into Issue objects
-    :param response_json: the JSON text as received from Jira
-    :return: a list of Issues
+    return perform(client, issue_start_date_requests(issue, cache))
+
+
+def fetch_issue_work_logs(client, issue_key, started_after=None, started_before=None):
+    """Retrieve all work logs of a single issue from Jira
+
+    :param client: the JiraClient to use
+    :param issue_key: the key of the issue to retrieve the work logs for
+    :param started_after: the datetime from which the work logs are retrieved, None for all work logs
+    :param started_before: the datetime before which the work logs are retrieved, None for all work logs
+    :return: the list of all work logs of the issue in the order returned by Jira
     """
-    issues = []
-    for issue_json in response_json['issues']:
-        resolution_date = issue_json['fields']['resolutiondate']
-        issues.append(Issue(int(issue_json['id']),
-                            issue_json['key'],
-                            issue_json['fields']['summary'],
-                            issue_json['fields']['parent']['key'] if 'parent' in issue_json['fields'] else None,
-                            issue_json['fields']['parent']['fields']['summary'] if 'parent' in issue_json['fields'] else None,
-                            issue_json['fields']['timeoriginalestimate'],
-                            issue_json['fields']['timespent'],
-                            datetime.strptime(resolution_date[0:10], "%Y-%m-%d") if resolution_date is not None else None))
+    return perform(client, work_logs_requests(issue_key, started_after, started_before))
 
-    return issues
 
+def get_work_logs_bulk(jira_url, user_name, api_token, from_date, to_date, ssl_certificate, issues, workers=1,
+                       client=None, author_ids=None):
+    """Retrieve the work logs from Jira by means of the bulk work log API
 
-def get_work_logs(jira_url, user_name, api_token, from_date, to_date, ssl_certificate, issues):
-    """Retrieve the work logs from Jira
+    Instead of retrieving the work logs per issue, the ids of all work logs updated since the from date are retrieved
+    and the work logs are retrieved in batches of 1000. The number of requests therefore depends on the number of work
+    logs instead of the number of issues. Only the work logs of the given issues which have been started between the
+    from and to date are used. The work logs are returned in the same order as by get_work_logs.
 
-    All work logs from the list of issues are retrieved. Only the work logs which have been started between the from and
-    to date are used, the other work logs are not taken into account.
+    As only work logs updated since the from date are retrieved, the issue start date is the date of the first of these
+    work logs, which can be later than the date of the first work log of the issue.
 
     :param jira_url: The base Jira URL
     :param user_name The user name to use for connecting to Jira
@@ -151,48 +373,257 @@ def get_work_logs(jira_url, user_name, api_token, from_date, to_date, ssl_certif
     :param to_date The date to end the time report (the end date is inclusive), format yyyy-mm-dd
     :param ssl_certificate The location of the SSL certificate, needed in case of self-signed certificates
     :param issues: a list of issues
+    :param workers: the maximum number of batches of work logs which are retrieved concurrently
+    :param client: the JiraClient to use, when omitted a client is created for the given connection parameters
+    :param author_ids: a set of account ids or user names, only the work logs of these authors are used, None for all
+    authors
     :return: the list of work logs which has been requested and the updated list of issues
     """
-    work_logs = []
+    if client is None:
+        client = JiraClient(jira_url, user_name, api_token, ssl_certificate, max(workers, DEFAULT_POOL_SIZE))
+
     from_date = datetime.strptime(from_date, "%Y-%m-%d")
     to_date = convert_to_date(to_date)
 
+    work_log_ids = get_updated_work_log_ids(client, int(from_date.timestamp() * 1000))
+    batches = [work_log_ids[i:i + WORK_LOG_LIST_MAX_IDS] for i in range(0, len(work_log_ids), WORK_LOG_LIST_MAX_IDS)]
+
+    def get_work_log_batch(ids):
+        response = client.post("/rest/api/2/worklog/list", {'ids': ids})
+        return decode_response(client, response)
+
+    issues_by_id = {str(issue.issue_id): issue for issue in issues}
+    work_logs_json_by_issue_id = {}
+    for work_logs_json in ordered_map(get_work_log_batch, batches, workers):
+        for work_log_json in work_logs_json:
+            if work_log_json['issueId'] in issues_by_id:
+                work_logs_json_by_issue_id.setdefault(work_log_json['issueId'], []).append(work_log_json)
+
+    work_logs = []
     for issue in issues:
-        start_at = 0
-        while True:
-            params = {
-                'startAt': str(start_at)
-            }
-
-            url = "/rest/api/2/issue/" + issue.key + "/worklog/"
-            response = get_request(jira_url, user_name, api_token, ssl_certificate, url, params)
-            response_json = json.loads(response.text)
-            work_logs_json = response_json['worklogs']
-
-            for work_log_json in work_logs_json:
-                started = work_log_json['started']
-                started_date = datetime.strptime(started[0:10], "%Y-%m-%d")
-                if issue.issue_start_date is None:
-                    issue.issue_start_date = started_date
-                if from_date <= started_date < to_date:
-                    author_json = work_log_json['author']
-                    work_logs.append(WorkLog(issue.key,
-                                             started_date,
-                                             int(work_log_json['timeSpentSeconds']),
-                                             author_json['displayName']))
-
-            # Verify whether it is necessary to invoke the API request again because of pagination
-            total_number_of_issues = int(response_json['total'])
-            max_results = int(response_json['maxResults'])
-            max_number_of_issues_processed = start_at + max_results
-            if max_number_of_issues_processed < total_number_of_issues:
-                start_at = max_number_of_issues_processed
-            else:
-                break
+        issue_work_logs_json = work_logs_json_by_issue_id.get(str(issue.issue_id), [])
+        # Order the work logs like Jira does when retrieving the work logs of an issue
+        issue_work_logs_json.sort(key=lambda work_log_json: (
+            datetime.strptime(work_log_json['started'], "%Y-%m-%dT%H:%M:%S.%f%z"), int(work_log_json['id'])))
+
+        for work_log_json in issue_work_logs_json:
+            started_date = parse_date(work_log_json['started'])
+            if issue.issue_start_date is None:
+                issue.issue_start_date = started_date
+            author_id = get_author_id(work_log_json['author'])
+            if from_date <= started_date < to_date and (author_ids is None or author_id in author_ids):
+                work_logs.append(WorkLog(issue.key,
+                                         started_date,
+                                         int(work_log_json['timeSpentSeconds']),
+                                         work_log_json['author']['displayName'],
+                                         author_id))
 
     return work_logs, issues
 
 
+def get_work_logs_sharded(jira_url, user_name, api_token, project, from_date, to_date, ssl_certificate, shard_by,
+                          processes=None, jql=None, workers=1, page_size=None, authors=None, groups=None,
+                          author_ids=None, enricher=None, client=None, cache=None, narrow=False, rate_limit=None,
+                          max_retries=DEFAULT_MAX_RETRIES):
+    """Retrieve the issues and work logs from Jira per month or week in parallel processes
+
+    The period of the time report is split into shards by split_date_range and every shard searches the issues with
+    work logs in its period in a process. An issue with work logs in more than one shard is found by each of these
+    searches, so the issues are deduplicated: as soon as the search of a shard is done, the work logs of the issues
+    which no earlier shard has found are retrieved for the whole period, in chunks spread over the processes. The work
+    logs of an issue therefore are retrieved once, however many shards it spans. Every process sorts the work logs of
+    its chunk in WORK_LOG_ORDER and the chunks are merged lazily by a k-way merge. The work logs which are equal in
+    WORK_LOG_ORDER belong to the same issue and thereby to the same chunk, so they are in the same order as after the
+    sort of process_work_logs, which therefore is skipped by means of presorted.
+
+    :param jira_url: The base Jira URL
+    :param user_name The user name to use for connecting to Jira
+    :param api_token The API token to use for connecting to Jira
+    :param project The Jira project to retrieve the time report, a comma separated string or list of projects
+    :param from_date The date to start the time report, format yyyy-mm-dd
+    :param to_date The date to end the time report (the end date is inclusive), format yyyy-mm-dd
+    :param ssl_certificate The location of the SSL certificate, needed in case of self-signed certificates
+    :param shard_by: the length of a shard, month or week
+    :param processes: the maximum number of shards or chunks which are retrieved concurrently, None for the number of
+    CPUs
+    :param jql: a list of JQL filters for retrieving issues in addition to the issues of the projects
+    :param workers: the maximum number of pages of issues or issues retrieved concurrently by each process
+    :param page_size: the number of issues to request per page, None for the default of Jira
+    :param authors: a list of account ids or user names, only issues with work logs of these authors are retrieved
+    :param groups: a list of Jira groups, only issues with work logs of members of these groups are retrieved
+    :param author_ids: a set of account ids or user names, only the work logs of these authors are used, None for all
+    authors
+    :param enricher: the IssueEnricher to retrieve the extra fields of the issues for, the parents and epics still have
+    to be added by enrich_issues, None for no extra fields
+    :param client: the JiraClient to add the request statistics of the processes to, None for not counting them
+    :param cache: the WorkLogCache whose directory the processes use and to add their statistics to, None for no cache
+    :param narrow: whether to retrieve only the work logs started between the from and to date from Jira
+    :param rate_limit: the maximum number of requests per second of all processes together, None for no limit
+    :param max_retries: the maximum number of retries of a request which is throttled by Jira
+    :return: an iterator of the sorted work logs and the list of issues
+    """
+    shards = split_date_range(from_date, to_date, shard_by)
+    processes = processes or os.cpu_count() or 1
+    rate_limit = rate_limit / processes if rate_limit else None
+    cache_dir = cache.cache_dir if cache else None
+    cache_ttl = cache.ttl if cache_dir else None
+    connection = (jira_url, user_name, api_token, ssl_certificate, workers, rate_limit, max_retries,
+                  get_json_backend())
+
+    def add_statistics(request_statistics, cache_statistics=None):
+        if client:
+            client.add_request_statistics(request_statistics)
+        if cache_dir and cache_statistics:
+            cache.add_statistics(cache_statistics)
+
+    issue_keys = set()
+    chunk_futures = []
+    # The processes are spawned, so that the connections and threads of this process are not inherited
+    with ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn")) as executor:
+        search_futures = [executor.submit(search_shard, connection, project, shard_from_date, shard_to_date, jql,
+                                          page_size, authors, groups, enricher)
+                          for shard_from_date, shard_to_date in shards]
+        for search_future in search_futures:
+            shard_issues, epic_keys, request_statistics = search_future.result()
+            add_statistics(request_statistics)
+            if enricher:
+                enricher.epic_keys.update(epic_keys)
+            new_issues = [issue for issue in shard_issues if issue.key not in issue_keys]
+            issue_keys.update(issue.key for issue in new_issues)
+            chunk_futures.extend(executor.submit(retrieve_chunk_work_logs, connection, from_date, to_date, chunk,
+                                                 author_ids, narrow, cache_dir, cache_ttl)
+                                 for chunk in split_into_chunks(new_issues, processes))
+
+        issues = []
+        sorted_chunks = []
+        for chunk_future in chunk_futures:
+            chunk_issues, chunk_work_logs, request_statistics, cache_statistics = chunk_future.result()
+            add_statistics(request_statistics, cache_statistics)
+            issues.extend(chunk_issues)
+            sorted_chunks.append(chunk_work_logs)
+
+    return heapq.merge(*sorted_chunks, key=WORK_LOG_ORDER), issues
+
+
+def search_shard(connection, project, from_date, to_date, jql=None, page_size=None, authors=None, groups=None,
+                 enricher=None):
+    """Search the issues of one shard, run in a process of get_work_logs_sharded
+
+    :param connection: the Jira URL, user name, API token, SSL certificate, number of workers, rate limit, maximum
+    number of retries and JSON backend of the process
+    :param project The Jira project to retrieve the time report, a comma separated string or list of projects
+    :param from_date The date to start the shard, format yyyy-mm-dd
+    :param to_date The date to end the shard (the end date is inclusive), format yyyy-mm-dd
+    :param jql: a list of JQL filters for retrieving issues in addition to the issues of the projects
+    :param page_size: the number of issues to request per page, None for the default of Jira
+    :param authors: a list of account ids or user names, only issues with work logs of these authors are retrieved
+    :param groups: a list of Jira groups, only issues with work logs of members of these groups are retrieved
+    :param enricher: the IssueEnricher to retrieve the extra fields of the issues for, None for no extra fields
+    :return: the list of issues, the epic keys of the issues by issue key and the request statistics
+    """
+    jira_url, user_name, api_token, ssl_certificate, workers, _, _, _ = connection
+    client = create_shard_client(connection)
+    try:
+        issues = get_updated_issues(jira_url, user_name, api_token, project, from_date, to_date, ssl_certificate,
+                                    client, jql, workers, page_size, authors, groups, enricher)
+        return issues, enricher.epic_keys if enricher else {}, client.request_statistics()
+    finally:
+        client.close()
+
+
+def retrieve_chunk_work_logs(connection, from_date, to_date, issues, author_ids=None, narrow=False, cache_dir=None,
+                             cache_ttl=None):
+    """Retrieve the work logs of a chunk of issues and sort them, run in a process of get_work_logs_sharded
+
+    :param connection: the Jira URL, user name, API token, SSL certificate, number of workers, rate limit, maximum
+    number of retries and JSON backend of the process
+    :param from_date The date to start the time report, format yyyy-mm-dd
+    :param to_date The date to end the time report (the end date is inclusive), format yyyy-mm-dd
+    :param issues: the list of issues
+    :param author_ids: a set of account ids or user names, only the work logs of these authors are used, None for all
+    authors
+    :param narrow: whether to retrieve only the work logs started between the from and to date from Jira
+    :param cache_dir: the directory of the WorkLogCache to use, None for no cache
+    :param cache_ttl: the number of seconds after which cached work logs expire, None if they never expire
+    :return: the list of issues with their issue start dates, the list of work logs sorted in WORK_LOG_ORDER, the
+    request statistics and the cache statistics, None without cache
+    """
+    jira_url, user_name, api_token, ssl_certificate, workers, _, _, _ = connection
+    client = create_shard_client(connection)
+    # The other processes write to the same cache directory, every issue is committed so that none of them waits for
+    # the work logs of the issues which this process still retrieves
+    cache = WorkLogCache(cache_dir, jira_url, cache_ttl, commit_interval=1) if cache_dir else None
+    try:
+        work_logs, issues = get_work_logs(jira_url, user_name, api_token, from_date, to_date, ssl_certificate, issues,
+                                          workers, client, cache, author_ids, narrow)
+        work_logs.sort(key=WORK_LOG_ORDER)
+        return issues, work_logs, client.request_statistics(), cache.statistics() if cache else None
+    finally:
+        if cache:
+            cache.close()
+        client.close()
+
+
+def create_shard_client(connection):
+    """
+    Creates the JiraClient of a process of get_work_logs_sharded and selects the JSON backend of the process
+    :param connection: the Jira URL, user name, API token, SSL certificate, number of workers, rate limit, maximum
+    number of retries and JSON backend of the process
+    :return: the JiraClient
+    """
+    jira_url, user_name, api_token, ssl_certificate, workers, rate_limit, max_retries, backend = connection
+    set_json_backend(backend)
+    return JiraClient(jira_url, user_name, api_token, ssl_certificate, max(workers, DEFAULT_POOL_SIZE), rate_limit,
+                      max_retries)
+
+
+def get_author_ids(client, authors=None, groups=None):
+    """Retrieve the ids of authors and of the members of groups
+
+    Display names are not unique, so the work logs of the authors are recognized by the account id of their author on
+    Jira Cloud or else by the user name, see get_author_id.
+
+    :param client: the JiraClient to use
+    :param authors: a list of account ids or user names
+    :param groups: a list of Jira groups
+    :return: the set of account ids or user names
+    :raise AuthorNotFoundError: when an author or group does not exist
+    """
+    return perform(client, author_ids_requests(authors, groups))
+
+
+def get_user_id(client, author):
+    """
+    Retrieves the id of a user, by account id on Jira Cloud or else by user name
+    :param client: the JiraClient to use
+    :param author: the account id or user name
+    :return: the account id or user name, see get_author_id
+    :raise AuthorNotFoundError: when the user does not exist
+    """
+    return perform(client, user_id_requests(author))
+
+
+def get_updated_work_log_ids(client, since):
+    """Retrieve the ids of the work logs which have been updated since the given time
+
+    :param client: the JiraClient to use
+    :param since: the time in milliseconds since the epoch
+    :return: the list of work log ids
+    """
+    work_log_ids = []
+    while True:
+        response = client.get("/rest/api/2/worklog/updated", {'since': str(since)})
+        response_json = decode_response(client, response)
+        work_log_ids.extend(value['worklogId'] for value in response_json['values'])
+
+        # Verify whether it is necessary to invoke the API request again because of pagination
+        if response_json.get('lastPage', True):
+            break
+        since = response_json['until']
+
+    return work_log_ids
+
+
 def format_optional_time_field(field, empty_field):
     """
     Formats the given time field
@@ -221,43 +652,136 @@ def format_optional_date_field(field, empty_field):
     return field.strftime('%Y-%m-%d') if field is not None else empty_field
 
 
-def output_to_console(issues, work_logs):
-    """Print the work logs to the console
+def output_to_console(issue_index, work_logs, file=None, extra_field_names=(), table=False):
+    """Print the work logs to the console, followed by the extra fields of the issues
 
-    :param issues: the list of issues which must be printed
+    The columns of an issue, the dates and the times are formatted once and the lines are written in blocks of
+    CONSOLE_BUFFER_LINES lines. As a table, the columns are aligned and the time columns are aligned to the right. The
+    column widths are tracked while formatting, like for the Excel file, so all lines are kept in memory until the
+    widths are known.
+
+    :param issue_index: the issues which must be printed by issue key
     :param work_logs: the list of work logs which must be printed
+    :param file: the text stream to print to, None for stdout
+    :param extra_field_names: the names of the extra fields of the issues, the header of the table
+    :param table: whether to print an aligned table instead of lines separated by semicolons
+    """
+    file = file if file is not None else sys.stdout
+    header = FIELD_NAMES + list(extra_field_names)
+    widths = [len(field_name) for field_name in header]
+
+    def format_issue_columns(issue_key):
+        work_log_issue = issue_index[issue_key]
+        columns = (format_optional_time_field(work_log_issue.original_estimate, ""),
+                   format_optional_time_field(work_log_issue.time_spent, ""),
+                   format_optional_date_field(work_log_issue.issue_start_date, ""),
+                   format_optional_date_field(work_log_issue.issue_end_date, ""),
+                   work_log_issue.summary,
+                   str(work_log_issue.parent_key) if work_log_issue.parent_key is not None else "",
+                   str(work_log_issue.parent_summary) if work_log_issue.parent_summary is not None else "") + \
+            tuple(value if value is not None else "" for value in work_log_issue.extra_fields)
+        if table:
+            return columns
+        return ";".join(columns)
+
+    def format_author(author):
+        widths[0] = max(widths[0], len(author))
+        return author
+
+    def format_date(started_ordinal):
+        formatted_date = date.fromordinal(started_ordinal).strftime('%Y-%m-%d')
+        widths[1] = max(widths[1], len(formatted_date))
+        return formatted_date
+
+    def format_time(time_spent):
+        formatted_time = format_optional_time_field(time_spent, "")
+        widths[3] = max(widths[3], len(formatted_time))
+        return formatted_time
+
+    issue_columns = KeyPartCache(format_issue_columns)
+    authors = KeyPartCache(format_author)
+    dates = KeyPartCache(format_date)
+    times = KeyPartCache(format_time)
+
+    file.write("\nThe Jira time report\n====================\n")
+    if table:
+        rows = [(authors[work_log.author], dates[work_log.started_ordinal], work_log.issue_key,
+                 times[work_log.time_spent]) for work_log in work_logs]
+        for issue_key in {issue_key for _, _, issue_key, _ in rows}:
+            widths[2] = max(widths[2], len(issue_key))
+            update_column_widths(widths, issue_columns[issue_key], 4)
+        # The widths are known now, the columns are padded once per author, issue and time
+        padded_authors = KeyPartCache(lambda author: author.ljust(widths[0]))
+        padded_issue_keys = KeyPartCache(lambda issue_key: issue_key.ljust(widths[2]))
+        padded_times = KeyPartCache(lambda formatted_time: formatted_time.rjust(widths[3]))
+        padded_issue_columns = KeyPartCache(lambda issue_key: format_table_row(issue_columns[issue_key], widths[4:],
+                                                                               (0, 1)))
+        write_console_lines(file, itertools.chain([format_table_row(header, widths, TIME_COLUMNS),
+                                                   format_table_row(["-" * width for width in widths], widths)],
+                                                  (padded_authors[author] + "  " + started + "  " +
+                                                   padded_issue_keys[issue_key] + "  " + padded_times[time_spent] +
+                                                   "  " + padded_issue_columns[issue_key]
+                                                   for author, started, issue_key, time_spent in rows)))
+    else:
+        write_console_lines(file, (work_log.author + ";" + dates[work_log.started_ordinal] + ";" +
+                                   work_log.issue_key + ";" + times[work_log.time_spent] + ";" +
+                                   issue_columns[work_log.issue_key] for work_log in work_logs))
+
+
+def update_column_widths(widths, columns, first_column=0):
+    """
+    Widens the columns of a table to fit a row
+    :param widths: the list of column widths to update
+    :param columns: the texts of the columns of the row
+    :param first_column: the index of the column of the first text
     """
-    print("\nThe Jira time report")
-    print("====================")
-    for work_log in work_logs:
-        work_log_issue = next((issue for issue in issues if issue.key == work_log.issue_key), None)
-        print(work_log.author + ";" +
-              work_log.started.strftime('%Y-%m-%d') + ";" +
-              work_log.issue_key + ";" +
-              format_optional_time_field(work_log.time_spent, "") + ";" +
-              format_optional_time_field(work_log_issue.original_estimate, "") + ";" +
-              format_optional_time_field(work_log_issue.time_spent, "") + ";" +
-              format_optional_date_field(work_log_issue.issue_start_date, "") + ";" +
-              format_optional_date_field(work_log_issue.issue_end_date, "") + ";" +
-              work_log_issue.summary + ";" +
-              (str(work_log_issue.parent_key) if work_log_issue.parent_key is not None else "") + ";" +
-              (str(work_log_issue.parent_summary) if work_log_issue.parent_summary is not None else ""))
-
-
-def output_to_csv(issues, work_logs):
+    for index, column in enumerate(columns, first_column):
+        if widths[index] < len(column):
+            widths[index] = len(column)
+
+
+def format_table_row(columns, widths, right_aligned_columns=()):
+    """
+    Formats a row of an aligned table, the columns are separated by two spaces and the line does not end with spaces
+    :param columns: the texts of the columns of the row
+    :param widths: the widths of the columns
+    :param right_aligned_columns: the indexes of the columns to align to the right
+    :return: the line
+    """
+    return "  ".join(column.rjust(width) if index in right_aligned_columns else column.ljust(width)
+                     for index, (column, width) in enumerate(zip(columns, widths))).rstrip()
+
+
+def write_console_lines(file, lines):
+    """
+    Writes lines to a text stream in blocks, so that a large report is not written line by line
+    :param file: the text stream to write to
+    :param lines: an iterable of lines without line separators
+    """
+    lines = iter(lines)
+    block = list(itertools.islice(lines, CONSOLE_BUFFER_LINES))
+    while block:
+        block.append("")
+        file.write("\n".join(block))
+        block = list(itertools.islice(lines, CONSOLE_BUFFER_LINES))
+
+
+def output_to_csv(issue_index, work_logs, file_name=CSV_FILE_NAME, extra_field_names=()):
     """Print the work logs to a CSV file
 
-    :param issues: the list of issues which must be printed
+    :param issue_index: the issues which must be printed by issue key
     :param work_logs: the list of work logs which must be printed
+    :param file_name: the name of the CSV file
+    :param extra_field_names: the names of the extra fields of the issues
     """
-    with open(CSV_FILE_NAME, 'w', newline='') as csvfile:
+    with open(file_name, 'w', newline='') as csvfile:
 
-        writer = csv.DictWriter(csvfile, fieldnames=FIELD_NAMES, dialect=csv.unix_dialect)
+        writer = csv.DictWriter(csvfile, fieldnames=FIELD_NAMES + list(extra_field_names), dialect=csv.unix_dialect)
 
         writer.writeheader()
 
         for work_log in work_logs:
-            work_log_issue = next((issue for issue in issues if issue.key == work_log.issue_key), None)
+            work_log_issue = issue_index[work_log.issue_key]
             writer.writerow({FIELD_NAMES[0]: work_log.author,
                              FIELD_NAMES[1]: work_log.started.strftime('%Y-%m-%d'),
                              FIELD_NAMES[2]: work_log.issue_key,
@@ -268,21 +792,26 @@ def output_to_csv(issues, work_logs):
                              FIELD_NAMES[7]: format_optional_date_field(work_log_issue.issue_end_date, None),
                              FIELD_NAMES[8]: work_log_issue.summary,
                              FIELD_NAMES[9]: work_log_issue.parent_key,
-                             FIELD_NAMES[10]: work_log_issue.parent_summary})
+                             FIELD_NAMES[10]: work_log_issue.parent_summary,
+                             **dict(zip(extra_field_names, work_log_issue.extra_fields))})
 
 
-def write_excel_header(worksheet):
+def write_excel_header(worksheet, extra_field_names=()):
     """
     Writes a column header to the Excel file
     :param worksheet: The worksheet to write the header to
+    :param extra_field_names: the names of the extra fields of the issues
     """
     cell_number = 0
-    for field_name in FIELD_NAMES:
+    for field_name in FIELD_NAMES + list(extra_field_names):
         worksheet.write(0, cell_number, field_name)
         cell_number += 1
+    if extra_field_names:
+        worksheet.set_column(len(FIELD_NAMES), len(FIELD_NAMES) + len(extra_field_names) - 1, EXCEL_COLUMN_WIDTH)
 
 
-def set_excel_column_width(worksheet, author_column_width, summary_column_width, parent_summary_column_width):
+def set_excel_column_width(worksheet, author_column_width, summary_column_width, parent_summary_column_width,
+                           date_format=None, time_format=None):
     """
     Sets the Excel column width in order to simulate auto column width
 
@@ -290,23 +819,33 @@ def set_excel_column_width(worksheet, author_column_width, summary_column_width,
     :param author_column_width: The column width of the author column
     :param summary_column_width: The column width of the summary column
     :param parent_summary_column_width: The column width of the parent_summary column
+    :param date_format: The format of the date columns, None for date columns containing text
+    :param time_format: The format of the time columns, None for the formats of the cells only
     """
     worksheet.set_column('A:A', author_column_width)
-    worksheet.set_column('B:H', EXCEL_COLUMN_WIDTH)
+    if date_format is None and time_format is None:
+        worksheet.set_column('B:H', EXCEL_COLUMN_WIDTH)
+    else:
+        worksheet.set_column('B:B', EXCEL_COLUMN_WIDTH, date_format)
+        worksheet.set_column('C:C', EXCEL_COLUMN_WIDTH)
+        worksheet.set_column('D:F', EXCEL_COLUMN_WIDTH, time_format)
+        worksheet.set_column('G:H', EXCEL_COLUMN_WIDTH, date_format)
     worksheet.set_column('I:I', summary_column_width)
     worksheet.set_column('J:J', EXCEL_COLUMN_WIDTH)
     worksheet.set_column('K:K', parent_summary_column_width)
 
 
-def output_to_excel(issues, work_logs):
+def output_to_excel(issue_index, work_logs, file_name=EXCEL_FILE_NAME, extra_field_names=()):
     """Print the work logs to an Excel file
 
-    :param issues: the list of issues which must be printed
+    :param issue_index: the issues which must be printed by issue key
     :param work_logs: the list of work logs which must be printed
+    :param file_name: the name of the Excel file
+    :param extra_field_names: the names of the extra fields of the issues
     """
-    with xlsxwriter.Workbook(EXCEL_FILE_NAME) as workbook:
+    with xlsxwriter.Workbook(file_name) as workbook:
         worksheet = workbook.add_worksheet()
-        write_excel_header(worksheet)
+        write_excel_header(worksheet, extra_field_names)
 
         row = 1
         time_format = workbook.add_format({'num_format': '[h]:mm:ss;@'})
@@ -315,7 +854,7 @@ def output_to_excel(issues, work_logs):
         parent_summary_column_width = 0
 
         for work_log in work_logs:
-            work_log_issue = next((issue for issue in issues if issue.key == work_log.issue_key), None)
+            work_log_issue = issue_index[work_log.issue_key]
             worksheet.write(row, 0, work_log.author)
             worksheet.write(row, 1, work_log.started.strftime('%Y-%m-%d'))
             worksheet.write(row, 2, work_log.issue_key)
@@ -327,6 +866,8 @@ def output_to_excel(issues, work_logs):
             worksheet.write(row, 8, work_log_issue.summary)
             worksheet.write(row, 9, work_log_issue.parent_key)
             worksheet.write(row, 10, work_log_issue.parent_summary)
+            if work_log_issue.extra_fields:
+                worksheet.write_row(row, len(FIELD_NAMES), work_log_issue.extra_fields)
 
             if author_column_width < len(work_log.author):
                 author_column_width = len(work_log.author)
@@ -340,23 +881,381 @@ def output_to_excel(issues, work_logs):
         set_excel_column_width(worksheet, author_column_width, summary_column_width, parent_summary_column_width)
 
 
-def process_work_logs(output, issues, work_logs):
+def output_to_streaming_excel(issue_index, work_logs, file_name=EXCEL_FILE_NAME, extra_field_names=()):
+    """Print the work logs to an Excel file while keeping only one row in memory
+
+    Each row is written at once and flushed to disk when the next row is written. The dates are written as Excel dates
+    and the date and time formats are set on the columns, so the cells do not need a format of their own.
+
+    :param issue_index: the issues which must be printed by issue key
+    :param work_logs: the list of work logs which must be printed
+    :param file_name: the name of the Excel file
+    :param extra_field_names: the names of the extra fields of the issues
+    """
+    with xlsxwriter.Workbook(file_name, {'constant_memory': True}) as workbook:
+        worksheet = workbook.add_worksheet()
+        date_format = workbook.add_format({'num_format': 'yyyy-mm-dd'})
+        time_format = workbook.add_format({'num_format': '[h]:mm:ss;@'})
+        # The column formats must be known before the rows are written, the widths are only known afterwards
+        set_excel_column_width(worksheet, EXCEL_COLUMN_WIDTH, EXCEL_COLUMN_WIDTH, EXCEL_COLUMN_WIDTH, date_format,
+                               time_format)
+        write_excel_header(worksheet, extra_field_names)
+
+        author_column_width = 0
+        summary_column_width = 0
+        parent_summary_column_width = 0
+
+        for row, work_log in enumerate(work_logs, 1):
+            work_log_issue = issue_index[work_log.issue_key]
+            worksheet.write_row(row, 0, (work_log.author,
+                                         work_log.started,
+                                         work_log.issue_key,
+                                         (work_log.time_spent / 86400) if work_log.time_spent else None,
+                                         (work_log_issue.original_estimate / 86400) if work_log_issue.original_estimate else None,
+                                         (work_log_issue.time_spent / 86400) if work_log_issue.time_spent else None,
+                                         work_log_issue.issue_start_date,
+                                         work_log_issue.issue_end_date,
+                                         work_log_issue.summary,
+                                         work_log_issue.parent_key,
+                                         work_log_issue.parent_summary) + work_log_issue.extra_fields)
+
+            if author_column_width < len(work_log.author):
+                author_column_width = len(work_log.author)
+            if summary_column_width < len(work_log_issue.summary):
+                summary_column_width = len(work_log_issue.summary)
+            if work_log_issue.parent_summary is not None and parent_summary_column_width < len(work_log_issue.parent_summary):
+                parent_summary_column_width = len(work_log_issue.parent_summary)
+
+        set_excel_column_width(worksheet, author_column_width, summary_column_width, parent_summary_column_width,
+                               date_format, time_format)
+
+
+def output_to_jsonl(issue_index, work_logs, file_name=JSONL_FILE_NAME, extra_field_names=()):
+    """Print the work logs to a JSON Lines file
+
+    Every work log is written as a JSON object on a line of its own, with the time fields as integer seconds and the
+    dates in format yyyy-mm-dd.
+
+    :param issue_index: the issues which must be printed by issue key
+    :param work_logs: the list of work logs which must be printed
+    :param file_name: the name of the JSON Lines file
+    :param extra_field_names: the names of the extra fields of the issues
+    """
+    with open(file_name, 'w', encoding='utf-8', newline='\n') as jsonl_file:
+        for work_log in work_logs:
+            work_log_issue = issue_index[work_log.issue_key]
+            jsonl_file.write(json.dumps({FIELD_NAMES[0]: work_log.author,
+                                         FIELD_NAMES[1]: work_log.started.strftime('%Y-%m-%d'),
+                                         FIELD_NAMES[2]: work_log.issue_key,
+                                         FIELD_NAMES[3]: work_log.time_spent,
+                                         FIELD_NAMES[4]: work_log_issue.original_estimate,
+                                         FIELD_NAMES[5]: work_log_issue.time_spent,
+                                         FIELD_NAMES[6]: format_optional_date_field(work_log_issue.issue_start_date, None),
+                                         FIELD_NAMES[7]: format_optional_date_field(work_log_issue.issue_end_date, None),
+                                         FIELD_NAMES[8]: work_log_issue.summary,
+                                         FIELD_NAMES[9]: work_log_issue.parent_key,
+                                         FIELD_NAMES[10]: work_log_issue.parent_summary,
+                                         **dict(zip(extra_field_names, work_log_issue.extra_fields))},
+                                        ensure_ascii=False))
+            jsonl_file.write('\n')
+
+
+def has_pyarrow():
+    """
+    Verifies whether pyarrow is installed without importing it, as importing pyarrow takes long
+    :return: True if pyarrow is installed, which the Parquet output requires
+    """
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def import_pyarrow():
+    """
+    Imports pyarrow only when a Parquet file is written, so that other runs do not wait for it
+    :return: the pyarrow module including pyarrow.parquet
+    """
+    try:
+        import pyarrow.parquet
+    except ImportError as error:
+        raise ImportError("The parquet output requires pyarrow, install it with: pip install pyarrow") from error
+    return pyarrow
+
+
+def create_parquet_schema(extra_field_names=()):
+    """
+    Creates the schema of the Parquet file, the text fields which repeat for many work logs are dictionary encoded
+    :param extra_field_names: the names of the extra fields of the issues, which are text
+    :return: the Arrow schema
+    """
+    pyarrow = import_pyarrow()
+    dictionary = pyarrow.dictionary(pyarrow.int32(), pyarrow.string())
+    return pyarrow.schema([(FIELD_NAMES[0], dictionary),
+                           (FIELD_NAMES[1], pyarrow.date32()),
+                           (FIELD_NAMES[2], dictionary),
+                           (FIELD_NAMES[3], pyarrow.int64()),
+                           (FIELD_NAMES[4], pyarrow.int64()),
+                           (FIELD_NAMES[5], pyarrow.int64()),
+                           (FIELD_NAMES[6], pyarrow.date32()),
+                           (FIELD_NAMES[7], pyarrow.date32()),
+                           (FIELD_NAMES[8], dictionary),
+                           (FIELD_NAMES[9], dictionary),
+                           (FIELD_NAMES[10], dictionary)] +
+                          [(field_name, dictionary) for field_name in extra_field_names])
+
+
+def output_to_parquet(issue_index, work_logs, file_name=PARQUET_FILE_NAME, extra_field_names=()):
+    """Print the work logs to a Parquet file
+
+    The work logs are written in record batches, so only one batch of work logs is kept in memory. The time fields are
+    integer seconds, the dates are dates and the author, issue and parent fields are dictionary encoded.
+
+    :param issue_index: the issues which must be printed by issue key
+    :param work_logs: the list of work logs which must be printed
+    :param file_name: the name of the Parquet file
+    :param extra_field_names: the names of the extra fields of the issues
+    """
+    pyarrow = import_pyarrow()
+    schema = create_parquet_schema(extra_field_names)
+    work_logs = iter(work_logs)
+    with pyarrow.parquet.ParquetWriter(file_name, schema) as writer:
+        work_log_batch = list(itertools.islice(work_logs, RECORD_BATCH_SIZE))
+        while work_log_batch:
+            issue_batch = [issue_index[work_log.issue_key] for work_log in work_log_batch]
+            columns = [[work_log.author for work_log in work_log_batch],
+                       [date.fromordinal(work_log.started_ordinal) for work_log in work_log_batch],
+                       [work_log.issue_key for work_log in work_log_batch],
+                       [work_log.time_spent for work_log in work_log_batch],
+                       [issue.original_estimate for issue in issue_batch],
+                       [issue.time_spent for issue in issue_batch],
+                       [issue.issue_start_date for issue in issue_batch],
+                       [issue.issue_end_date for issue in issue_batch],
+                       [issue.summary for issue in issue_batch],
+                       [issue.parent_key for issue in issue_batch],
+                       [issue.parent_summary for issue in issue_batch]] + \
+                      [[issue.extra_fields[index] for issue in issue_batch] for index in range(len(extra_field_names))]
+            arrays = [pyarrow.array(column, field.type.value_type).dictionary_encode()
+                      if pyarrow.types.is_dictionary(field.type) else pyarrow.array(column, field.type)
+                      for column, field in zip(columns, schema)]
+            writer.write_batch(pyarrow.record_batch(arrays, schema=schema))
+            work_log_batch = list(itertools.islice(work_logs, RECORD_BATCH_SIZE))
+
+
+def output_aggregation_to_console(group_by, rows, file=None, table=False):
+    """Print the aggregated work logs to the console
+
+    :param group_by: the list of fields the work logs are grouped by
+    :param rows: the list of aggregated rows which must be printed
+    :param file: the text stream to print to, None for stdout
+    :param table: whether to print an aligned table instead of lines separated by semicolons
+    """
+    file = file if file is not None else sys.stdout
+    lines = [[str(row[field]) if row[field] is not None else "" for field in group_by] +
+             [format_optional_time_field(row[field], "") for field in AGGREGATED_FIELD_NAMES] for row in rows]
+
+    file.write("\nThe Jira time report\n====================\n")
+    if table:
+        header = group_by + AGGREGATED_FIELD_NAMES
+        widths = [len(field) for field in header]
+        for line in lines:
+            update_column_widths(widths, line)
+        time_columns = range(len(group_by), len(header))
+        lines = itertools.chain([format_table_row(header, widths, time_columns),
+                                 format_table_row(["-" * width for width in widths], widths)],
+                                (format_table_row(line, widths, time_columns) for line in lines))
+    else:
+        lines = (";".join(line) for line in lines)
+    write_console_lines(file, lines)
+
+
+def output_aggregation_to_csv(group_by, rows, file_name=CSV_FILE_NAME):
+    """Print the aggregated work logs to a CSV file
+
+    :param group_by: the list of fields the work logs are grouped by
+    :param rows: the list of aggregated rows which must be printed
+    :param file_name: the name of the CSV file
+    """
+    with open(file_name, 'w', newline='') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=group_by + AGGREGATED_FIELD_NAMES, dialect=csv.unix_dialect)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def output_aggregation_to_excel(group_by, rows, file_name=EXCEL_FILE_NAME):
+    """Print the aggregated work logs to an Excel file
+
+    :param group_by: the list of fields the work logs are grouped by
+    :param rows: the list of aggregated rows which must be printed
+    :param file_name: the name of the Excel file
+    """
+    with xlsxwriter.Workbook(file_name) as workbook:
+        worksheet = workbook.add_worksheet()
+        time_format = workbook.add_format({'num_format': '[h]:mm:ss;@'})
+        worksheet.write_row(0, 0, group_by + AGGREGATED_FIELD_NAMES)
+        column_widths = [EXCEL_COLUMN_WIDTH] * len(group_by)
+
+        for row_number, row in enumerate(rows, 1):
+            for column, field in enumerate(group_by):
+                worksheet.write(row_number, column, row[field])
+                if row[field] is not None and column_widths[column] < len(row[field]):
+                    column_widths[column] = len(row[field])
+            for column, field in enumerate(AGGREGATED_FIELD_NAMES, len(group_by)):
+                worksheet.write(row_number, column, (row[field] / 86400) if row[field] else None, time_format)
+
+        for column, column_width in enumerate(column_widths):
+            worksheet.set_column(column, column, column_width)
+        worksheet.set_column(len(group_by), len(group_by) + len(AGGREGATED_FIELD_NAMES) - 1, EXCEL_COLUMN_WIDTH)
+
+
+def output_aggregation_to_jsonl(rows, file_name=JSONL_FILE_NAME):
+    """Print the aggregated work logs to a JSON Lines file
+
+    :param rows: the list of aggregated rows which must be printed
+    :param file_name: the name of the JSON Lines file
+    """
+    with open(file_name, 'w', encoding='utf-8', newline='\n') as jsonl_file:
+        for row in rows:
+            jsonl_file.write(json.dumps(row, ensure_ascii=False))
+            jsonl_file.write('\n')
+
+
+def output_aggregation_to_parquet(group_by, rows, file_name=PARQUET_FILE_NAME):
+    """Print the aggregated work logs to a Parquet file
+
+    :param group_by: the list of fields the work logs are grouped by
+    :param rows: the list of aggregated rows which must be printed
+    :param file_name: the name of the Parquet file
+    """
+    pyarrow = import_pyarrow()
+    dictionary = pyarrow.dictionary(pyarrow.int32(), pyarrow.string())
+    schema = pyarrow.schema([(field, dictionary) for field in group_by] +
+                            [(field, pyarrow.int64()) for field in AGGREGATED_FIELD_NAMES])
+    pyarrow.parquet.write_table(pyarrow.Table.from_pylist(rows, schema), file_name)
+
+
+def process_aggregation(output, issue_index, work_logs, group_by, output_file=None, console_table=False):
+    """Aggregate the work logs and print the aggregation to the specified output format
+
+    :param output: The output format
+    :param issue_index: the issues by issue key
+    :param work_logs: an iterable of the work logs which must be aggregated
+    :param group_by: the list of fields to group the work logs by
+    :param output_file: the file name to write to, or the text stream to print the console output to, None for the
+    default file name of the output format or stdout
+    :param console_table: whether to print an aligned table to the console
+    """
+    rows = aggregate_work_logs(issue_index, work_logs, group_by)
+
+    if output == "csv":
+        output_aggregation_to_csv(group_by, rows, output_file or CSV_FILE_NAME)
+    elif output == "excel":
+        output_aggregation_to_excel(group_by, rows, output_file or EXCEL_FILE_NAME)
+    elif output == "jsonl":
+        output_aggregation_to_jsonl(rows, output_file or JSONL_FILE_NAME)
+    elif output == "parquet":
+        output_aggregation_to_parquet(group_by, rows, output_file or PARQUET_FILE_NAME)
+    else:
+        output_aggregation_to_console(group_by, rows, output_file, console_table)
+
+
+def process_work_logs(output, issues, work_logs, sort_buffer_size=DEFAULT_SORT_BUFFER_SIZE, streaming_excel=False,
+                      group_by=None, output_file=None, profiler=None, extra_field_names=(), console_table=False,
+                      presorted=False):
     """Process the retrieved work logs from the Jira API
 
-    The work logs are sorted and printed to the specified output format
+    The work logs are sorted and printed to the specified output format. When there are more work logs than fit in the
+    sort buffer, sorted parts are spilled to disk and merged while printing. The issues are indexed by issue key once,
+    so that every writer looks up the issue of a work log in constant time.
 
     :param output: The output format
     :param issues: the list of issues which must be printed
-    :param work_logs: the list of work logs which must be printed
+    :param work_logs: an iterable of the work logs which must be printed
+    :param sort_buffer_size: the maximum number of work logs to sort in memory
+    :param streaming_excel: whether to write the Excel file row by row with real date cells
+    :param group_by: the list of fields to aggregate the work logs by, None for printing every work log
+    :param output_file: the file name to write to, or the text stream to print the console output to, None for the
+    default file name of the output format or stdout
+    :param profiler: the Profiler to time the sort with, None for no profiling
+    :param extra_field_names: the names of the extra fields of the issues, which are not aggregated
+    :param console_table: whether to print an aligned table to the console
+    :param presorted: whether the work logs are sorted in the order of the report already, e.g. by
+    get_work_logs_sharded, so they are not sorted again
     """
-    sorted_on_issue = sorted(work_logs, key=attrgetter('author', 'started', 'issue_key'))
+    if group_by:
+        process_aggregation(output, {issue.key: issue for issue in issues}, work_logs, group_by, output_file,
+                            console_table)
+        return
+
+    # The sort consumes all work logs before the first one is printed, so a generator of work logs has set the issue
+    # start dates of all issues by then
+    sorted_on_issue = work_logs if presorted else external_sort(work_logs, WORK_LOG_ORDER, sort_buffer_size)
+    if profiler:
+        sorted_on_issue = profiler.iterate("sort", sorted_on_issue)
+    issue_index = {issue.key: issue for issue in issues}
 
     if output == "csv":
-        output_to_csv(issues, sorted_on_issue)
+        output_to_csv(issue_index, sorted_on_issue, output_file or CSV_FILE_NAME, extra_field_names)
+    elif output == "excel" and streaming_excel:
+        output_to_streaming_excel(issue_index, sorted_on_issue, output_file or EXCEL_FILE_NAME, extra_field_names)
     elif output == "excel":
-        output_to_excel(issues, sorted_on_issue)
+        output_to_excel(issue_index, sorted_on_issue, output_file or EXCEL_FILE_NAME, extra_field_names)
+    elif output == "jsonl":
+        output_to_jsonl(issue_index, sorted_on_issue, output_file or JSONL_FILE_NAME, extra_field_names)
+    elif output == "parquet":
+        output_to_parquet(issue_index, sorted_on_issue, output_file or PARQUET_FILE_NAME, extra_field_names)
     else:
-        output_to_console(issues, sorted_on_issue)
+        output_to_console(issue_index, sorted_on_issue, output_file, extra_field_names, console_table)
+
+
+def open_pager():
+    """
+    Starts the pager of the PAGER environment variable or else DEFAULT_PAGER
+    :return: the pager process to write the console output to its stdin, None when the pager cannot be started
+    """
+    try:
+        return subprocess.Popen(os.environ.get('PAGER') or DEFAULT_PAGER, shell=True, stdin=subprocess.PIPE,
+                                text=True, encoding=sys.stdout.encoding, errors='replace')
+    except OSError:
+        return None
+
+
+def close_pager(pager):
+    """
+    Waits until the pager has been quit
+    :param pager: the pager process as returned by open_pager
+    """
+    try:
+        pager.stdin.close()
+    except BrokenPipeError:
+        pass
+    pager.wait()
+
+
+def output_statistics(client, cache, journal=None):
+    """Print the statistics of the run to stderr
+
+    :param client: the JiraClient or AsyncJiraClient which has been used for the run
+    :param cache: the WorkLogCache which has been used for the run, None if no cache has been used
+    :param journal: the CheckpointJournal which has been used for the run, None if no checkpoint has been used
+    """
+    request_statistics = client.request_statistics()
+    print("Requests: " + str(request_statistics['requests']), file=sys.stderr)
+    print("Retries: " + str(request_statistics['retries']), file=sys.stderr)
+    print("Throttle wait: %.3f s" % request_statistics['throttle_wait'], file=sys.stderr)
+    print("Bytes received: " + str(request_statistics['bytes_received']), file=sys.stderr)
+    print("Bytes decoded: " + str(request_statistics['bytes_decoded']), file=sys.stderr)
+    connection_statistics = client.connection_statistics()
+    if connection_statistics is not None:
+        print("Connections opened: " + str(connection_statistics['opened']), file=sys.stderr)
+        print("Connections reused: " + str(connection_statistics['reused']), file=sys.stderr)
+    if cache:
+        cache_statistics = cache.statistics()
+        print("Cache hits: " + str(cache_statistics['hits']), file=sys.stderr)
+        print("Cache misses: " + str(cache_statistics['misses']), file=sys.stderr)
+        print("Cache stale: " + str(cache_statistics['stale']), file=sys.stderr)
+        print("Cache expired: " + str(cache_statistics['expired']), file=sys.stderr)
+    if journal:
+        journal_statistics = journal.statistics()
+        print("Checkpoint pages resumed: " + str(journal_statistics['pages']), file=sys.stderr)
+        print("Checkpoint issues resumed: " + str(journal_statistics['issues']), file=sys.stderr)
 
 
 def main():
@@ -376,22 +1275,232 @@ def main():
     parser.add_argument('api_token',
                         help='The API token to use for connecting to Jira')
     parser.add_argument('project',
-                        help='The Jira project to retrieve the time report')
+                        help='The Jira project to retrieve the time report, multiple projects are separated by commas. '
+                             'Use an empty string to retrieve the issues matching --jql only')
     parser.add_argument('from_date',
                         help='The date to start the time report, format yyyy-mm-dd')
     parser.add_argument('--to_date',
                         help='The date to end the time report (the end date is inclusive), format yyyy-mm-dd')
-    parser.add_argument('--output', choices={"console", "csv", "excel"}, default="console",
+    parser.add_argument('--output', choices={"console", "csv", "excel", "jsonl", "parquet"}, default="console",
                         help='The output format')
+    parser.add_argument('--streaming_excel', action='store_true',
+                        help='Write the Excel file row by row in constant memory and write the dates as Excel dates')
+    parser.add_argument('--console_table', action='store_true',
+                        help='Print the console output as a table with aligned columns')
+    parser.add_argument('--pager', action='store_true',
+                        help='Show the console output in the pager of the PAGER environment variable, by default '
+                             + DEFAULT_PAGER + ', when printing to a terminal')
+    parser.add_argument('--group_by',
+                        help='Aggregate the work logs by a comma separated list of fields: author, issue, parent, '
+                             'date, week and month, e.g. author,parent,week')
+    parser.add_argument('--fields',
+                        help='Add extra fields of the issues to the report, a comma separated list of Jira field ids. '
+                             'The fields of the parent or epic of an issue are prefixed by parent. or epic., e.g. '
+                             'components,labels,parent.summary,epic.summary')
+    parser.add_argument('--epic_link_field', default=EPIC_LINK_FIELD,
+                        help='The id of the Jira field containing the epic of an issue, used for the epic. fields')
+    parser.add_argument('--jql', action='append',
+                        help='A JQL filter for retrieving issues in addition to the issues of the projects, can be '
+                             'given multiple times, an ORDER BY clause is ignored')
+    parser.add_argument('--authors',
+                        help='Report only the work logs of these authors, a comma separated list of account ids or '
+                             'user names')
+    parser.add_argument('--groups',
+                        help='Report only the work logs of the members of these Jira groups, a comma separated list')
+    parser.add_argument('--narrow_work_logs', action='store_true',
+                        help='Retrieve only the work logs started between the from and to date of issues, the cache '
+                             'only keeps the issue start dates then')
     parser.add_argument('--ssl_certificate',
                         help='The location of the SSL certificate, needed in case of self-signed certificates')
+    parser.add_argument('--engine', choices=["issue", "bulk", "async"], default="issue",
+                        help='The way to retrieve the work logs, per issue, by means of the bulk work log API or per '
+                             'issue by means of asyncio while the issues are being searched, which requires httpx')
+    parser.add_argument('--shard_by', choices=SHARD_UNITS,
+                        help='Search the issues per month or week and retrieve their work logs in parallel processes, '
+                             'the work logs of an issue found by more than one shard are retrieved once')
+    parser.add_argument('--processes', type=int,
+                        help='The maximum number of processes retrieving the shards, by default the number of CPUs')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='The maximum number of pages of issues or issues for which the work logs are retrieved '
+                             'concurrently')
+    parser.add_argument('--page_size', type=int,
+                        help='The number of issues to request per page, by default the maximum allowed by Jira')
+    parser.add_argument('--pool_size', type=int,
+                        help='The maximum number of connections to Jira to keep alive, by default the number of '
+                             'workers with a minimum of ' + str(DEFAULT_POOL_SIZE))
+    parser.add_argument('--rate_limit', type=float,
+                        help='The maximum number of requests per second to send to Jira')
+    parser.add_argument('--max_retries', type=int, default=DEFAULT_MAX_RETRIES,
+                        help='The maximum number of retries of a request which is throttled by Jira')
+    parser.add_argument('--cache_dir',
+                        help='The directory to cache the work logs in, only issues updated since they were cached are '
+                             'retrieved again')
+    parser.add_argument('--cache_ttl', type=float,
+                        help='The number of hours after which cached work logs are retrieved again')
+    parser.add_argument('--invalidate_cache', action='store_true',
+                        help='Remove all cached work logs before generating the time report')
+    parser.add_argument('--checkpoint',
+                        help='Record the retrieved pages of issues and work logs of issues in a journal file, which is '
+                             'removed when the time report has been generated')
+    parser.add_argument('--resume', action='store_true',
+                        help='Resume the run which has recorded the --checkpoint journal, only the pages of issues and '
+                             'work logs of issues which are not recorded are retrieved')
+    parser.add_argument('--json_backend', choices=sorted(JSON_BACKENDS), default=json_backend,
+                        help='The library to decode the Jira responses with, by default the fastest one installed')
+    parser.add_argument('--sort_buffer_size', type=int, default=DEFAULT_SORT_BUFFER_SIZE,
+                        help='The maximum number of work logs to sort in memory, more work logs are sorted on disk')
+    parser.add_argument('--statistics', action='store_true',
+                        help='Print the statistics of the run to stderr')
+    parser.add_argument('--profile', action='store_true',
+                        help='Print the latencies of the requests per endpoint and the time per phase of the run to '
+                             'stderr')
+    parser.add_argument('--profile_file',
+                        help='Write the latencies of the requests and the time per phase of the run to a JSON file')
+    parser.add_argument('--trace_file',
+                        help='Write every request and phase of the run to a file in the Chrome trace event format')
     args = parser.parse_args()
-
-    issues = get_updated_issues(args.jira_url, args.user_name, args.api_token, args.project, args.from_date,
-                                args.to_date, args.ssl_certificate)
-    work_logs, issues = get_work_logs(args.jira_url, args.user_name, args.api_token, args.from_date, args.to_date,
-                                      args.ssl_certificate, issues)
-    process_work_logs(args.output, issues, work_logs)
+    if not args.project.strip(" ,") and not args.jql:
+        parser.error("a project or --jql filter is required")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.processes is not None and args.processes < 1:
+        parser.error("--processes must be at least 1")
+    for jql_filter in args.jql or []:
+        if not strip_order_by(jql_filter):
+            parser.error("the --jql filter " + jql_filter + " has no condition")
+    if args.output == "parquet" and not has_pyarrow():
+        parser.error("the parquet output requires pyarrow, install it with: pip install pyarrow")
+    if args.engine == "async" and httpx is None:
+        parser.error("the async engine requires httpx, install it with: pip install httpx")
+    if args.shard_by and args.engine != "issue":
+        parser.error("--shard_by requires the issue engine")
+    if args.checkpoint and (args.engine != "issue" or args.shard_by):
+        parser.error("--checkpoint requires the issue engine without --shard_by")
+    if args.resume and not args.checkpoint:
+        parser.error("--resume requires --checkpoint")
+    set_json_backend(args.json_backend)
+    group_by = None
+    if args.group_by:
+        try:
+            group_by = parse_group_by(args.group_by)
+        except ValueError as error:
+            parser.error(str(error))
+    enricher = None
+    if args.fields:
+        if group_by:
+            parser.error("--fields cannot be combined with --group_by")
+        try:
+            enricher = IssueEnricher(parse_fields(args.fields, FIELD_NAMES), args.epic_link_field)
+        except ValueError as error:
+            parser.error(str(error))
+
+    profiler = Profiler() if args.profile or args.profile_file or args.trace_file else None
+    authors = [author.strip() for author in args.authors.split(",") if author.strip()] if args.authors else None
+    groups = [group.strip() for group in args.groups.split(",") if group.strip()] if args.groups else None
+    pool_size = args.pool_size if args.pool_size else max(args.workers, DEFAULT_POOL_SIZE)
+    if args.engine == "async":
+        client = AsyncJiraClient(args.jira_url, args.user_name, args.api_token, args.ssl_certificate, args.workers,
+                                 pool_size, args.rate_limit, args.max_retries, profiler=profiler)
+    else:
+        client = JiraClient(args.jira_url, args.user_name, args.api_token, args.ssl_certificate, pool_size,
+                            args.rate_limit, args.max_retries, profiler=profiler)
+    cache = None
+    if args.cache_dir:
+        cache = WorkLogCache(args.cache_dir, args.jira_url, args.cache_ttl * 3600 if args.cache_ttl else None)
+        if args.invalidate_cache:
+            cache.invalidate()
+    journal = None
+    if args.checkpoint:
+        # The parameters which determine the retrieved issues and work logs, the to date defaults to the current day
+        parameters = {'jira_url': args.jira_url, 'user_name': args.user_name, 'project': args.project,
+                      'from_date': args.from_date, 'to_date': args.to_date or date.today().isoformat(),
+                      'jql': args.jql, 'authors': authors, 'groups': groups, 'fields': args.fields,
+                      'epic_link_field': args.epic_link_field, 'narrow_work_logs': args.narrow_work_logs,
+                      'page_size': args.page_size}
+        try:
+            journal = CheckpointJournal(args.checkpoint, parameters, args.resume)
+        except ValueError as error:
+            parser.error(str(error))
+
+    def phase(name):
+        return profiler.phase(name) if profiler else nullcontext()
+
+    author_ids = None
+    if (authors or groups) and args.engine != "async":
+        with phase("authors"):
+            try:
+                author_ids = get_author_ids(client, authors, groups)
+            except AuthorNotFoundError as error:
+                parser.error(str(error))
+    if args.engine == "async":
+        # The issues are searched while the work logs are retrieved, so both are timed as one phase
+        with phase("retrieve"):
+            try:
+                work_logs, issues = asyncio.run(asyncjiratimereport.retrieve(client, args.project, args.from_date,
+                                                                             args.to_date, args.jql, args.page_size,
+                                                                             authors, groups, cache,
+                                                                             args.narrow_work_logs, enricher))
+            except AuthorNotFoundError as error:
+                parser.error(str(error))
+    elif args.shard_by:
+        # The shards are searched while the work logs of the issues of other shards are retrieved, so both are timed as
+        # one phase
+        with phase("retrieve"):
+            work_logs, issues = get_work_logs_sharded(args.jira_url, args.user_name, args.api_token, args.project,
+                                                      args.from_date, args.to_date, args.ssl_certificate,
+                                                      args.shard_by, args.processes, args.jql, args.workers,
+                                                      args.page_size, authors, groups, author_ids, enricher, client,
+                                                      cache, args.narrow_work_logs, args.rate_limit,
+                                                      args.max_retries)
+        if enricher:
+            with phase("enrich"):
+                enrich_issues(client, issues, enricher, args.workers)
+    else:
+        with phase("search"):
+            issues = get_updated_issues(args.jira_url, args.user_name, args.api_token, args.project, args.from_date,
+                                        args.to_date, args.ssl_certificate, client, args.jql, args.workers,
+                                        args.page_size, authors, groups, enricher, journal)
+        if enricher:
+            with phase("enrich"):
+                enrich_issues(client, issues, enricher, args.workers)
+        if args.engine == "bulk":
+            with phase("work logs"):
+                work_logs, issues = get_work_logs_bulk(args.jira_url, args.user_name, args.api_token,
+                                                       args.from_date, args.to_date, args.ssl_certificate, issues,
+                                                       args.workers, client, author_ids)
+        else:
+            work_logs = iter_work_logs(args.jira_url, args.user_name, args.api_token, args.from_date, args.to_date,
+                                       args.ssl_certificate, issues, args.workers, client, cache, author_ids,
+                                       args.narrow_work_logs, journal)
+            if profiler:
+                work_logs = profiler.iterate("work logs", work_logs)
+    pager = open_pager() if args.pager and args.output == "console" and sys.stdout.isatty() else None
+    with phase("output"):
+        try:
+            process_work_logs(args.output, issues, work_logs, args.sort_buffer_size, args.streaming_excel, group_by,
+                              pager.stdin if pager else None, profiler, enricher.fields if enricher else (),
+                              args.console_table, args.shard_by is not None)
+        except BrokenPipeError:
+            # The pager has been quit before the whole report has been shown
+            pass
+        if pager:
+            close_pager(pager)
+
+    if journal:
+        journal.close(remove=True)
+    if args.statistics:
+        output_statistics(client, cache, journal)
+    if args.profile:
+        profiler.output_summary()
+    if args.profile_file:
+        profiler.write_json(args.profile_file)
+    if args.trace_file:
+        profiler.write_chrome_trace(args.trace_file)
+    if cache:
+        cache.close()
+    # The async client has been closed by the event loop which has used it
+    if args.engine != "async":
+        client.close()
 
 
 if __name__ == "__main__":
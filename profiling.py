@@ -0,0 +1,299 @@
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+LATENCY_BUCKETS = [10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+
+def normalize_endpoint(method, url):
+    """
+    Determines the endpoint of a request, the issue keys are left out so that the requests of all issues are combined
+    :param method: the HTTP method of the request
+    :param url: the Jira URL relative to the base Jira URL
+    :return: the endpoint, e.g. GET /rest/api/2/issue/{key}/worklog/
+    """
+    return method + " " + re.sub(r"/issue/[^/]+/", "/issue/{key}/", url)
+
+
+def percentile(sorted_values, fraction):
+    """
+    Determines a percentile by the nearest rank method
+    :param sorted_values: the sorted list of values, not empty
+    :param fraction: the percentile as a fraction, e.g. 0.95
+    :return: the value at the percentile
+    """
+    rank = max(1, int(fraction * len(sorted_values) + 0.999999))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class RequestStatistics:
+    """A RequestStatistics object will record the requests to one Jira endpoint or node
+    """
+    def __init__(self):
+        self.durations = []
+        self.bytes_received = 0
+        self.retries = 0
+        self.status_codes = Counter()
+
+    def record(self, status_code, duration, bytes_received, retried):
+        """
+        Records a request
+        :param status_code: the HTTP status code of the response
+        :param duration: the number of seconds from sending the request until the response has been received
+        :param bytes_received: the number of bytes received
+        :param retried: whether the request is retried
+        """
+        self.durations.append(duration)
+        self.bytes_received += bytes_received
+        self.retries += retried
+        self.status_codes[status_code] += 1
+
+    def to_dict(self):
+        """
+        Summarizes the recorded requests
+        :return: a dictionary containing the number of requests, retries and bytes, the status codes and the latency
+        percentiles in milliseconds and histogram, the keys of the histogram are the upper bounds of the buckets in
+        milliseconds
+        """
+        durations = sorted(duration * 1000 for duration in self.durations)
+        histogram = Counter()
+        for duration in durations:
+            histogram[next((str(bound) for bound in LATENCY_BUCKETS if duration <= bound), "inf")] += 1
+        return {'requests': len(durations),
+                'retries': self.retries,
+                'bytes_received': self.bytes_received,
+                'status_codes': {str(status_code): count for status_code, count in sorted(self.status_codes.items())},
+                'latency': {'mean': sum(durations) / len(durations),
+                            'p50': percentile(durations, 0.5),
+                            'p95': percentile(durations, 0.95),
+                            'p99': percentile(durations, 0.99),
+                            'max': durations[-1],
+                            'histogram': {str(bound): histogram[str(bound)] for bound in LATENCY_BUCKETS + ["inf"]}}}
+
+
+class Profiler:
+    """A Profiler object will record where the time of a run goes
+
+    Every request to Jira is recorded per endpoint and per Jira node, the node is taken from the X-ANODEID header of
+    Jira Data Center. The phases of the run are timed by wall clock time and by CPU time of the thread running the
+    phase. Phases can be nested, e.g. decoding within retrieving the work logs, the self time of a phase excludes the
+    time of the phases nested in it. Phases running concurrently in several threads are added up.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.origin = time.perf_counter()
+        self.phases = {}
+        self.endpoints = {}
+        self.nodes = {}
+        self.events = []
+
+    def nested_times(self):
+        """
+        :return: the stack of the times of the nested phases of the phases running in the current thread
+        """
+        if not hasattr(self.local, 'stack'):
+            self.local.stack = []
+        return self.local.stack
+
+    def start_phase(self):
+        """
+        Starts timing a phase in the current thread
+        :return: the start wall clock and CPU time, to be passed to stop_phase
+        """
+        self.nested_times().append([0.0, 0.0])
+        return time.perf_counter(), time.thread_time()
+
+    def stop_phase(self, name, start, trace=True, args=None):
+        """
+        Stops timing a phase in the current thread and records it
+        :param name: the name of the phase
+        :param start: the start times as returned by start_phase
+        :param trace: whether to add the phase to the trace, False for phases which occur very often
+        :param args: a dictionary of details of the phase to add to the trace
+        """
+        wall = time.perf_counter() - start[0]
+        cpu = time.thread_time() - start[1]
+        stack = self.nested_times()
+        nested_wall, nested_cpu = stack.pop()
+        if stack:
+            stack[-1][0] += wall
+            stack[-1][1] += cpu
+        self.record_phase(name, 1, wall, wall - nested_wall, cpu, cpu - nested_cpu)
+        if trace:
+            with self.lock:
+                self.events.append((name, "phase", threading.get_ident(), start[0], wall, args))
+
+    def record_phase(self, name, calls, wall, self_wall, cpu, self_cpu):
+        """
+        Adds the times of one or more calls of a phase
+        :param name: the name of the phase
+        :param calls: the number of calls
+        :param wall: the wall clock time in seconds
+        :param self_wall: the wall clock time in seconds excluding the nested phases
+        :param cpu: the CPU time in seconds
+        :param self_cpu: the CPU time in seconds excluding the nested phases
+        """
+        with self.lock:
+            phase = self.phases.setdefault(name, {'calls': 0, 'wall': 0.0, 'self_wall': 0.0, 'cpu': 0.0,
+                                                  'self_cpu': 0.0})
+            phase['calls'] += calls
+            phase['wall'] += wall
+            phase['self_wall'] += self_wall
+            phase['cpu'] += cpu
+            phase['self_cpu'] += self_cpu
+
+    def phase(self, name, args=None):
+        """
+        Times a phase, to be used in a with statement
+        :param name: the name of the phase
+        :param args: a dictionary of details of the phase to add to the trace
+        :return: the context manager timing the phase
+        """
+        return PhaseTimer(self, name, args)
+
+    def iterate(self, name, items):
+        """
+        Times the retrieval of the items of a lazy iterable as a phase, excluding the time the items are processed. The
+        times are recorded once the iteration ends, every retrieved item counts as a call
+        :param name: the name of the phase
+        :param items: an iterable, e.g. a generator which retrieves the items while iterating
+        :return: a generator of the items
+        """
+        items = iter(items)
+        stack = self.nested_times()
+        calls = 0
+        total_wall = total_self_wall = total_cpu = total_self_cpu = 0.0
+        try:
+            while True:
+                stack.append([0.0, 0.0])
+                start_wall = time.perf_counter()
+                start_cpu = time.thread_time()
+                try:
+                    item = next(items)
+                except StopIteration:
+                    return
+                finally:
+                    wall = time.perf_counter() - start_wall
+                    cpu = time.thread_time() - start_cpu
+                    nested_wall, nested_cpu = stack.pop()
+                    if stack:
+                        stack[-1][0] += wall
+                        stack[-1][1] += cpu
+                    total_wall += wall
+                    total_self_wall += wall - nested_wall
+                    total_cpu += cpu
+                    total_self_cpu += cpu - nested_cpu
+                calls += 1
+                yield item
+        finally:
+            self.record_phase(name, calls, total_wall, total_self_wall, total_cpu, total_self_cpu)
+
+    def record_request(self, method, url, status_code, start, duration, bytes_received, retried, node=None):
+        """
+        Records a request to Jira, every retry is recorded as a request of its own
+        :param method: the HTTP method of the request
+        :param url: the Jira URL relative to the base Jira URL
+        :param status_code: the HTTP status code of the response
+        :param start: the time.perf_counter() at which the request has been sent
+        :param duration: the number of seconds from sending the request until the response has been received
+        :param bytes_received: the number of bytes received
+        :param retried: whether the request is retried
+        :param node: the Jira node which has handled the request, None if unknown
+        """
+        endpoint = normalize_endpoint(method, url)
+        with self.lock:
+            self.endpoints.setdefault(endpoint, RequestStatistics()).record(status_code, duration, bytes_received,
+                                                                            retried)
+            if node:
+                self.nodes.setdefault(node, RequestStatistics()).record(status_code, duration, bytes_received,
+                                                                        retried)
+            self.events.append((endpoint, "request", threading.get_ident(), start, duration,
+                                {'url': url, 'status_code': status_code, 'bytes_received': bytes_received,
+                                 'node': node}))
+
+    def to_dict(self):
+        """
+        Summarizes the run
+        :return: a dictionary containing the elapsed time and the statistics per phase, endpoint and node
+        """
+        with self.lock:
+            return {'elapsed': time.perf_counter() - self.origin,
+                    'phases': {name: dict(phase) for name, phase in self.phases.items()},
+                    'endpoints': {endpoint: statistics.to_dict()
+                                  for endpoint, statistics in sorted(self.endpoints.items())},
+                    'nodes': {node: statistics.to_dict() for node, statistics in sorted(self.nodes.items())}}
+
+    def output_summary(self, file=None):
+        """
+        Prints the summary tables of the run
+        :param file: the text stream to print to, None for stderr
+        """
+        file = file if file is not None else sys.stderr
+        summary = self.to_dict()
+        print("Elapsed: %.3f s" % summary['elapsed'], file=file)
+        print("%-12s %8s %10s %10s %10s %10s" % ("Phase", "Calls", "Wall s", "Self s", "CPU s", "Self CPU s"),
+              file=file)
+        for name, phase in summary['phases'].items():
+            print("%-12s %8d %10.3f %10.3f %10.3f %10.3f" % (name, phase['calls'], phase['wall'], phase['self_wall'],
+                                                             phase['cpu'], phase['self_cpu']), file=file)
+
+        for title, statistics in (("Endpoint", summary['endpoints']), ("Node", summary['nodes'])):
+            if not statistics:
+                continue
+            print("%-40s %8s %7s %12s %8s %8s %8s  %s" % (title, "Requests", "Retries", "Bytes", "p50 ms", "p95 ms",
+                                                          "Max ms", "Status codes"), file=file)
+            for name, request_statistics in statistics.items():
+                latency = request_statistics['latency']
+                print("%-40s %8d %7d %12d %8.1f %8.1f %8.1f  %s" %
+                      (name, request_statistics['requests'], request_statistics['retries'],
+                       request_statistics['bytes_received'], latency['p50'], latency['p95'], latency['max'],
+                       " ".join(status_code + ":" + str(count)
+                                for status_code, count in request_statistics['status_codes'].items())), file=file)
+                print("%-40s %s" % ("", " ".join("<=" + bound + ":" + str(count) if bound != "inf" else
+                                                 ">" + str(LATENCY_BUCKETS[-1]) + ":" + str(count)
+                                                 for bound, count in latency['histogram'].items())), file=file)
+
+    def write_json(self, file_name):
+        """
+        Writes the summary of the run to a JSON file
+        :param file_name: the name of the JSON file
+        """
+        with open(file_name, 'w', encoding='utf-8') as json_file:
+            json.dump(self.to_dict(), json_file, indent=2)
+
+    def write_chrome_trace(self, file_name):
+        """
+        Writes the requests and phases of the run to a file in the Chrome trace event format, which can be opened in
+        chrome://tracing or https://ui.perfetto.dev
+        :param file_name: the name of the trace file
+        """
+        pid = os.getpid()
+        with self.lock:
+            trace_events = [{'name': name, 'cat': category, 'ph': "X", 'pid': pid, 'tid': tid,
+                             'ts': (start - self.origin) * 1000000, 'dur': duration * 1000000, 'args': args or {}}
+                            for name, category, tid, start, duration, args in self.events]
+        with open(file_name, 'w', encoding='utf-8') as trace_file:
+            json.dump({'traceEvents': trace_events, 'displayTimeUnit': "ms"}, trace_file)
+
+
+class PhaseTimer:
+    """A PhaseTimer object times a phase of a Profiler in a with statement
+    """
+    def __init__(self, profiler, name, args=None):
+        self.profiler = profiler
+        self.name = name
+        self.args = args
+        self.start = None
+
+    def __enter__(self):
+        self.start = self.profiler.start_phase()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.profiler.stop_phase(self.name, self.start, args=self.args)
+        return False
@@ -0,0 +1,366 @@
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from concurrent.futures import Future
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+from aggregation import parse_group_by
+from decoding import set_json_backend, json_backend, JSON_BACKENDS
+from jiraclient import JiraClient, DEFAULT_MAX_RETRIES, DEFAULT_POOL_SIZE
+from jiratimereport import get_author_ids, get_updated_issues, get_work_logs, has_pyarrow, process_work_logs, \
+    CSV_FILE_NAME, DEFAULT_SORT_BUFFER_SIZE, EXCEL_FILE_NAME, JSONL_FILE_NAME, PARQUET_FILE_NAME
+from worklogcache import WorkLogCache
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+DEFAULT_REFRESH_INTERVAL = 15
+REFRESH_RETENTION = 24 * 3600
+OUTPUT_FILE_NAMES = {'csv': CSV_FILE_NAME,
+                     'excel': EXCEL_FILE_NAME,
+                     'jsonl': JSONL_FILE_NAME,
+                     'parquet': PARQUET_FILE_NAME}
+CONTENT_TYPES = {'console': "text/plain; charset=utf-8",
+                 'csv': "text/csv; charset=utf-8",
+                 'excel': "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                 'jsonl': "application/x-ndjson; charset=utf-8",
+                 'parquet': "application/vnd.apache.parquet"}
+
+
+class ReportServer:
+    """A ReportServer object generates time reports of one Jira server for as long as it runs
+
+    One pooled JiraClient is used for all reports, so the connections to Jira are kept alive between reports. The work
+    logs are kept in a WorkLogCache, so only the work logs of issues which have been updated since the previous report
+    are retrieved again. The reports which have been requested recently are retrieved in the background at an interval,
+    keeping the cache up to date. Identical reports which are requested at the same time are retrieved from Jira once.
+    """
+    def __init__(self, jira_url, user_name, api_token, ssl_certificate=None, workers=1, page_size=None,
+                 pool_size=None, rate_limit=None, max_retries=DEFAULT_MAX_RETRIES, cache_dir=None, cache_ttl=None,
+                 refresh_interval=None, sort_buffer_size=DEFAULT_SORT_BUFFER_SIZE):
+        """
+        :param jira_url: The base Jira URL
+        :param user_name: The user name to use for connecting to Jira
+        :param api_token: The API token to use for connecting to Jira
+        :param ssl_certificate: The location of the SSL certificate, needed in case of self-signed certificates
+        :param workers: the maximum number of pages of issues or issues for which the work logs are retrieved
+        concurrently per report
+        :param page_size: the number of issues to request per page, None for the default of Jira
+        :param pool_size: the maximum number of connections to Jira to keep alive, None for the number of workers with
+        a minimum of DEFAULT_POOL_SIZE
+        :param rate_limit: the maximum number of requests per second to send to Jira, None for no limit
+        :param max_retries: the maximum number of retries of a request which is throttled by Jira
+        :param cache_dir: the directory to cache the work logs in, None for keeping them in memory
+        :param cache_ttl: the number of seconds after which cached work logs expire, None if they never expire
+        :param refresh_interval: the number of seconds between the background refreshes, None for no refreshes
+        :param sort_buffer_size: the maximum number of work logs to sort in memory per report
+        """
+        self.jira_url = jira_url
+        self.workers = workers
+        self.page_size = page_size
+        self.sort_buffer_size = sort_buffer_size
+        self.client = JiraClient(jira_url, user_name, api_token, ssl_certificate,
+                                 pool_size if pool_size else max(workers, DEFAULT_POOL_SIZE), rate_limit, max_retries)
+        self.cache = WorkLogCache(cache_dir, jira_url, cache_ttl)
+        self.lock = threading.Lock()
+        self.fetches = {}
+        self.requested = {}
+        self.number_of_fetches = 0
+        self.number_of_coalesced_fetches = 0
+        self.stopped = threading.Event()
+        self.refresher = None
+        if refresh_interval:
+            self.refresher = threading.Thread(target=self.refresh_periodically, args=(refresh_interval,), daemon=True)
+            self.refresher.start()
+
+    def fetch(self, project, from_date, to_date, jql=None, authors=None, groups=None, requested=True):
+        """
+        Retrieves the issues and work logs of a report, a report which is already being retrieved is not retrieved
+        again but the running retrieval is waited for
+        :param project: the Jira projects, a comma separated string
+        :param from_date: the date to start the time report, format yyyy-mm-dd
+        :param to_date: the date to end the time report (the end date is inclusive), format yyyy-mm-dd, None for today
+        :param jql: a list of JQL filters for retrieving issues in addition to the issues of the projects
+        :param authors: a list of account ids or user names, only the work logs of these authors are retrieved
+        :param groups: a list of Jira groups, only the work logs of the members of these groups are retrieved
+        :param requested: whether the report has been requested, False for a background refresh
+        :return: the list of issues and the list of work logs, which are shared with concurrent identical requests and
+        must not be changed
+        """
+        key = (project, from_date, to_date, tuple(jql or ()), tuple(authors or ()), tuple(groups or ()))
+        with self.lock:
+            if requested:
+                self.requested[key] = time.time()
+            future = self.fetches.get(key)
+            retrieving = future is None
+            if retrieving:
+                future = self.fetches[key] = Future()
+                self.number_of_fetches += 1
+            else:
+                self.number_of_coalesced_fetches += 1
+
+        if not retrieving:
+            return future.result()
+
+        try:
+            author_ids = get_author_ids(self.client, authors, groups) if authors or groups else None
+            issues = get_updated_issues(self.jira_url, None, None, project, from_date, to_date, None, self.client, jql,
+                                        self.workers, self.page_size, authors, groups)
+            work_logs, issues = get_work_logs(self.jira_url, None, None, from_date, to_date, None, issues,
+                                              self.workers, self.client, self.cache, author_ids)
+        except Exception as error:
+            future.set_exception(error)
+            raise
+        else:
+            future.set_result((issues, work_logs))
+        finally:
+            with self.lock:
+                del self.fetches[key]
+        return issues, work_logs
+
+    def refresh(self):
+        """
+        Retrieves the reports which have been requested within REFRESH_RETENTION seconds, so that the cache contains the
+        latest work logs of their issues
+        """
+        with self.lock:
+            now = time.time()
+            self.requested = {key: requested for key, requested in self.requested.items()
+                              if now - requested < REFRESH_RETENTION}
+            keys = list(self.requested)
+
+        for project, from_date, to_date, jql, authors, groups in keys:
+            if self.stopped.is_set():
+                return
+            try:
+                self.fetch(project, from_date, to_date, list(jql), list(authors), list(groups), requested=False)
+            except requests.RequestException as error:
+                print("Refreshing the report of " + project + " from " + from_date + " failed: " + str(error),
+                      file=sys.stderr)
+            except Exception:
+                # An unexpected error of one report must not stop the refreshes of the other reports
+                print("Refreshing the report of " + project + " from " + from_date + " failed:\n" +
+                      traceback.format_exc(), file=sys.stderr)
+
+    def refresh_periodically(self, refresh_interval):
+        """
+        Refreshes the requested reports until the server is closed
+        :param refresh_interval: the number of seconds between the refreshes
+        """
+        while not self.stopped.wait(refresh_interval):
+            self.refresh()
+
+    def report(self, parameters):
+        """
+        Generates a time report
+        :param parameters: the query parameters of the request as parsed by parse_qs, project, from_date, to_date,
+        output, group_by, streaming_excel, authors, groups and jql, which can be given multiple times
+        :return: the content type and the content of the report as bytes
+        """
+        def get_parameter(name, default=None):
+            values = parameters.get(name)
+            return values[-1] if values else default
+
+        project = get_parameter('project', "")
+        jql = parameters.get('jql')
+        from_date = get_parameter('from_date')
+        to_date = get_parameter('to_date')
+        output = get_parameter('output', "console")
+        group_by = parse_group_by(get_parameter('group_by')) if get_parameter('group_by') else None
+        streaming_excel = get_parameter('streaming_excel', "false").lower() in ("true", "1", "yes")
+        authors = [author.strip() for author in get_parameter('authors', "").split(",") if author.strip()]
+        groups = [group.strip() for group in get_parameter('groups', "").split(",") if group.strip()]
+        if not project.strip(" ,") and not jql:
+            raise ValueError("a project or jql filter is required")
+        if from_date is None:
+            raise ValueError("from_date is required")
+        for date_parameter in (from_date, to_date):
+            if date_parameter is not None:
+                datetime.strptime(date_parameter, "%Y-%m-%d")
+        if output not in CONTENT_TYPES:
+            raise ValueError("invalid output " + output + ", choose from " + ", ".join(CONTENT_TYPES))
+        if output == "parquet" and not has_pyarrow():
+            raise ValueError("the parquet output requires pyarrow, install it with: pip install pyarrow")
+
+        issues, work_logs = self.fetch(project, from_date, to_date, jql, authors, groups)
+        return CONTENT_TYPES[output], self.render(output, issues, work_logs, group_by, streaming_excel)
+
+    def render(self, output, issues, work_logs, group_by=None, streaming_excel=False):
+        """
+        Generates the output of a time report
+        :param output: the output format
+        :param issues: the list of issues of the report
+        :param work_logs: the list of work logs of the report
+        :param group_by: the list of fields to aggregate the work logs by, None for every work log
+        :param streaming_excel: whether to write the Excel file row by row with real date cells
+        :return: the output as bytes
+        """
+        if output == "console":
+            console = io.StringIO()
+            process_work_logs(output, issues, work_logs, self.sort_buffer_size, streaming_excel, group_by, console)
+            return console.getvalue().encode('utf-8')
+
+        with tempfile.TemporaryDirectory() as output_dir:
+            file_name = os.path.join(output_dir, OUTPUT_FILE_NAMES[output])
+            process_work_logs(output, issues, work_logs, self.sort_buffer_size, streaming_excel, group_by, file_name)
+            with open(file_name, 'rb') as output_file:
+                return output_file.read()
+
+    def statistics(self):
+        """
+        Counts the reports, requests and cache lookups since the server has been started
+        :return: a dictionary containing the request, connection and cache statistics and the number of retrievals of
+        reports and of requests which have waited for the retrieval of an identical report
+        """
+        with self.lock:
+            fetches = {'fetches': self.number_of_fetches, 'coalesced': self.number_of_coalesced_fetches}
+        return {'reports': fetches,
+                'requests': self.client.request_statistics(),
+                'connections': self.client.connection_statistics(),
+                'cache': self.cache.statistics()}
+
+    def close(self):
+        """
+        Stops the background refreshes and closes the cache and the connections to Jira
+        """
+        self.stopped.set()
+        if self.refresher:
+            self.refresher.join()
+        self.cache.close()
+        self.client.close()
+
+
+class ReportRequestHandler(BaseHTTPRequestHandler):
+    """The ReportRequestHandler handles the requests of the HTTP API
+
+    GET /report?project=MYB&from_date=2020-01-01&to_date=2020-01-31&output=csv returns a time report, the query
+    parameters are the same as the arguments of jiratimereport.py. GET /statistics returns the statistics as JSON.
+    Invalid parameters result in 400 Bad Request, failing requests to Jira in 502 Bad Gateway and any other error in
+    500 Internal Server Error.
+    """
+    def do_GET(self):
+        url = urlparse(self.path)
+        parameters = parse_qs(url.query)
+        try:
+            if url.path == "/report":
+                content_type, content = self.server.report_server.report(parameters)
+                output = parameters.get('output', ["console"])[-1]
+                content_disposition = "attachment; filename=" + OUTPUT_FILE_NAMES[output] \
+                    if output in OUTPUT_FILE_NAMES else None
+            elif url.path == "/statistics":
+                content_type = "application/json"
+                content = json.dumps(self.server.report_server.statistics()).encode('utf-8')
+                content_disposition = None
+            else:
+                self.send_error(404)
+                return
+        except ValueError as error:
+            self.send_error(400, explain=str(error))
+            return
+        except requests.RequestException as error:
+            self.send_error(502, explain=str(error))
+            return
+        except Exception:
+            # Any other error is a bug of the server, it is logged instead of leaving the request without a response
+            self.log_error("%s failed:\n%s", self.path, traceback.format_exc())
+            self.send_error(500, explain="the request failed, see the log of the report server")
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(content)))
+        if content_disposition:
+            self.send_header("Content-Disposition", content_disposition)
+        self.end_headers()
+        self.wfile.write(content)
+
+
+def create_http_server(report_server, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """
+    Creates the HTTP server which serves the reports, every request is handled in a thread of its own
+    :param report_server: the ReportServer which generates the reports
+    :param host: the host name or address to listen on
+    :param port: the port to listen on, 0 for any free port
+    :return: the HTTP server
+    """
+    http_server = ThreadingHTTPServer((host, port), ReportRequestHandler)
+    http_server.daemon_threads = True
+    http_server.report_server = report_server
+    return http_server
+
+
+def main():
+    """The main entry point of the report server
+
+    The responsibilities are:
+    - parse the arguments
+    - start the report server
+    - serve the reports until interrupted
+    """
+    parser = argparse.ArgumentParser(description='Serve Jira time reports over HTTP.')
+    parser.add_argument('jira_url',
+                        help='The Jira URL')
+    parser.add_argument('user_name',
+                        help='The user name to use for connecting to Jira')
+    parser.add_argument('api_token',
+                        help='The API token to use for connecting to Jira')
+    parser.add_argument('--host', default=DEFAULT_HOST,
+                        help='The host name or address to listen on')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT,
+                        help='The port to listen on')
+    parser.add_argument('--ssl_certificate',
+                        help='The location of the SSL certificate, needed in case of self-signed certificates')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='The maximum number of pages of issues or issues for which the work logs are retrieved '
+                             'concurrently per report')
+    parser.add_argument('--page_size', type=int,
+                        help='The number of issues to request per page, by default the maximum allowed by Jira')
+    parser.add_argument('--pool_size', type=int,
+                        help='The maximum number of connections to Jira to keep alive, by default the number of '
+                             'workers with a minimum of ' + str(DEFAULT_POOL_SIZE))
+    parser.add_argument('--rate_limit', type=float,
+                        help='The maximum number of requests per second to send to Jira')
+    parser.add_argument('--max_retries', type=int, default=DEFAULT_MAX_RETRIES,
+                        help='The maximum number of retries of a request which is throttled by Jira')
+    parser.add_argument('--cache_dir',
+                        help='The directory to cache the work logs in, by default they are kept in memory')
+    parser.add_argument('--cache_ttl', type=float,
+                        help='The number of hours after which cached work logs are retrieved again')
+    parser.add_argument('--refresh_interval', type=float, default=DEFAULT_REFRESH_INTERVAL,
+                        help='The number of minutes between the background refreshes of the reports requested in the '
+                             'last day, 0 for no refreshes')
+    parser.add_argument('--json_backend', choices=sorted(JSON_BACKENDS), default=json_backend,
+                        help='The library to decode the Jira responses with, by default the fastest one installed')
+    parser.add_argument('--sort_buffer_size', type=int, default=DEFAULT_SORT_BUFFER_SIZE,
+                        help='The maximum number of work logs to sort in memory per report')
+    args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    set_json_backend(args.json_backend)
+
+    report_server = ReportServer(args.jira_url, args.user_name, args.api_token, args.ssl_certificate, args.workers,
+                                 args.page_size, args.pool_size, args.rate_limit, args.max_retries, args.cache_dir,
+                                 args.cache_ttl * 3600 if args.cache_ttl else None,
+                                 args.refresh_interval * 60 if args.refresh_interval else None, args.sort_buffer_size)
+    http_server = create_http_server(report_server, args.host, args.port)
+    print("Serving Jira time reports on http://%s:%d/report" % http_server.server_address[:2], file=sys.stderr)
+    try:
+        http_server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        http_server.server_close()
+        report_server.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,491 @@
+import re
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from decoding import decode_json, parse_date
+from enrichment import LOOKUP_BATCH_SIZE
+from issue import Issue
+from worklog import WorkLog
+
+MISSING_STATUS_CODES = (400, 404)
+ORDER_BY_PATTERN = re.compile(r"order\s+by\b", re.IGNORECASE)
+# Jira compares the start of a work log as an instant, the time report uses the date in the time zone of the author
+NARROW_MARGIN = timedelta(days=1)
+# A request of a request generator, see jiratimereport.perform, a response with one of the MISSING_STATUS_CODES is sent
+# as None when missing_ok, e.g. when looking up a user which does not exist
+JiraRequest = namedtuple('JiraRequest', ['url', 'params', 'missing_ok'], defaults=[False])
+
+
+def convert_to_date(to_date):
+    """Convert the to_date argument
+
+    The to_date argument is an up and including date. The easiest way to cope with this, is to strip of the time and
+    to add one day to the given to_date. This will make it easier to use in queries.
+
+    :param to_date The date to end the time report (the end date is inclusive), format yyyy-mm-dd
+    :return: the to_date plus one day at time 00:00:00
+    """
+    if to_date:
+        converted_to_date = datetime.strptime(to_date, "%Y-%m-%d") + timedelta(days=1)
+    else:
+        converted_to_date = datetime.now() + timedelta(days=1)
+    return converted_to_date
+
+
+class IssuePages:
+    """An IssuePages object keeps track of the pages of an issue search, for the sync and the async retrieval alike
+
+    The first page tells which other pages to retrieve. Consecutive pages overlap by one issue, so the last issue of a
+    page must be the first issue of the next page. Otherwise issues have started or stopped matching while the pages
+    were retrieved and issues may have been skipped, even when the total number of issues is still the same. The pages
+    are added in order and the issues which have not been on an earlier page are returned. When the issues have shifted
+    between the pages, the pages are retrieved once more one after another, starting at the index returned by
+    get_rewalk_start_at.
+    """
+    def __init__(self, enricher=None):
+        """
+        :param enricher: the IssueEnricher to convert the issues with, None for no extra fields
+        """
+        self.enricher = enricher
+        self.issue_keys = set()
+        self.total_number_of_issues = None
+        self.overlapping = False
+        self.last_issue_key = None
+        self.shifted = False
+        self.rewalking = False
+
+    def get_start_ats(self, first_page_json):
+        """
+        Determines the pages to retrieve after the first page, pages of a single issue cannot overlap
+        :param first_page_json: the JSON of the first page as received from Jira
+        :return: the range of the indexes of the first issues of the other pages
+        """
+        self.total_number_of_issues = int(first_page_json['total'])
+        max_results = int(first_page_json['maxResults'])
+        self.overlapping = max_results > 1
+        if self.overlapping:
+            return range(max_results - 1, self.total_number_of_issues - 1, max_results - 1)
+        return range(max_results, self.total_number_of_issues, max_results) if max_results > 0 else range(0)
+
+    def add_page(self, start_at, page_json):
+        """
+        Adds a page of issues and detects whether the issues have shifted since the previous page
+        :param start_at: the index of the first issue of the page
+        :param page_json: the JSON page as received from Jira
+        :return: the list of issues which have not been on an earlier page
+        """
+        issues_json = page_json['issues']
+        if not self.rewalking:
+            if int(page_json['total']) != self.total_number_of_issues:
+                self.shifted = True
+            elif self.overlapping and start_at > 0 and \
+                    (not issues_json or issues_json[0]['key'] != self.last_issue_key):
+                self.shifted = True
+            self.last_issue_key = issues_json[-1]['key'] if issues_json else None
+
+        new_issues = []
+        for issue in convert_json_to_issues(page_json, self.enricher):
+            if issue.key not in self.issue_keys:
+                self.issue_keys.add(issue.key)
+                new_issues.append(issue)
+        return new_issues
+
+    def get_rewalk_start_at(self):
+        """
+        Verifies whether issues may have been skipped because they have shifted between the pages
+        :return: the index of the first issue to retrieve once more, None when no issues have been skipped
+        """
+        if not self.shifted and len(self.issue_keys) >= self.total_number_of_issues:
+            return None
+        self.rewalking = True
+        return 0
+
+    @staticmethod
+    def get_next_rewalk_start_at(start_at, page_json):
+        """
+        Verify whether it is necessary to retrieve another page when retrieving the pages once more
+        :param start_at: the index of the first issue of the page
+        :param page_json: the JSON page as received from Jira
+        :return: the index of the first issue of the next page, None if this is the last page
+        """
+        max_results = int(page_json['maxResults'])
+        return get_next_start_at(page_json, start_at) if max_results > 0 else None
+
+
+def create_issue_page_query(issue_jql, start_at, page_size, fields=None):
+    """Create the query parameters for retrieving one page of issues
+
+    :param issue_jql: the JQL of the issues to retrieve
+    :param start_at: the index of the first issue of the page
+    :param page_size: the number of issues to request, None for the default of Jira
+    :param fields: a list of ids of extra fields to retrieve, None for no extra fields
+    :return: the query parameters
+    """
+    query = {
+        'jql': issue_jql,
+        'fields': ','.join(['id,key,summary,parent,timeoriginalestimate,timespent,resolutiondate,updated'] +
+                           (fields or [])),
+        'startAt': str(start_at)
+    }
+    if page_size:
+        query['maxResults'] = str(page_size)
+    return query
+
+
+def create_issue_jql(project, jql, from_date, to_date, authors=None, groups=None):
+    """Create the JQL for retrieving the issues containing time spent between the given from and to date
+
+    :param project The Jira project to retrieve the time report, a comma separated string or list of projects
+    :param jql: a list of JQL filters for retrieving issues in addition to the issues of the projects
+    :param from_date The date to start the time report, format yyyy-mm-dd
+    :param to_date The date to end the time report (the end date is inclusive), format yyyy-mm-dd
+    :param authors: a list of account ids or user names, only issues with work logs of these authors are retrieved
+    :param groups: a list of Jira groups, only issues with work logs of members of these groups are retrieved
+    :return: the JQL
+    """
+    projects = project.split(",") if isinstance(project, str) else project or []
+    projects = [project_key.strip() for project_key in projects if project_key.strip()]
+
+    filters = []
+    if projects:
+        filters.append('project in (' + ', '.join(quote_jql(project_key) for project_key in projects) + ')')
+    for jql_filter in jql or []:
+        condition = strip_order_by(jql_filter)
+        if not condition:
+            raise ValueError("the JQL filter " + jql_filter + " has no condition")
+        filters.append('(' + condition + ')')
+
+    author_filters = []
+    if authors:
+        author_filters.append('worklogAuthor in (' + ', '.join(quote_jql(author) for author in authors) + ')')
+    author_filters.extend('worklogAuthor in membersOf(' + quote_jql(group) + ')' for group in groups or [])
+    author_jql = ' and (' + ' or '.join(author_filters) + ')' if author_filters else ''
+
+    # Order by key so that the issues do not move between the pages when they are updated during pagination
+    return '(' + ' or '.join(filters) + ') and timeSpent is not null and worklogDate >= "' + from_date + '"' + \
+           ' and worklogDate < "' + convert_to_date(to_date).strftime("%Y-%m-%d") + '"' + author_jql + ' order by key'
+
+
+def strip_order_by(jql_filter):
+    """
+    Removes the ORDER BY clause of a JQL filter, which is not allowed within the parentheses it is combined in
+    :param jql_filter: the JQL filter, e.g. of a saved filter
+    :return: the condition of the JQL filter without the ORDER BY clause and surrounding spaces
+    """
+    quote = None
+    depth = 0
+    index = 0
+    while index < len(jql_filter):
+        character = jql_filter[index]
+        if quote:
+            if character == '\\':
+                index += 1
+            elif character == quote:
+                quote = None
+        elif character in '"\'':
+            quote = character
+        elif character == '(':
+            depth += 1
+        elif character == ')':
+            depth -= 1
+        elif depth == 0 and (index == 0 or not jql_filter[index - 1].isalnum()) and \
+                ORDER_BY_PATTERN.match(jql_filter, index):
+            return jql_filter[:index].strip()
+        index += 1
+    return jql_filter.strip()
+
+
+def decode_response(client, response):
+    """
+    Decodes the JSON of a response, the decoding is timed when the client is profiled
+    :param client: the JiraClient which has performed the request
+    :param response: the response as returned by the client
+    :return: the decoded JSON
+    """
+    if client.profiler is None:
+        return decode_json(response.content)
+    with client.profiler.phase("decode"):
+        return decode_json(response.content)
+
+
+def quote_jql(value):
+    """
+    Quotes a value for use in JQL
+    :param value: the value to quote
+    :return: the value between double quotes and with double quotes and backslashes escaped
+    """
+    return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def convert_json_to_issues(response_json, enricher=None):
+    """
+    Convert JSON issues into Issue objects
+    :param response_json: the JSON text as received from Jira
+    :param enricher: the IssueEnricher to add the extra fields of the issues with, None for no extra fields
+    :return: a list of Issues
+    """
+    issues = []
+    for issue_json in response_json['issues']:
+        resolution_date = issue_json['fields']['resolutiondate']
+        issue = Issue(int(issue_json['id']),
+                      issue_json['key'],
+                      issue_json['fields']['summary'],
+                      issue_json['fields']['parent']['key'] if 'parent' in issue_json['fields'] else None,
+                      issue_json['fields']['parent']['fields']['summary'] if 'parent' in issue_json['fields'] else None,
+                      issue_json['fields']['timeoriginalestimate'],
+                      issue_json['fields']['timespent'],
+                      parse_date(resolution_date) if resolution_date is not None else None,
+                      issue_json['fields'].get('updated'))
+        if enricher:
+            enricher.convert(issue, issue_json['fields'])
+        issues.append(issue)
+
+    return issues
+
+
+def create_lookup_batches(enricher, issues):
+    """
+    Splits the keys of the parents and epics which have not been looked up before during the run into batches
+    :param enricher: the IssueEnricher which has converted the issues
+    :param issues: the list of issues retrieved with the enricher
+    :return: the list of batches of at most LOOKUP_BATCH_SIZE keys
+    """
+    keys = enricher.get_missing_keys(issues)
+    return [keys[start:start + LOOKUP_BATCH_SIZE] for start in range(0, len(keys), LOOKUP_BATCH_SIZE)]
+
+
+def related_issues_requests(keys, fields):
+    """
+    The request generator searching the parents or epics of issues by their keys, see jiratimereport.perform
+    :param keys: the list of keys to search
+    :param fields: the list of ids of the fields to retrieve
+    :return: the list of JSON issues found, the keys which do not exist are left out
+    """
+    issues_json = []
+    start_at = 0
+    while start_at is not None:
+        response_json = yield JiraRequest("/rest/api/2/search", create_related_issues_query(keys, fields, start_at))
+        issues_json.extend(response_json['issues'])
+        start_at = get_next_start_at(response_json, start_at) if response_json['issues'] else None
+
+    return issues_json
+
+
+def create_related_issues_query(keys, fields, start_at=0):
+    """Create the query parameters for searching the parents or epics of issues by their keys
+
+    :param keys: the list of keys to search
+    :param fields: the list of ids of the fields to retrieve
+    :param start_at: the index of the first issue of the page
+    :return: the query parameters
+    """
+    return {
+        'jql': 'key in (' + ', '.join(quote_jql(key) for key in keys) + ') order by key',
+        'fields': ','.join(['key'] + fields),
+        'startAt': str(start_at),
+        'maxResults': str(len(keys)),
+        # Keys of deleted issues or issues which are not visible are reported as a warning instead of an error
+        'validateQuery': 'warn'
+    }
+
+
+def issue_work_logs_requests(issue, from_date, to_date, cache=None, author_ids=None, narrow=False):
+    """
+    The request generator retrieving the work logs of a single issue, see jiratimereport.get_issue_work_logs
+    :param issue: the issue to retrieve the work logs for
+    :param from_date The datetime to start the time report
+    :param to_date The datetime to end the time report (exclusive)
+    :param cache: the WorkLogCache to use, None for always retrieving the work logs from Jira
+    :param author_ids: a set of account ids or user names, only the work logs of these authors are used, None for all
+    authors
+    :param narrow: whether to retrieve only the work logs started between the from and to date from Jira
+    :return: the list of work logs of the issue which have been started between the from and to date
+    """
+    if narrow:
+        all_work_logs = yield from work_logs_requests(issue.key, from_date - NARROW_MARGIN, to_date + NARROW_MARGIN)
+        if issue.issue_start_date is None:
+            issue.issue_start_date = yield from issue_start_date_requests(issue, cache)
+    else:
+        all_work_logs = cache.get(issue) if cache else None
+        if all_work_logs is None:
+            all_work_logs = yield from work_logs_requests(issue.key)
+            if cache:
+                cache.put(issue, all_work_logs)
+
+    return select_work_logs(issue, all_work_logs, from_date, to_date, author_ids)
+
+
+def select_work_logs(issue, all_work_logs, from_date, to_date, author_ids=None):
+    """Select the work logs of a single issue which are part of the time report
+
+    The issue start date of the issue is set to the date of the first work log when it is not known yet.
+
+    :param issue: the issue the work logs belong to
+    :param all_work_logs: the list of work logs of the issue in the order returned by Jira
+    :param from_date The datetime to start the time report
+    :param to_date The datetime to end the time report (exclusive)
+    :param author_ids: a set of account ids or user names, only the work logs of these authors are used, None for all
+    authors
+    :return: the list of work logs of the issue which have been started between the from and to date
+    """
+    work_logs = []
+    for work_log in all_work_logs:
+        if issue.issue_start_date is None:
+            issue.issue_start_date = work_log.started
+        if from_date <= work_log.started < to_date and (author_ids is None or work_log.author_id in author_ids):
+            work_logs.append(work_log)
+
+    return work_logs
+
+
+def issue_start_date_requests(issue, cache=None):
+    """
+    The request generator retrieving the date of the first work log of an issue, see jiratimereport.get_issue_start_date
+    :param issue: the issue to retrieve the date of the first work log for
+    :param cache: the WorkLogCache to use, None for always retrieving the date from Jira
+    :return: the datetime of the first work log, None if the issue has no work logs
+    """
+    start_date = cache.get_start_date(issue) if cache else None
+    if start_date is None:
+        response_json = yield JiraRequest("/rest/api/2/issue/" + issue.key + "/worklog/",
+                                          {'startAt': "0", 'maxResults': "1"})
+        start_date = convert_json_to_start_date(response_json)
+        if cache:
+            cache.put_start_date(issue, start_date)
+    return start_date
+
+
+def convert_json_to_start_date(response_json):
+    """
+    Convert a JSON page of work logs starting at the first work log of an issue into the issue start date
+    :param response_json: the JSON page of work logs as received from Jira
+    :return: the datetime of the first work log, None if the issue has no work logs
+    """
+    work_logs_json = response_json['worklogs']
+    return parse_date(work_logs_json[0]['started']) if work_logs_json else None
+
+
+def work_logs_requests(issue_key, started_after=None, started_before=None):
+    """
+    The request generator retrieving all work logs of a single issue, see jiratimereport.fetch_issue_work_logs
+    :param issue_key: the key of the issue to retrieve the work logs for
+    :param started_after: the datetime from which the work logs are retrieved, None for all work logs
+    :param started_before: the datetime before which the work logs are retrieved, None for all work logs
+    :return: the list of all work logs of the issue in the order returned by Jira
+    """
+    work_logs = []
+    start_at = 0
+    while start_at is not None:
+        response_json = yield JiraRequest("/rest/api/2/issue/" + issue_key + "/worklog/",
+                                          create_work_log_page_params(start_at, started_after, started_before))
+        work_logs.extend(convert_json_to_work_logs(issue_key, response_json))
+        start_at = get_next_start_at(response_json, start_at)
+
+    return work_logs
+
+
+def create_work_log_page_params(start_at, started_after=None, started_before=None):
+    """Create the query parameters for retrieving one page of work logs of an issue
+
+    :param start_at: the index of the first work log of the page
+    :param started_after: the datetime from which the work logs are retrieved, None for all work logs
+    :param started_before: the datetime before which the work logs are retrieved, None for all work logs
+    :return: the query parameters
+    """
+    params = {
+        'startAt': str(start_at)
+    }
+    # Jira versions which do not support narrowing ignore the parameters, the work logs are filtered afterwards
+    if started_after is not None:
+        params['startedAfter'] = str(int(started_after.timestamp() * 1000))
+    if started_before is not None:
+        params['startedBefore'] = str(int(started_before.timestamp() * 1000))
+    return params
+
+
+def convert_json_to_work_logs(issue_key, response_json):
+    """
+    Convert a JSON page of work logs into WorkLog objects
+    :param issue_key: the key of the issue the work logs belong to
+    :param response_json: the JSON page of work logs as received from Jira
+    :return: a list of WorkLogs
+    """
+    work_logs = []
+    for work_log_json in response_json['worklogs']:
+        started = work_log_json['started']
+        author_json = work_log_json['author']
+        work_logs.append(WorkLog(issue_key,
+                                 parse_date(started),
+                                 int(work_log_json['timeSpentSeconds']),
+                                 author_json['displayName'],
+                                 get_author_id(author_json)))
+    return work_logs
+
+
+def get_next_start_at(response_json, start_at):
+    """
+    Verify whether it is necessary to invoke the API request again because of pagination
+    :param response_json: the JSON page as received from Jira
+    :param start_at: the index of the first item of the page
+    :return: the index of the first item of the next page, None if this is the last page
+    """
+    total_number_of_issues = int(response_json['total'])
+    max_results = int(response_json['maxResults'])
+    max_number_of_issues_processed = start_at + max_results
+    if max_number_of_issues_processed < total_number_of_issues:
+        return max_number_of_issues_processed
+    return None
+
+
+class AuthorNotFoundError(ValueError):
+    """An AuthorNotFoundError is raised when an author or group to select the work logs of does not exist in Jira"""
+
+
+def author_ids_requests(authors=None, groups=None):
+    """
+    The request generator retrieving the ids of authors and of the members of groups, see jiratimereport.get_author_ids
+    :param authors: a list of account ids or user names
+    :param groups: a list of Jira groups
+    :return: the set of account ids or user names
+    """
+    author_ids = set()
+    for author in authors or []:
+        author_ids.add((yield from user_id_requests(author)))
+    for group in groups or []:
+        start_at = 0
+        while True:
+            response_json = yield JiraRequest("/rest/api/2/group/member", {'groupname': group,
+                                                                          'startAt': str(start_at)}, missing_ok=True)
+            if response_json is None:
+                raise AuthorNotFoundError("the group " + group + " is not found")
+            author_ids.update(get_author_id(member) for member in response_json['values'])
+
+            # Verify whether it is necessary to invoke the API request again because of pagination
+            if response_json.get('isLast', True) or not response_json['values']:
+                break
+            start_at += len(response_json['values'])
+
+    return author_ids
+
+
+def user_id_requests(author):
+    """
+    The request generator retrieving the id of a user, see jiratimereport.get_user_id
+    :param author: the account id or user name
+    :return: the account id or user name, see get_author_id
+    """
+    for parameter in ('accountId', 'username'):
+        response_json = yield JiraRequest("/rest/api/2/user", {parameter: author}, missing_ok=True)
+        if response_json is not None:
+            return get_author_id(response_json)
+
+    raise AuthorNotFoundError("the author " + author + " is not found by account id or user name")
+
+
+def get_author_id(user_json):
+    """
+    Determines the id of a user, e.g. of the author of a work log
+    :param user_json: the JSON user as received from Jira
+    :return: the account id on Jira Cloud, otherwise the user name
+    """
+    return user_json.get('accountId') or user_json.get('name')
@@ -0,0 +1,48 @@
+from datetime import date, datetime, timedelta
+
+SHARD_UNITS = ['month', 'week']
+
+
+def split_date_range(from_date, to_date, unit):
+    """Split the period of a time report into consecutive shards of a month or a week
+
+    Weeks start on Monday like ISO weeks. The first and last shard are cut off at the from and to date, so the shards
+    cover exactly the period of the time report.
+
+    :param from_date: the date to start the time report, format yyyy-mm-dd
+    :param to_date: the date to end the time report (the end date is inclusive), format yyyy-mm-dd, None for today
+    :param unit: the length of a shard, month or week
+    :return: the list of from and to dates of the shards, format yyyy-mm-dd, the to dates are inclusive
+    """
+    if unit not in SHARD_UNITS:
+        raise ValueError("invalid shard unit " + unit + ", choose from " + ", ".join(SHARD_UNITS))
+    shard_from_date = datetime.strptime(from_date, "%Y-%m-%d").date()
+    last_date = datetime.strptime(to_date, "%Y-%m-%d").date() if to_date else date.today()
+
+    shards = []
+    while shard_from_date <= last_date:
+        if unit == "month":
+            next_from_date = (shard_from_date.replace(day=1) + timedelta(days=31)).replace(day=1)
+        else:
+            next_from_date = shard_from_date + timedelta(days=7 - shard_from_date.weekday())
+        shard_to_date = min(next_from_date - timedelta(days=1), last_date)
+        shards.append((shard_from_date.isoformat(), shard_to_date.isoformat()))
+        shard_from_date = next_from_date
+    return shards
+
+
+def split_into_chunks(items, number_of_chunks):
+    """Split a list into consecutive chunks of nearly the same size
+
+    :param items: the list to split
+    :param number_of_chunks: the maximum number of chunks
+    :return: the list of non-empty chunks
+    """
+    chunk_size, remainder = divmod(len(items), max(number_of_chunks, 1))
+    chunks = []
+    start = 0
+    for index in range(min(number_of_chunks, len(items))):
+        end = start + chunk_size + (1 if index < remainder else 0)
+        chunks.append(items[start:end])
+        start = end
+    return chunks
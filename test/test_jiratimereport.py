@@ -1,15 +1,69 @@
+import asyncio
+import contextlib
 import filecmp
+import http.server
+import io
 import json
+import os
+import random
+import subprocess
 import sys
+import tempfile
+import threading
+import time
 import unittest
-from datetime import datetime
+import unittest.mock
+import urllib.error
+import urllib.request
+from datetime import date, datetime
+from operator import attrgetter
 
 import pandas as pd
+import requests
 import requests_mock
 
+import asyncjiratimereport
+import decoding
 import jiratimereport
+import retrieval
+from enrichment import IssueEnricher, parse_fields
+from asyncjiraclient import AsyncJiraClient, httpx
+from benchmark import endtoend
+from benchmark.fakejira import FakeJira, DEFAULT_FROM_DATE, DEFAULT_TO_DATE
+from checkpoint import CheckpointJournal
+from externalsort import external_sort
+from jiraclient import JiraClient
+from profiling import Profiler
+from reportserver import ReportServer, create_http_server
+from sharding import split_date_range
 from issue import Issue
 from worklog import WorkLog
+from worklogcache import WorkLogCache
+
+
+class CountingIssueIndex(dict):
+    """A CountingIssueIndex is an issue index which counts the lookups by issue key and the scans of all issues
+    """
+    def __init__(self, items):
+        super().__init__(items)
+        self.lookups = 0
+        self.scans = 0
+
+    def __getitem__(self, key):
+        self.lookups += 1
+        return super().__getitem__(key)
+
+    def __iter__(self):
+        self.scans += 1
+        return super().__iter__()
+
+    def values(self):
+        self.scans += 1
+        return super().values()
+
+    def items(self):
+        self.scans += 1
+        return super().items()
 
 
 class MyTestCase(unittest.TestCase):
@@ -31,6 +85,139 @@ class MyTestCase(unittest.TestCase):
 
         self.assertListEqual(issues_expected_result, issues, "Issues lists are unequal")
 
+    def test_get_updated_issues_multiple_filters(self):
+        """
+        Test retrieving the issues of multiple projects and JQL filters in one search
+        """
+        with open("issues_one_page.json", "r") as issues_file:
+            mock_response = issues_file.read()
+
+        with requests_mock.Mocker(case_sensitive=True) as m:
+            m.register_uri('GET', '/rest/api/2/search', text=mock_response)
+            issues = jiratimereport.get_updated_issues("https://jira_url", "user_name", "api_token", "MYB,OTHER",
+                                                       "2020-01-10", "2020-01-20", "", jql=['labels = "Team A"'])
+
+        self.assertListEqual(["MYB-5", "MYB-4"], [issue.key for issue in issues])
+        self.assertEqual(1, m.call_count)
+        self.assertEqual('(project in ("MYB", "OTHER") or (labels = "Team A")) and timeSpent is not null and '
+                         'worklogDate >= "2020-01-10" and worklogDate < "2020-01-21" order by key',
+                         m.request_history[0].qs['jql'][0])
+
+    def test_create_issue_jql_order_by(self):
+        """
+        Test that the ORDER BY clause of a JQL filter is removed before the filter is combined with the others
+        """
+        self.assertEqual('((project = "ABC") or (summary ~ "sort order by date" and labels in (x, y)) or '
+                         '(assignee = currentUser())) and timeSpent is not null and worklogDate >= "2020-01-10" and '
+                         'worklogDate < "2020-01-21" order by key',
+                         retrieval.create_issue_jql(None, ['project = "ABC" ORDER BY created DESC',
+                                                           'summary ~ "sort order by date" and labels in (x, y) '
+                                                           'order\tby "Story Points"',
+                                                           'assignee = currentUser()'],
+                                                    "2020-01-10", "2020-01-20"))
+        with self.assertRaises(ValueError):
+            retrieval.create_issue_jql("MYB", ["ORDER BY rank"], "2020-01-10", "2020-01-20")
+
+    def test_get_updated_issues_concurrent_pages(self):
+        """
+        Test the concurrent retrieval of pages of issues, including issues shifting between pages during pagination
+        """
+        with open("issues_multiple_first_page.json", "r") as issues_first_file:
+            issues_json = json.loads(issues_first_file.read())['issues']
+
+        with open("issues_multiple_second_page.json", "r") as issues_second_file:
+            issues_json.extend(json.loads(issues_second_file.read())['issues'])
+
+        issues_json.append(dict(issues_json[2], id="10007", key="MYB-7"))
+
+        def page(start_at, *issue_indexes):
+            return {'json': {'startAt': start_at, 'maxResults': 1, 'total': 4,
+                             'issues': [issues_json[index] for index in issue_indexes]}}
+
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', '/rest/api/2/search?startAt=0', [page(0, 0)])
+            m.register_uri('GET', '/rest/api/2/search?startAt=1', [page(1, 1)])
+            m.register_uri('GET', '/rest/api/2/search?startAt=2', [page(2, 2)])
+            m.register_uri('GET', '/rest/api/2/search?startAt=3', [page(3, 3)])
+            issues = jiratimereport.get_updated_issues("https://jira_url", "user_name", "api_token", "MYB",
+                                                       "2020-01-10", "2020-01-20", "", workers=3, page_size=1)
+
+        self.assertListEqual(["MYB-5", "MYB-4", "MYB-6", "MYB-7"], [issue.key for issue in issues])
+        self.assertEqual(4, m.call_count)
+        self.assertTrue(all(request.qs['maxresults'] == ['1'] for request in m.request_history))
+
+        with requests_mock.Mocker() as m:
+            # MYB-4 shifts to the page of MYB-6 and MYB-6 shifts to the page of MYB-7 which is then missed
+            m.register_uri('GET', '/rest/api/2/search?startAt=0', [page(0, 0)])
+            m.register_uri('GET', '/rest/api/2/search?startAt=1', [page(1, 0), page(1, 1)])
+            m.register_uri('GET', '/rest/api/2/search?startAt=2', [page(2, 1), page(2, 2)])
+            m.register_uri('GET', '/rest/api/2/search?startAt=3', [page(3, 2), page(3, 3)])
+            issues = jiratimereport.get_updated_issues("https://jira_url", "user_name", "api_token", "MYB",
+                                                       "2020-01-10", "2020-01-20", "", workers=3, page_size=1)
+
+        self.assertListEqual(["MYB-5", "MYB-4", "MYB-6", "MYB-7"], [issue.key for issue in issues])
+        self.assertEqual(8, m.call_count)
+
+    def test_get_updated_issues_replaced_during_pagination(self):
+        """
+        Test that issues which shift into a retrieved page are found when others start matching and the total is equal
+        """
+        with open("issues_multiple_first_page.json", "r") as issues_first_file:
+            issue_json = json.loads(issues_first_file.read())['issues'][0]
+
+        def create_issues_json(*numbers):
+            return [dict(issue_json, id=str(10000 + number), key="MYB-" + str(number)) for number in numbers]
+
+        matching_issues_json = [create_issues_json(1, 2, 3, 4, 5)]
+
+        def search_callback(request, context):
+            start_at = int(request.qs['startat'][0])
+            page_json = {'startAt': start_at, 'maxResults': 3, 'total': 5,
+                         'issues': matching_issues_json[0][start_at:start_at + 3]}
+            # MYB-1 and MYB-2 stop matching and MYB-6 and MYB-7 start matching after the first page, so MYB-4 shifts
+            # into the first page
+            matching_issues_json[0] = create_issues_json(3, 4, 5, 6, 7)
+            return page_json
+
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', '/rest/api/2/search', json=search_callback)
+            issues = jiratimereport.get_updated_issues("https://jira_url", "user_name", "api_token", "MYB",
+                                                       "2020-01-10", "2020-01-20", "", page_size=3)
+
+        self.assertListEqual(["MYB-1", "MYB-2", "MYB-3", "MYB-5", "MYB-6", "MYB-7", "MYB-4"],
+                             [issue.key for issue in issues])
+        self.assertListEqual(["0", "2", "0", "3"], [request.qs['startat'][0] for request in m.request_history])
+
+    def test_main_rejects_workers_below_one(self):
+        """
+        Test that a number of workers below one is reported as a usage error instead of failing in the thread pool
+        """
+        for workers in ("0", "-1"):
+            with unittest.mock.patch.object(sys, 'argv', ["jiratimereport.py", "https://jira_url", "user_name",
+                                                          "api_token", "MYB", "2020-01-10", "--workers", workers]), \
+                    contextlib.redirect_stderr(io.StringIO()) as stderr, self.assertRaises(SystemExit) as exit_context:
+                jiratimereport.main()
+            self.assertEqual(2, exit_context.exception.code)
+            self.assertIn("--workers must be at least 1", stderr.getvalue())
+
+    def test_main_script_author_not_found(self):
+        """
+        Test that an unknown author is reported as a usage error by both engines when jiratimereport runs as a script,
+        the async engine must not load a second copy of the module with another AuthorNotFoundError
+        """
+        fake_jira = FakeJira(projects=1, issues=2, work_logs=2)
+        url = fake_jira.start()
+        try:
+            for engine in ("issue", "async"):
+                completed = subprocess.run([sys.executable, os.path.abspath(jiratimereport.__file__), url, "user_name",
+                                            "api_token", "P0", DEFAULT_FROM_DATE, "--engine", engine, "--authors",
+                                            "nobody"], capture_output=True, text=True, timeout=60)
+                self.assertEqual(2, completed.returncode, completed.stderr)
+                self.assertIn("the author nobody is not found", completed.stderr)
+                self.assertNotIn("Traceback", completed.stderr)
+        finally:
+            fake_jira.close()
+
     def test_convert_json_to_issues(self):
         """
         Test the conversion of json issues to object issues
@@ -38,7 +225,7 @@ class MyTestCase(unittest.TestCase):
         with open("convert_json_to_issues.json", "r") as issues_file:
             response_json = json.loads(issues_file.read())
 
-        issues = jiratimereport.convert_json_to_issues(response_json)
+        issues = retrieval.convert_json_to_issues(response_json)
 
         issues_expected_result = [
             Issue(10005, "MYB-5", "Summary of issue MYB-5", "MYB-3", "Summary of the parent issue of MYB-5", 3600, 900, datetime(2020, 1, 20)),
@@ -72,14 +259,20 @@ class MyTestCase(unittest.TestCase):
             mock_response_first_page = issues_first_file.read()
 
         with open("issues_multiple_second_page.json", "r") as issues_second_file:
-            mock_response_second_page = issues_second_file.read()
+            second_page_json = json.loads(issues_second_file.read())
+
+        # The second page overlaps the first page by one issue
+        second_page_json['startAt'] = 1
+        second_page_json['issues'][:0] = json.loads(mock_response_first_page)['issues'][1:]
 
         with requests_mock.Mocker() as m:
-            m.register_uri('GET', '/rest/api/2/search', [{'text': mock_response_first_page},
-                                                         {'text': mock_response_second_page}])
+            m.register_uri('GET', '/rest/api/2/search?startAt=0', text=mock_response_first_page)
+            m.register_uri('GET', '/rest/api/2/search?startAt=1', json=second_page_json)
             issues = jiratimereport.get_updated_issues("https://jira_url", "user_name", "api_token", "MYB",
                                                        "2020-01-10", "2020-01-20", "")
 
+        self.assertEqual(2, m.call_count)
+
         issues_expected_result = [
             Issue(10005, "MYB-5", "Summary of issue MYB-5", "MYB-3", "Summary of the parent issue of MYB-5", 3600, 900, datetime(2020, 1, 20)),
             Issue(10004, "MYB-4", "Summary of issue MYB-4", "MYB-3", "Summary of the parent issue of MYB-4", 7200, 600, None),
@@ -87,6 +280,64 @@ class MyTestCase(unittest.TestCase):
 
         self.assertListEqual(issues_expected_result, issues, "Issues lists are unequal")
 
+    def test_get_updated_issues_with_fields(self):
+        """
+        Test adding extra fields of issues and of their parents and epics, which are looked up by one batched search
+        """
+        def issue_json(key, summary, fields):
+            return dict(id=key[4:], key=key, fields=dict(dict(summary=summary, timeoriginalestimate=None,
+                                                              timespent=3600, resolutiondate=None), **fields))
+
+        issues_response = {'startAt': 0, 'maxResults': 50, 'total': 3, 'issues': [
+            issue_json("MYB-4", "Summary of issue MYB-4",
+                       {'parent': {'key': "MYB-3", 'fields': {'summary': "Summary of MYB-3"}},
+                        'components': [{'name': "Backend"}, {'name': "API"}], 'labels': ["billing"],
+                        'customfield_10014': "MYB-1"}),
+            issue_json("MYB-5", "Summary of issue MYB-5",
+                       {'parent': {'key': "MYB-3", 'fields': {'summary': "Summary of MYB-3"}},
+                        'components': [], 'labels': [], 'customfield_10014': "MYB-9"}),
+            issue_json("MYB-6", "Summary of issue MYB-6", {'components': [], 'labels': [], 'customfield_10014': None})]}
+        related_response = {'startAt': 0, 'maxResults': 3, 'total': 2, 'issues': [
+            issue_json("MYB-1", "Summary of epic MYB-1", {'timeoriginalestimate': 36000}),
+            issue_json("MYB-3", "Summary of MYB-3", {'timeoriginalestimate': 7200})]}
+
+        def search_callback(request, context):
+            return related_response if request.qs['jql'][0].startswith("key in") else issues_response
+
+        self.assertRaises(ValueError, parse_fields, "labels,summary", jiratimereport.FIELD_NAMES)
+        self.assertRaises(ValueError, parse_fields, "story.summary")
+        enricher = IssueEnricher(parse_fields("components,labels,parent.timeoriginalestimate,epic.summary"))
+        client = JiraClient("https://jira_url", "user_name", "api_token")
+
+        with requests_mock.Mocker(case_sensitive=True) as m:
+            m.register_uri('GET', '/rest/api/2/search', json=search_callback)
+            issues = jiratimereport.get_updated_issues(None, None, None, "MYB", "2020-01-10", "2020-01-20", None,
+                                                       client, enricher=enricher)
+            jiratimereport.enrich_issues(client, issues, enricher)
+            self.assertEqual(2, m.call_count)
+            self.assertIn("components,labels,customfield_10014", m.request_history[0].qs['fields'][0])
+            self.assertEqual(['key in ("MYB-1", "MYB-3", "MYB-9") order by key'], m.last_request.qs['jql'])
+            self.assertEqual(['key,timeoriginalestimate,summary'], m.last_request.qs['fields'])
+
+            issues = jiratimereport.get_updated_issues(None, None, None, "MYB", "2020-01-10", "2020-01-20", None,
+                                                       client, enricher=enricher)
+            jiratimereport.enrich_issues(client, issues, enricher)
+            self.assertEqual(3, m.call_count)
+
+        self.assertListEqual([("Backend, API", "billing", "7200", "Summary of epic MYB-1"),
+                              (None, None, "7200", None),
+                              (None, None, None, None)], [issue.extra_fields for issue in issues])
+
+        with tempfile.TemporaryDirectory() as output_dir:
+            csv_file_name = output_dir + "/report.csv"
+            jiratimereport.process_work_logs("csv", issues, [WorkLog("MYB-4", datetime(2020, 1, 12), 600, "John Doe")],
+                                             output_file=csv_file_name, extra_field_names=enricher.fields)
+            with open(csv_file_name, "r") as csv_file:
+                lines = csv_file.read().splitlines()
+        self.assertTrue(lines[0].endswith('"parent_summary","components","labels","parent.timeoriginalestimate",'
+                                          '"epic.summary"'))
+        self.assertTrue(lines[1].endswith('"Backend, API","billing","7200","Summary of epic MYB-1"'))
+
     def test_get_work_logs_one_page(self):
         """
         Test the single page response when retrieving Jira work logs
@@ -124,6 +375,155 @@ class MyTestCase(unittest.TestCase):
 
         self.assertListEqual(issues_expected_result, issues, "Issue lists are unequal")
 
+    def test_get_work_logs_of_authors(self):
+        """
+        Test narrowing the issues and work logs to the work logs of authors and members of groups
+        """
+        with open("work_logs_first_issue_one_page.json", "r") as first_issue_file:
+            mock_response_first_issue = first_issue_file.read()
+
+        with open("work_logs_second_issue_one_page.json", "r") as second_issue_file:
+            # Another John Doe, display names are not unique
+            mock_response_second_issue = second_issue_file.read().replace("012345678901234567890123", "jdoe2")
+
+        self.assertEqual('(project in ("MYB")) and timeSpent is not null and worklogDate >= "2020-01-10" and '
+                         'worklogDate < "2020-01-21" and (worklogAuthor in ("jdoe") or worklogAuthor in '
+                         'membersOf("team-a")) order by key',
+                         retrieval.create_issue_jql("MYB", None, "2020-01-10", "2020-01-20", ["jdoe"], ["team-a"]))
+
+        issues = [Issue(10005, "MYB-5", "Summary of issue MYB-5", "MYB-3", "Summary of the parent issue of MYB-5", 3600, 900, datetime(2020, 1, 20)),
+                  Issue(10004, "MYB-4", "Summary of issue MYB-4", "MYB-3", "Summary of the parent issue of MYB-4", 7200, 600, None)]
+        client = JiraClient("https://jira_url", "user_name", "api_token")
+
+        with requests_mock.Mocker(case_sensitive=True) as m:
+            m.register_uri('GET', '/rest/api/2/user?accountId=jdoe', status_code=404)
+            m.register_uri('GET', '/rest/api/2/user?username=jdoe',
+                           json={'accountId': "012345678901234567890123", 'name': "jdoe", 'displayName': "John Doe"})
+            m.register_uri('GET', '/rest/api/2/user?accountId=nobody', status_code=404)
+            m.register_uri('GET', '/rest/api/2/user?username=nobody', status_code=404)
+            m.register_uri('GET', '/rest/api/2/group/member?groupname=team-a&startAt=0',
+                           json={'values': [{'accountId': "mmajor", 'displayName': "Mary Major"}], 'isLast': False})
+            m.register_uri('GET', '/rest/api/2/group/member?groupname=team-a&startAt=1',
+                           json={'values': [{'name': "rroe", 'displayName': "Richard Roe"}], 'isLast': True})
+            m.register_uri('GET', '/rest/api/2/issue/MYB-5/worklog/', text=mock_response_first_issue)
+            m.register_uri('GET', '/rest/api/2/issue/MYB-4/worklog/', text=mock_response_second_issue)
+            author_ids = jiratimereport.get_author_ids(client, ["jdoe"], ["team-a"])
+            work_logs, issues = jiratimereport.get_work_logs(None, None, None, "2020-01-10", "2020-01-20", None,
+                                                             issues, client=client, author_ids=author_ids,
+                                                             narrow=True)
+            with self.assertRaises(retrieval.AuthorNotFoundError):
+                jiratimereport.get_author_ids(client, ["nobody"])
+
+        self.assertSetEqual({"012345678901234567890123", "mmajor", "rroe"}, author_ids)
+        self.assertListEqual([WorkLog("MYB-5", datetime(2020, 1, 18), 3600, "John Doe"),
+                              WorkLog("MYB-5", datetime(2020, 1, 18), 5400, "John Doe")], work_logs)
+        self.assertEqual(datetime(2020, 1, 12), issues[1].issue_start_date)
+        narrowed_requests = [request for request in m.request_history
+                             if '/worklog/' in request.path and 'maxResults' not in request.qs]
+        self.assertEqual(2, len(narrowed_requests))
+        for request in narrowed_requests:
+            self.assertIn('startedAfter', request.qs)
+            self.assertIn('startedBefore', request.qs)
+
+    def test_get_work_logs_narrowed_boundaries(self):
+        """
+        Test that narrowing keeps the work logs on the from and to date which are started in other time zones
+        """
+        work_logs_json = [{'author': {'name': "jdoe", 'displayName': "John Doe"}, 'started': started,
+                           'timeSpentSeconds': time_spent}
+                          for started, time_spent in [("2020-01-09T23:30:00.000+0100", 600),
+                                                      ("2020-01-10T00:30:00.000+0100", 900),
+                                                      ("2020-01-20T23:30:00.000-0500", 1200),
+                                                      ("2020-01-21T00:30:00.000+0100", 1500)]]
+
+        def work_logs_callback(request, context):
+            # Jira compares the start of the work logs as instants in milliseconds since the epoch
+            started_after = int(request.qs['startedafter'][0])
+            started_before = int(request.qs['startedbefore'][0])
+            selected = [work_log_json for work_log_json in work_logs_json if started_after <= datetime.strptime(
+                work_log_json['started'], "%Y-%m-%dT%H:%M:%S.%f%z").timestamp() * 1000 < started_before]
+            return {'startAt': 0, 'maxResults': 20, 'total': len(selected), 'worklogs': selected}
+
+        issues = [Issue(10004, "MYB-4", "Summary of issue MYB-4", "MYB-3", "Summary of the parent issue of MYB-4", 7200, 600, None)]
+        issues[0].issue_start_date = datetime(2020, 1, 9)
+
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', '/rest/api/2/issue/MYB-4/worklog/', json=work_logs_callback)
+            work_logs, _ = jiratimereport.get_work_logs("https://jira_url", "user_name", "api_token", "2020-01-10",
+                                                        "2020-01-20", "", issues, narrow=True)
+
+        self.assertListEqual([WorkLog("MYB-4", datetime(2020, 1, 10), 900, "John Doe"),
+                              WorkLog("MYB-4", datetime(2020, 1, 20), 1200, "John Doe")], work_logs)
+
+    def test_get_work_logs_narrowed_start_date(self):
+        """
+        Test that the issue start date is retrieved by a single work log and kept in the cache when narrowing
+        """
+        with open("work_logs_second_issue_one_page.json", "r") as second_issue_file:
+            mock_response_second_issue = second_issue_file.read()
+
+        def work_logs_callback(request, context):
+            # The first work log of MYB-4 is started before the from date, so it is not returned when narrowed
+            return mock_response_second_issue if 'maxResults' in request.qs else \
+                '{"startAt": 0, "maxResults": 20, "total": 0, "worklogs": []}'
+
+        def create_issues(updated):
+            return [Issue(10004, "MYB-4", "Summary of issue MYB-4", "MYB-3", "Summary of the parent issue of MYB-4", 7200, 600, None, updated)]
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = WorkLogCache(cache_dir, "https://jira_url")
+            client = JiraClient("https://jira_url", "user_name", "api_token")
+
+            with requests_mock.Mocker(case_sensitive=True) as m:
+                m.register_uri('GET', '/rest/api/2/issue/MYB-4/worklog/', text=work_logs_callback)
+                work_logs, issues = jiratimereport.get_work_logs(None, None, None, "2020-01-15", "2020-01-20", None,
+                                                                 create_issues("2020-01-12T10:00:00.000+0100"),
+                                                                 client=client, cache=cache, narrow=True)
+                self.assertEqual(2, m.call_count)
+                self.assertEqual({'startAt': ["0"], 'maxResults': ["1"]}, m.last_request.qs)
+
+                _, cached_issues = jiratimereport.get_work_logs(None, None, None, "2020-01-15", "2020-01-20", None,
+                                                                create_issues("2020-01-12T10:00:00.000+0100"),
+                                                                client=client, cache=cache, narrow=True)
+                self.assertEqual(3, m.call_count)
+                self.assertIn('startedAfter', m.last_request.qs)
+
+                jiratimereport.get_work_logs(None, None, None, "2020-01-15", "2020-01-20", None,
+                                             create_issues("2020-01-19T10:00:00.000+0100"), client=client, cache=cache,
+                                             narrow=True)
+                self.assertEqual(5, m.call_count)
+
+            cache.close()
+
+        self.assertListEqual([], work_logs)
+        self.assertEqual(datetime(2020, 1, 12), issues[0].issue_start_date)
+        self.assertEqual(datetime(2020, 1, 12), cached_issues[0].issue_start_date)
+
+    def test_get_work_logs_concurrently(self):
+        """
+        Test that the work logs retrieved concurrently are returned in the order of the issues
+        """
+        with open("work_logs_first_issue_one_page.json", "r") as first_issue_file:
+            mock_response_first_issue = first_issue_file.read()
+
+        with open("work_logs_second_issue_one_page.json", "r") as second_issue_file:
+            mock_response_second_issue = second_issue_file.read()
+
+        issues = [Issue(10005, "MYB-5", "Summary of issue MYB-5", "MYB-3", "Summary of the parent issue of MYB-5", 3600, 900, datetime(2020, 1, 20)),
+                  Issue(10004, "MYB-4", "Summary of issue MYB-4", "MYB-3", "Summary of the parent issue of MYB-4", 7200, 600, None)]
+
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', '/rest/api/2/issue/MYB-5/worklog/', text=mock_response_first_issue)
+            m.register_uri('GET', '/rest/api/2/issue/MYB-4/worklog/', text=mock_response_second_issue)
+            work_logs, issues = jiratimereport.get_work_logs("https://jira_url", "user_name", "api_token",
+                                                             "2020-01-10", "2020-01-20", "", issues, workers=2)
+
+        work_logs_expected_result = [WorkLog("MYB-5", datetime(2020, 1, 18), 3600, "John Doe"),
+                                     WorkLog("MYB-5", datetime(2020, 1, 18), 5400, "John Doe"),
+                                     WorkLog("MYB-4", datetime(2020, 1, 12), 3600, "John Doe")]
+
+        self.assertListEqual(work_logs_expected_result, work_logs, "Work Log lists are unequal")
+
     def test_get_work_logs_multiple_pages(self):
         """
         Test the multiple pages response when retrieving Jira work logs (pagination)
@@ -156,6 +556,359 @@ class MyTestCase(unittest.TestCase):
 
         self.assertListEqual(issues_expected_result, issues, "Issue lists are unequal")
 
+    def test_jira_client_shared(self):
+        """
+        Test that one client with gzip accepting headers is used for retrieving both the issues and the work logs
+        """
+        with open("issues_one_page.json", "r") as issues_file:
+            mock_response_issues = issues_file.read()
+
+        with open("work_logs_first_issue_one_page.json", "r") as first_issue_file:
+            mock_response_first_issue = first_issue_file.read()
+
+        with open("work_logs_second_issue_one_page.json", "r") as second_issue_file:
+            mock_response_second_issue = second_issue_file.read()
+
+        client = JiraClient("https://jira_url", "user_name", "api_token")
+
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', '/rest/api/2/search', text=mock_response_issues)
+            m.register_uri('GET', '/rest/api/2/issue/MYB-5/worklog/', text=mock_response_first_issue)
+            m.register_uri('GET', '/rest/api/2/issue/MYB-4/worklog/', text=mock_response_second_issue)
+            issues = jiratimereport.get_updated_issues(None, None, None, "MYB", "2020-01-10", "2020-01-20", None,
+                                                       client)
+            work_logs, issues = jiratimereport.get_work_logs(None, None, None, "2020-01-10", "2020-01-20", None,
+                                                             issues, client=client)
+
+        self.assertEqual(3, m.call_count)
+        self.assertEqual(3, len(work_logs))
+        for request in m.request_history:
+            self.assertIn("gzip", request.headers['Accept-Encoding'])
+            self.assertTrue(request.headers['Authorization'].startswith("Basic "))
+        self.assertDictEqual({'opened': 0, 'reused': 0}, client.connection_statistics())
+        response_bytes = len((mock_response_issues + mock_response_first_issue + mock_response_second_issue).encode())
+        self.assertEqual(response_bytes, client.request_statistics()['bytes_decoded'])
+
+    def test_jira_client_bytes_received(self):
+        """
+        Test that the bytes received are counted on the wire for compressed responses sent in chunks
+        """
+        fake_jira = FakeJira(projects=1, issues=5, work_logs=10, compress=True)
+        url = fake_jira.start()
+        try:
+            client = JiraClient(url, "user_name", "api_token")
+            issues = jiratimereport.get_updated_issues(None, None, None, "P0", DEFAULT_FROM_DATE, DEFAULT_TO_DATE,
+                                                       None, client)
+            jiratimereport.get_work_logs(None, None, None, DEFAULT_FROM_DATE, DEFAULT_TO_DATE, None, issues,
+                                         client=client)
+            client.close()
+
+            async_client = AsyncJiraClient(url, "user_name", "api_token")
+            asyncio.run(asyncjiratimereport.retrieve(async_client, "P0", DEFAULT_FROM_DATE, DEFAULT_TO_DATE))
+        finally:
+            fake_jira.close()
+
+        for statistics in (client.request_statistics(), async_client.request_statistics()):
+            self.assertEqual(6, statistics['requests'])
+            self.assertGreater(statistics['bytes_received'], 0)
+            self.assertLess(statistics['bytes_received'], statistics['bytes_decoded'] / 2)
+        self.assertEqual(client.request_statistics()['bytes_received'],
+                         async_client.request_statistics()['bytes_received'])
+
+    def test_jira_client_truncated_response(self):
+        """
+        Test that a response which is cut off while its body is received raises an exception of requests
+        """
+        class TruncatingHandler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                self.wfile.write(b'40\r\n{"issues": [')
+                self.close_connection = True
+
+            def log_message(self, format, *args):
+                pass
+
+        server = http.server.HTTPServer(("localhost", 0), TruncatingHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        client = JiraClient("http://localhost:%d" % server.server_address[1], "user_name", "api_token")
+        try:
+            self.assertRaises(requests.exceptions.ChunkedEncodingError, client.get, "/rest/api/2/search", {})
+        finally:
+            client.close()
+            server.shutdown()
+            server.server_close()
+
+    def test_jira_client_retry(self):
+        """
+        Test that throttled requests are retried after the time requested by Jira and fail when retries are exhausted
+        """
+        with open("issues_one_page.json", "r") as issues_file:
+            mock_response = issues_file.read()
+
+        client = JiraClient("https://jira_url", "user_name", "api_token", max_retries=2)
+
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', '/rest/api/2/search', [{'status_code': 429, 'headers': {'Retry-After': '0'}},
+                                                         {'status_code': 503, 'headers': {'Retry-After': '0'}},
+                                                         {'text': mock_response}])
+            issues = jiratimereport.get_updated_issues(None, None, None, "MYB", "2020-01-10", "2020-01-20", None,
+                                                       client)
+
+        self.assertEqual(2, len(issues))
+        self.assertEqual(3, client.request_statistics()['requests'])
+        self.assertEqual(2, client.request_statistics()['retries'])
+
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', '/rest/api/2/search', status_code=429, headers={'Retry-After': '0'})
+            with self.assertRaises(requests.HTTPError):
+                jiratimereport.get_updated_issues(None, None, None, "MYB", "2020-01-10", "2020-01-20", None, client)
+
+        self.assertEqual(3, m.call_count)
+
+    def test_profile(self):
+        """
+        Test that the requests are recorded per endpoint and the phases are timed and traced
+        """
+        with open("issues_one_page.json", "r") as issues_file:
+            mock_response_issues = issues_file.read()
+
+        with open("work_logs_first_issue_one_page.json", "r") as first_issue_file:
+            mock_response_first_issue = first_issue_file.read()
+
+        with open("work_logs_second_issue_one_page.json", "r") as second_issue_file:
+            mock_response_second_issue = second_issue_file.read()
+
+        profiler = Profiler()
+        client = JiraClient("https://jira_url", "user_name", "api_token", profiler=profiler)
+
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', '/rest/api/2/search', [{'status_code': 429, 'headers': {'Retry-After': '0'}},
+                                                         {'text': mock_response_issues,
+                                                          'headers': {'X-ANODEID': "node1"}}])
+            m.register_uri('GET', '/rest/api/2/issue/MYB-5/worklog/', text=mock_response_first_issue)
+            m.register_uri('GET', '/rest/api/2/issue/MYB-4/worklog/', text=mock_response_second_issue)
+            with profiler.phase("search"):
+                issues = jiratimereport.get_updated_issues(None, None, None, "MYB", "2020-01-10", "2020-01-20", None,
+                                                           client)
+            work_logs = profiler.iterate("work logs", jiratimereport.iter_work_logs(None, None, None, "2020-01-10",
+                                                                                    "2020-01-20", None, issues,
+                                                                                    client=client))
+            with profiler.phase("output"):
+                jiratimereport.process_work_logs("csv", issues, work_logs, profiler=profiler)
+
+        summary = profiler.to_dict()
+        self.assertEqual(["GET /rest/api/2/issue/{key}/worklog/", "GET /rest/api/2/search"],
+                         list(summary['endpoints']))
+        search = summary['endpoints']["GET /rest/api/2/search"]
+        self.assertEqual(2, search['requests'])
+        self.assertEqual(1, search['retries'])
+        self.assertDictEqual({'200': 1, '429': 1}, search['status_codes'])
+        self.assertEqual(2, sum(search['latency']['histogram'].values()))
+        self.assertEqual(2, summary['endpoints']["GET /rest/api/2/issue/{key}/worklog/"]['requests'])
+        self.assertEqual(["node1"], list(summary['nodes']))
+        self.assertEqual(3, summary['phases']['decode']['calls'])
+        self.assertEqual(3, summary['phases']['work logs']['calls'])
+        self.assertEqual(3, summary['phases']['sort']['calls'])
+        output = summary['phases']['output']
+        self.assertLessEqual(output['self_wall'], output['wall'] - summary['phases']['sort']['wall'] + 1e-6)
+
+        with tempfile.TemporaryDirectory() as trace_dir:
+            trace_file_name = trace_dir + "/trace.json"
+            profiler.write_chrome_trace(trace_file_name)
+            with open(trace_file_name, "r") as trace_file:
+                trace_events = json.load(trace_file)['traceEvents']
+        self.assertEqual(4, len([event for event in trace_events if event['cat'] == "request"]))
+        self.assertIn("search", [event['name'] for event in trace_events if event['cat'] == "phase"])
+        self.assertTrue(all(event['ph'] == "X" and event['dur'] >= 0 for event in trace_events))
+
+    def test_get_work_logs_cached(self):
+        """
+        Test that the work logs of issues which have not been updated are taken from the cache
+        """
+        with open("work_logs_first_issue_one_page.json", "r") as first_issue_file:
+            mock_response_first_issue = first_issue_file.read()
+
+        with open("work_logs_second_issue_one_page.json", "r") as second_issue_file:
+            mock_response_second_issue = second_issue_file.read()
+
+        def create_issues(updated_myb_4):
+            return [Issue(10005, "MYB-5", "Summary of issue MYB-5", "MYB-3", "Summary of the parent issue of MYB-5", 3600, 900, datetime(2020, 1, 20), "2020-01-20T09:35:05.096+0100"),
+                    Issue(10004, "MYB-4", "Summary of issue MYB-4", "MYB-3", "Summary of the parent issue of MYB-4", 7200, 600, None, updated_myb_4)]
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = WorkLogCache(cache_dir, "https://jira_url")
+
+            with requests_mock.Mocker() as m:
+                m.register_uri('GET', '/rest/api/2/issue/MYB-5/worklog/', text=mock_response_first_issue)
+                m.register_uri('GET', '/rest/api/2/issue/MYB-4/worklog/', text=mock_response_second_issue)
+                work_logs, issues = jiratimereport.get_work_logs("https://jira_url", "user_name", "api_token",
+                                                                 "2020-01-10", "2020-01-20", "",
+                                                                 create_issues("2020-01-12T10:00:00.000+0100"),
+                                                                 cache=cache)
+                cached_work_logs, cached_issues = jiratimereport.get_work_logs("https://jira_url", "user_name",
+                                                                               "api_token", "2020-01-10", "2020-01-20",
+                                                                               "", create_issues("2020-01-12T10:00:00.000+0100"),
+                                                                               cache=cache)
+                self.assertEqual(2, m.call_count)
+
+                jiratimereport.get_work_logs("https://jira_url", "user_name", "api_token", "2020-01-10", "2020-01-20",
+                                             "", create_issues("2020-01-19T10:00:00.000+0100"), cache=cache)
+                self.assertEqual(3, m.call_count)
+                self.assertIn('MYB-4', m.last_request.url)
+
+            cache.close()
+
+        self.assertListEqual(work_logs, cached_work_logs, "Work Log lists are unequal")
+        self.assertListEqual(issues, cached_issues, "Issue lists are unequal")
+        self.assertDictEqual({'hits': 3, 'misses': 2, 'stale': 1, 'expired': 0}, cache.statistics())
+
+    def test_get_work_logs_bulk(self):
+        """
+        Test that the bulk work log API results in the same work logs as retrieving the work logs per issue
+        """
+        with open("work_logs_multiple_first_page.json", "r") as issues_first_file:
+            mock_response_first_page = issues_first_file.read()
+
+        with open("work_logs_multiple_second_page.json", "r") as issues_second_file:
+            mock_response_second_page = issues_second_file.read()
+
+        with open("work_logs_second_issue_one_page.json", "r") as second_issue_file:
+            mock_response_second_issue = second_issue_file.read()
+
+        def create_issues():
+            return [Issue(10005, "MYB-5", "Summary of issue MYB-5", "MYB-3", "Summary of the parent issue of MYB-5", 3600, 900, datetime(2020, 1, 20)),
+                    Issue(10004, "MYB-4", "Summary of issue MYB-4", "MYB-3", "Summary of the parent issue of MYB-4", 7200, 600, None)]
+
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', '/rest/api/2/issue/MYB-5/worklog/', [{'text': mock_response_first_page},
+                                                                       {'text': mock_response_second_page}])
+            m.register_uri('GET', '/rest/api/2/issue/MYB-4/worklog/', text=mock_response_second_issue)
+            work_logs, issues = jiratimereport.get_work_logs("https://jira_url", "user_name", "api_token",
+                                                             "2020-01-10", "2020-01-20", "", create_issues())
+
+        # The bulk API returns the work logs of all issues unordered, including work logs of other issues
+        work_logs_json = (json.loads(mock_response_second_issue)['worklogs'] +
+                          json.loads(mock_response_second_page)['worklogs'] +
+                          json.loads(mock_response_first_page)['worklogs'])
+        other_issue_work_log_json = dict(work_logs_json[0], id="10009", issueId="10009")
+        work_logs_json.append(other_issue_work_log_json)
+        updated_first_page = {'values': [{'worklogId': int(work_log_json['id'])} for work_log_json in work_logs_json[0:2]],
+                              'since': 1578610800000, 'until': 1579339407142, 'lastPage': False}
+        updated_second_page = {'values': [{'worklogId': int(work_log_json['id'])} for work_log_json in work_logs_json[2:]],
+                               'since': 1579339407142, 'until': 1579339407142, 'lastPage': True}
+
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', '/rest/api/2/worklog/updated', [{'json': updated_first_page},
+                                                                  {'json': updated_second_page}])
+            m.register_uri('POST', '/rest/api/2/worklog/list', json=work_logs_json)
+            bulk_work_logs, bulk_issues = jiratimereport.get_work_logs_bulk("https://jira_url", "user_name",
+                                                                            "api_token", "2020-01-10", "2020-01-20",
+                                                                            "", create_issues())
+
+        self.assertEqual(3, m.call_count)
+        self.assertEqual("1579339407142", m.request_history[1].qs['since'][0])
+        self.assertListEqual([10000, 10002, 10003, 10001, 10009], m.last_request.json()['ids'])
+        self.assertListEqual(work_logs, bulk_work_logs, "Work Log lists are unequal")
+        self.assertListEqual(issues, bulk_issues, "Issue lists are unequal")
+
+    def test_report_server_refresh(self):
+        """
+        Test that the refresh of the requested reports continues after a report which fails unexpectedly
+        """
+        report_server = ReportServer("https://jira_url", "user_name", "api_token")
+        report_server.requested = {("ABC", "2020-01-10", None, (), (), ()): time.time(),
+                                   ("MYB", "2020-01-10", None, (), (), ()): time.time()}
+        refreshed = []
+
+        def fetch(project, from_date, to_date, jql=None, authors=None, groups=None, requested=True):
+            refreshed.append(project)
+            if project == "ABC":
+                raise RuntimeError("conversion failed")
+            return [], []
+
+        with unittest.mock.patch.object(report_server, 'fetch', side_effect=fetch), \
+                contextlib.redirect_stderr(io.StringIO()) as stderr:
+            report_server.refresh()
+        report_server.close()
+
+        self.assertListEqual(["ABC", "MYB"], refreshed)
+        self.assertIn("Refreshing the report of ABC from 2020-01-10 failed", stderr.getvalue())
+        self.assertIn("RuntimeError: conversion failed", stderr.getvalue())
+
+    def test_report_server(self):
+        """
+        Test that the report server serves reports over HTTP and retrieves identical concurrent reports once
+        """
+        with open("issues_one_page.json", "r") as issues_file:
+            issues_json = json.load(issues_file)
+        # The work logs of issues with an updated timestamp are cached
+        for issue_json in issues_json['issues']:
+            issue_json['fields']['updated'] = "2020-01-20T09:35:05.096+0100"
+        mock_response_issues = json.dumps(issues_json)
+
+        with open("work_logs_first_issue_one_page.json", "r") as first_issue_file:
+            mock_response_first_issue = first_issue_file.read()
+
+        with open("work_logs_second_issue_one_page.json", "r") as second_issue_file:
+            mock_response_second_issue = second_issue_file.read()
+
+        search_started = threading.Event()
+        search_released = threading.Event()
+
+        def search(request, context):
+            search_started.set()
+            search_released.wait(10)
+            return mock_response_issues
+
+        report_server = ReportServer("https://jira_url", "user_name", "api_token")
+        http_server = create_http_server(report_server, port=0)
+        threading.Thread(target=http_server.serve_forever, daemon=True).start()
+        report_url = "http://%s:%d/report?project=MYB&from_date=2020-01-10&to_date=2020-01-20" % \
+                     http_server.server_address[:2]
+
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', '/rest/api/2/search', text=search)
+            m.register_uri('GET', '/rest/api/2/issue/MYB-5/worklog/', text=mock_response_first_issue)
+            m.register_uri('GET', '/rest/api/2/issue/MYB-4/worklog/', text=mock_response_second_issue)
+
+            reports = []
+            requesting = threading.Thread(target=lambda: reports.append(urllib.request.urlopen(report_url).read()))
+            requesting.start()
+            search_started.wait(10)
+            coalesced = threading.Thread(target=report_server.fetch, args=("MYB", "2020-01-10", "2020-01-20"))
+            coalesced.start()
+            while report_server.statistics()['reports']['coalesced'] == 0:
+                time.sleep(0.01)
+            search_released.set()
+            requesting.join()
+            coalesced.join()
+            self.assertEqual(3, m.call_count)
+
+            with urllib.request.urlopen(report_url + "&output=csv") as response:
+                self.assertEqual("text/csv; charset=utf-8", response.headers['Content-Type'])
+                self.assertEqual(4, len(response.read().splitlines()))
+            self.assertEqual(4, m.call_count)
+
+            with unittest.mock.patch.object(report_server, 'render', side_effect=RuntimeError("render failed")), \
+                    contextlib.redirect_stderr(io.StringIO()) as stderr, \
+                    self.assertRaises(urllib.error.HTTPError) as error_context:
+                urllib.request.urlopen(report_url + "&output=jsonl")
+            self.assertEqual(500, error_context.exception.code)
+            self.assertIn("RuntimeError: render failed", stderr.getvalue())
+
+        http_server.shutdown()
+        http_server.server_close()
+        report_server.close()
+
+        self.assertTrue(reports[0].decode('utf-8').startswith("\nThe Jira time report\n"))
+        self.assertEqual(6, len(reports[0].splitlines()))
+        self.assertDictEqual({'fetches': 3, 'coalesced': 1}, report_server.statistics()['reports'])
+        self.assertDictEqual({'hits': 4, 'misses': 2, 'stale': 0, 'expired': 0},
+                             report_server.statistics()['cache'])
+
     def test_output(self):
         """
         Test the different outputs including UTF-16 characters and issue without parent issue
@@ -186,6 +939,373 @@ class MyTestCase(unittest.TestCase):
         actual_excel = pd.read_excel('jira-time-report.xlsx')
         self.assertTrue(expected_excel.equals(actual_excel))
 
+    def test_output_sorted_on_disk(self):
+        """
+        Test the output when the work logs do not fit in the sort buffer and are sorted on disk
+        """
+        work_logs = [WorkLog("MYB-7", datetime(2020, 1, 20), 3600, "René Doe"),
+                     WorkLog("MYB-5", datetime(2020, 1, 18), 3600, "John Doe"),
+                     WorkLog("MYB-5", datetime(2020, 1, 18), 5400, "John Doe"),
+                     WorkLog("MYB-5", datetime(2020, 1, 12), 3600, "John Doe")]
+
+        issue_myb_5 = Issue(10005, "MYB-5", "Summary of issue MYB-5", "MYB-3", "Summary of the parent issue of MYB-5", 3600, 900, datetime(2020, 1, 15))
+        issue_myb_5.issue_start_date = datetime(2020, 1, 10)
+        issue_myb_7 = Issue(10007, "MYB-7", "Summary of issue MYB-7", None, None, None, None, None)
+
+        jiratimereport.process_work_logs("csv", [issue_myb_5, issue_myb_7], iter(work_logs), sort_buffer_size=1)
+        self.assertTrue(filecmp.cmp('csv_output.csv', 'jira-time-report.csv'))
+
+        items = [(random.randrange(100), i) for i in range(10000)]
+        self.assertListEqual(sorted(items, key=lambda item: item[0]),
+                             list(external_sort(items, lambda item: item[0], 999)))
+
+    def test_output_streaming_excel(self):
+        """
+        Test the Excel output written row by row, which contains the same data but with real date cells
+        """
+        work_logs = [WorkLog("MYB-7", datetime(2020, 1, 20), 3600, "René Doe"),
+                     WorkLog("MYB-5", datetime(2020, 1, 18), 3600, "John Doe"),
+                     WorkLog("MYB-5", datetime(2020, 1, 18), 5400, "John Doe"),
+                     WorkLog("MYB-5", datetime(2020, 1, 12), 3600, "John Doe")]
+
+        issue_myb_5 = Issue(10005, "MYB-5", "Summary of issue MYB-5", "MYB-3", "Summary of the parent issue of MYB-5", 3600, 900, datetime(2020, 1, 15))
+        issue_myb_5.issue_start_date = datetime(2020, 1, 10)
+        issue_myb_7 = Issue(10007, "MYB-7", "Summary of issue MYB-7", None, None, None, None, None)
+
+        jiratimereport.process_work_logs("excel", [issue_myb_5, issue_myb_7], work_logs, streaming_excel=True)
+        expected_excel = pd.read_excel('excel_output.xlsx')
+        for date_column in ['date', 'issue_start_date', 'issue_end_date']:
+            expected_excel[date_column] = pd.to_datetime(expected_excel[date_column])
+        actual_excel = pd.read_excel('jira-time-report.xlsx')
+        pd.testing.assert_frame_equal(expected_excel, actual_excel, check_dtype=False)
+
+    def test_output_jsonl_and_parquet(self):
+        """
+        Test the JSON Lines and Parquet outputs, which contain typed time and date fields
+        """
+        work_logs = [WorkLog("MYB-7", datetime(2020, 1, 20), 3600, "René Doe"),
+                     WorkLog("MYB-5", datetime(2020, 1, 18), 3600, "John Doe"),
+                     WorkLog("MYB-5", datetime(2020, 1, 18), 5400, "John Doe"),
+                     WorkLog("MYB-5", datetime(2020, 1, 12), 3600, "John Doe")]
+
+        issue_myb_5 = Issue(10005, "MYB-5", "Summary of issue MYB-5", "MYB-3", "Summary of the parent issue of MYB-5", 3600, 900, datetime(2020, 1, 15))
+        issue_myb_5.issue_start_date = datetime(2020, 1, 10)
+        issue_myb_7 = Issue(10007, "MYB-7", "Summary of issue MYB-7", None, None, None, None, None)
+
+        with tempfile.TemporaryDirectory() as output_dir:
+            jiratimereport.process_work_logs("jsonl", [issue_myb_5, issue_myb_7], work_logs,
+                                             output_file=output_dir + "/report.jsonl")
+            self.assertTrue(filecmp.cmp('jsonl_output.jsonl', output_dir + "/report.jsonl"))
+
+            if not jiratimereport.has_pyarrow():
+                self.skipTest("pyarrow is not installed")
+
+            jiratimereport.process_work_logs("parquet", [issue_myb_5, issue_myb_7], work_logs,
+                                             output_file=output_dir + "/report.parquet")
+            table = jiratimereport.import_pyarrow().parquet.read_table(output_dir + "/report.parquet")
+        self.assertTrue(table.schema.equals(jiratimereport.create_parquet_schema()))
+
+        with open('jsonl_output.jsonl', 'r', encoding='utf-8') as jsonl_file:
+            expected_rows = [json.loads(line) for line in jsonl_file]
+        for expected_row in expected_rows:
+            for date_field in ['date', 'issue_start_date', 'issue_end_date']:
+                if expected_row[date_field] is not None:
+                    expected_row[date_field] = date.fromisoformat(expected_row[date_field])
+        self.assertListEqual(expected_rows, table.to_pylist())
+
+    def test_output_aggregation(self):
+        """
+        Test the aggregation of work logs per author, parent and week
+        """
+        work_logs = [WorkLog("MYB-7", datetime(2020, 1, 20), 3600, "René Doe"),
+                     WorkLog("MYB-5", datetime(2020, 1, 18), 3600, "John Doe"),
+                     WorkLog("MYB-5", datetime(2020, 1, 18), 5400, "John Doe"),
+                     WorkLog("MYB-6", datetime(2020, 1, 12), 3600, "John Doe"),
+                     WorkLog("MYB-5", datetime(2020, 1, 12), 3600, "John Doe")]
+
+        issue_myb_5 = Issue(10005, "MYB-5", "Summary of issue MYB-5", "MYB-3", "Summary of the parent issue of MYB-5", 3600, 900, datetime(2020, 1, 15))
+        issue_myb_6 = Issue(10006, "MYB-6", "Summary of issue MYB-6", "MYB-3", "Summary of the parent issue of MYB-6", 1800, 600, None)
+        issue_myb_7 = Issue(10007, "MYB-7", "Summary of issue MYB-7", None, None, None, None, None)
+
+        jiratimereport.process_work_logs("csv", [issue_myb_5, issue_myb_6, issue_myb_7], work_logs,
+                                         group_by=["author", "parent", "week"])
+
+        with open('jira-time-report.csv', 'r') as csv_file:
+            self.assertListEqual(['"author","parent","week","time_spent","original_estimate","total_time_spent"',
+                                  '"John Doe","MYB-3","2020-W02","7200","5400","1500"',
+                                  '"John Doe","MYB-3","2020-W03","9000","3600","900"',
+                                  '"René Doe","","2020-W04","3600","",""'],
+                                 csv_file.read().splitlines())
+
+    def test_output_console_table(self):
+        """
+        Test the console output as an aligned table, the time columns are aligned to the right
+        """
+        work_logs = [WorkLog("MYB-7", datetime(2020, 1, 20), 3600, "René Doe"),
+                     WorkLog("MYB-5", datetime(2020, 1, 18), 360000, "John Doe")]
+
+        issue_myb_5 = Issue(10005, "MYB-5", "Summary of issue MYB-5", "MYB-3", "Summary of the parent issue of MYB-5", 3600, 900, datetime(2020, 1, 15))
+        issue_myb_5.issue_start_date = datetime(2020, 1, 10)
+        issue_myb_7 = Issue(10007, "MYB-7", "Summary of issue MYB-7", None, None, None, None, None)
+
+        console = io.StringIO()
+        jiratimereport.process_work_logs("console", [issue_myb_5, issue_myb_7], work_logs, output_file=console,
+                                         console_table=True)
+        lines = console.getvalue().splitlines()
+        self.assertListEqual(["", "The Jira time report", "===================="], lines[:3])
+        self.assertTrue(lines[3].startswith("author    date        issue  time_spent  original_estimate"))
+        self.assertTrue(lines[4].startswith("--------  ----------  -----  ----------  -----------------"))
+        self.assertTrue(lines[5].startswith("John Doe  2020-01-18  MYB-5   100:00:00            1:00:00"))
+        self.assertTrue(lines[6].startswith("René Doe  2020-01-20  MYB-7     1:00:00"))
+        self.assertEqual(lines[3].index("summary"), lines[6].index("Summary of issue MYB-7"))
+        self.assertEqual(lines[3].index("summary"), lines[5].index("Summary of issue MYB-5"))
+        self.assertEqual(lines[3].index("parent "), lines[5].index("MYB-3"))
+        self.assertEqual(lines[3].index("parent_summary"), lines[5].index("Summary of the parent issue of MYB-5"))
+        self.assertTrue(lines[4].endswith("  " + "-" * len("Summary of the parent issue of MYB-5")))
+        self.assertTrue(all(line == line.rstrip() for line in lines))
+
+        console = io.StringIO()
+        jiratimereport.process_work_logs("console", [issue_myb_5, issue_myb_7], work_logs, group_by=["author"],
+                                         output_file=console, console_table=True)
+        self.assertListEqual(["author    time_spent  original_estimate  total_time_spent",
+                              "--------  ----------  -----------------  ----------------",
+                              "John Doe   100:00:00            1:00:00           0:15:00",
+                              "René Doe     1:00:00"],
+                             console.getvalue().splitlines()[3:])
+
+    def test_output_scales_linearly(self):
+        """
+        Test that the outputs look up the issue of a work log by its key instead of scanning the issues, the output time
+        is benchmarked by benchmark.output
+        """
+        issues = [Issue(i, "MYB-" + str(i), "Summary of issue MYB-" + str(i), None, None, 3600, 900, None)
+                  for i in range(100)]
+        work_logs = [WorkLog("MYB-" + str(i % 100), datetime(2020, 1, 1 + i % 28), 3600, "John Doe")
+                     for i in range(400)]
+
+        csv_issue_index = CountingIssueIndex((issue.key, issue) for issue in issues)
+        jiratimereport.output_to_csv(csv_issue_index, work_logs)
+        console_issue_index = CountingIssueIndex((issue.key, issue) for issue in issues)
+        jiratimereport.output_to_console(console_issue_index, work_logs, io.StringIO())
+
+        self.assertEqual((400, 0), (csv_issue_index.lookups, csv_issue_index.scans))
+        # The console formats the columns of an issue once
+        self.assertEqual((100, 0), (console_issue_index.lookups, console_issue_index.scans))
+
+    def test_benchmark_end_to_end(self):
+        """
+        Test the end to end benchmark against a throttling fake Jira with both engines and every output
+        """
+        fake_jira = FakeJira(projects=2, issues=15, work_logs=3, page_size=10, work_log_page_size=2,
+                             throttle_rate=0.2, nodes=2)
+        url = fake_jira.start()
+        try:
+            results = endtoend.run(url, "P0,P1", list(endtoend.OUTPUTS), workers=4)
+            bulk_results = endtoend.run(url, "P0", ["csv"], engine="bulk")
+        finally:
+            fake_jira.close()
+
+        self.assertEqual(30, results['issues'])
+        self.assertEqual(90, results['work_logs'])
+        # The 4 pages of issues overlap by one issue, every issue takes 2 pages of work logs
+        self.assertEqual(results['requests'] - results['retries'], 4 + 2 * 30)
+        self.assertListEqual(list(endtoend.OUTPUTS), list(results['outputs']))
+        self.assertTrue(all(output['bytes'] > 0 for output in results['outputs'].values()))
+        self.assertEqual(15, bulk_results['issues'])
+        self.assertEqual(45, bulk_results['work_logs'])
+
+    def test_get_work_logs_sharded(self):
+        """
+        Test the retrieval per week in parallel processes, which must give the same report as a single retrieval
+        """
+        self.assertListEqual([("2020-01-30", "2020-01-31"), ("2020-02-01", "2020-02-29"), ("2020-03-01", "2020-03-02")],
+                             split_date_range("2020-01-30", "2020-03-02", "month"))
+        self.assertListEqual([("2020-01-30", "2020-02-02"), ("2020-02-03", "2020-02-09"), ("2020-02-10", "2020-02-10")],
+                             split_date_range("2020-01-30", "2020-02-10", "week"))
+
+        fake_jira = FakeJira(projects=1, issues=12, work_logs=8, page_size=5, work_log_page_size=3,
+                             from_date="2020-01-01", to_date="2020-03-31")
+        url = fake_jira.start()
+        try:
+            client = JiraClient(url, "user_name", "api_token")
+            issues = jiratimereport.get_updated_issues(None, None, None, "P0", "2020-01-15", "2020-03-10", None,
+                                                       client)
+            work_logs, issues = jiratimereport.get_work_logs(None, None, None, "2020-01-15", "2020-03-10", None,
+                                                             issues, client=client)
+            client.close()
+            sharded_client = JiraClient(url, "user_name", "api_token")
+            sharded_work_logs, sharded_issues = jiratimereport.get_work_logs_sharded(
+                url, "user_name", "api_token", "P0", "2020-01-15", "2020-03-10", None, "week", processes=3,
+                workers=2, client=sharded_client)
+        finally:
+            fake_jira.close()
+
+        self.assertListEqual(sorted(issues, key=attrgetter('key')), sorted(sharded_issues, key=attrgetter('key')))
+        # The work logs of an issue are retrieved once, only the searches of the shards add requests
+        shards = split_date_range("2020-01-15", "2020-03-10", "week")
+        self.assertLessEqual(sharded_client.request_statistics()['requests'],
+                             client.request_statistics()['requests'] - 3 + 3 * len(shards))
+        with tempfile.TemporaryDirectory() as output_dir:
+            jiratimereport.process_work_logs("csv", issues, work_logs, output_file=output_dir + "/report.csv")
+            jiratimereport.process_work_logs("csv", sharded_issues, sharded_work_logs, presorted=True,
+                                             output_file=output_dir + "/sharded.csv")
+            self.assertTrue(filecmp.cmp(output_dir + "/report.csv", output_dir + "/sharded.csv", shallow=False))
+            with open(output_dir + "/report.csv", 'r') as csv_file:
+                self.assertEqual(len(work_logs) + 1, len(csv_file.read().splitlines()))
+
+    def test_get_work_logs_sharded_cached(self):
+        """
+        Test that the processes of a sharded retrieval share the cache directory without locking each other out
+        """
+        fake_jira = FakeJira(projects=1, issues=12, work_logs=8, page_size=5, work_log_page_size=3,
+                             from_date="2020-01-01", to_date="2020-03-31")
+        url = fake_jira.start()
+        with tempfile.TemporaryDirectory() as cache_dir:
+            try:
+                cache = WorkLogCache(cache_dir, url)
+                work_logs, issues = jiratimereport.get_work_logs_sharded(
+                    url, "user_name", "api_token", "P0", "2020-01-15", "2020-03-10", None, "week", processes=3,
+                    workers=2, cache=cache)
+                cached_work_logs, cached_issues = jiratimereport.get_work_logs_sharded(
+                    url, "user_name", "api_token", "P0", "2020-01-15", "2020-03-10", None, "week", processes=3,
+                    workers=2, cache=cache)
+                cache.close()
+            finally:
+                fake_jira.close()
+
+        self.assertListEqual(list(work_logs), list(cached_work_logs))
+        self.assertEqual(len(issues), cache.statistics()['misses'])
+        self.assertEqual(len(cached_issues), cache.statistics()['hits'])
+
+        # Every issue stored by a process is committed, the other processes do not wait for it
+        with tempfile.TemporaryDirectory() as cache_dir:
+            issue = Issue(10005, "MYB-5", "Summary of issue MYB-5", None, None, 3600, 900, None,
+                          "2020-01-20T09:35:05.096+0100")
+            process_cache = WorkLogCache(cache_dir, "https://jira_url", commit_interval=1)
+            other_process_cache = WorkLogCache(cache_dir, "https://jira_url")
+            process_cache.put(issue, [WorkLog("MYB-5", datetime(2020, 1, 20), 3600, "John Doe", "john")])
+            self.assertEqual(1, len(other_process_cache.get(issue)))
+            other_process_cache.close()
+            process_cache.close()
+
+    def test_main_rejects_processes_below_one(self):
+        """
+        Test that a number of processes below one is reported as a usage error instead of failing in the process pool
+        """
+        with unittest.mock.patch.object(sys, 'argv', ["jiratimereport.py", "https://jira_url", "user_name", "api_token",
+                                                      "MYB", "2020-01-10", "--shard_by", "month", "--processes", "0"]), \
+                contextlib.redirect_stderr(io.StringIO()) as stderr, self.assertRaises(SystemExit) as exit_context:
+            jiratimereport.main()
+        self.assertEqual(2, exit_context.exception.code)
+        self.assertIn("--processes must be at least 1", stderr.getvalue())
+
+    def test_checkpoint_resume(self):
+        """
+        Test resuming a run which died from its checkpoint, which must give the same report as a run which did not die
+        """
+        class DyingJiraClient(JiraClient):
+            def __init__(self, url, requests_to_die_after):
+                super().__init__(url, "user_name", "api_token")
+                self.requests_to_die_after = requests_to_die_after
+
+            def request(self, method, url, params=None, json_body=None):
+                if self.requests >= self.requests_to_die_after:
+                    raise requests.exceptions.ConnectionError("network blip")
+                return super().request(method, url, params, json_body)
+
+        def run(client, journal=None, workers=2):
+            issues = jiratimereport.get_updated_issues(None, None, None, "P0", DEFAULT_FROM_DATE, DEFAULT_TO_DATE, None,
+                                                       client, page_size=4, journal=journal)
+            return jiratimereport.get_work_logs(None, None, None, DEFAULT_FROM_DATE, DEFAULT_TO_DATE, None, issues,
+                                                workers=workers, client=client, journal=journal)
+
+        fake_jira = FakeJira(projects=1, issues=10, work_logs=6, page_size=4, work_log_page_size=4)
+        url = fake_jira.start()
+        parameters = {'project': "P0", 'from_date': DEFAULT_FROM_DATE, 'to_date': DEFAULT_TO_DATE}
+        with tempfile.TemporaryDirectory() as output_dir:
+            journal_file_name = output_dir + "/checkpoint.jsonl"
+            try:
+                client = JiraClient(url, "user_name", "api_token")
+                work_logs, issues = run(client)
+
+                # The search takes 3 pages and every issue 2 pages of work logs, the run dies within the work logs
+                dying_client = DyingJiraClient(url, 12)
+                journal = CheckpointJournal(journal_file_name, parameters)
+                self.assertRaises(requests.exceptions.ConnectionError, run, dying_client, journal, 1)
+                journal.close()
+                with open(journal_file_name, 'a', encoding='utf-8') as journal_file:
+                    journal_file.write('{"issue":"P0-')
+
+                self.assertRaises(ValueError, CheckpointJournal, journal_file_name, dict(parameters, project="P1"),
+                                  True)
+                resumed_client = JiraClient(url, "user_name", "api_token")
+                journal = CheckpointJournal(journal_file_name, parameters, resume=True)
+                resumed_work_logs, resumed_issues = run(resumed_client, journal)
+                journal.close(remove=True)
+            finally:
+                fake_jira.close()
+
+            self.assertDictEqual({'pages': 3, 'issues': 4}, journal.statistics())
+            self.assertEqual(client.request_statistics()['requests'] - 3 - 2 * 4,
+                             resumed_client.request_statistics()['requests'])
+            self.assertFalse(os.path.exists(journal_file_name))
+            jiratimereport.process_work_logs("csv", issues, work_logs, output_file=output_dir + "/report.csv")
+            jiratimereport.process_work_logs("csv", resumed_issues, resumed_work_logs,
+                                             output_file=output_dir + "/resumed.csv")
+            self.assertTrue(filecmp.cmp(output_dir + "/report.csv", output_dir + "/resumed.csv", shallow=False))
+
+    @unittest.skipIf(httpx is None, "httpx is not installed")
+    def test_get_work_logs_async(self):
+        """
+        Test that the async client retrieves the same issues and work logs as the client from a throttling fake Jira
+        """
+        fake_jira = FakeJira(projects=2, issues=15, work_logs=3, page_size=10, work_log_page_size=2,
+                             throttle_rate=0.2)
+        url = fake_jira.start()
+        try:
+            client = JiraClient(url, "user_name", "api_token", max_retries=20, backoff_factor=0.01)
+            issues = jiratimereport.get_updated_issues(None, None, None, "P0,P1", DEFAULT_FROM_DATE,
+                                                       DEFAULT_TO_DATE, None, client)
+            work_logs, issues = jiratimereport.get_work_logs(None, None, None, DEFAULT_FROM_DATE, DEFAULT_TO_DATE,
+                                                             None, issues, client=client)
+            client.close()
+
+            async_client = AsyncJiraClient(url, "user_name", "api_token", concurrency=4, max_retries=20,
+                                           backoff_factor=0.01)
+            async_work_logs, async_issues = asyncio.run(
+                asyncjiratimereport.retrieve(async_client, "P0,P1", DEFAULT_FROM_DATE, DEFAULT_TO_DATE))
+        finally:
+            fake_jira.close()
+
+        self.assertEqual(90, len(async_work_logs))
+        self.assertListEqual(work_logs, async_work_logs, "Work Log lists are unequal")
+        self.assertListEqual(issues, async_issues, "Issue lists are unequal")
+        self.assertListEqual([issue.issue_start_date for issue in issues],
+                             [issue.issue_start_date for issue in async_issues])
+        self.assertGreater(async_client.request_statistics()['retries'], 0)
+
+    def test_decoding(self):
+        """
+        Test that every JSON backend decodes the same and that dates are parsed like datetime.strptime does
+        """
+        with open("work_logs_multiple_first_page.json", "rb") as work_logs_file:
+            mock_response = work_logs_file.read()
+
+        default_backend = decoding.json_backend
+        for backend in decoding.JSON_BACKENDS:
+            decoding.set_json_backend(backend)
+            self.assertDictEqual(json.loads(mock_response), decoding.decode_json(mock_response))
+        decoding.set_json_backend(default_backend)
+
+        with self.assertRaises(ValueError):
+            decoding.set_json_backend("unknown")
+
+        for date_time in ["2020-01-18T11:03:27.142+0100", "2020-02-29T23:59:59.999-0800", "1999-12-31"]:
+            self.assertEqual(datetime.strptime(date_time[0:10], "%Y-%m-%d"), decoding.parse_date(date_time))
+        for date_time in ["2020-13-01", "2020-01-1", "20200101T10"]:
+            with self.assertRaises(ValueError):
+                decoding.parse_date(date_time)
+
     def test_format_optional_time_field(self):
         """
         Test the formatting of the time field when the time is greater than several days
@@ -1,15 +1,41 @@
+import sys
+from datetime import datetime
+
+
 class WorkLog:
     """A WorkLog object will represent a Jira WorkLog containing the registered time on an issue by an author
+
+    Many work logs share the same issue key and author, these strings are interned so that they are stored only once.
+    The started date is stored as a proleptic Gregorian ordinal, work logs only register the date they were started.
+    The author is the display name of the author, which is not unique, the author id is the account id or user name
+    which the work logs of authors are selected by. The author id is not part of the report and not compared.
     """
-    def __init__(self, issue_key, started, time_spent, author):
-        self.issue_key = issue_key
-        self.started = started
+    __slots__ = ('issue_key', 'started_ordinal', 'time_spent', 'author', 'author_id')
+
+    def __init__(self, issue_key, started, time_spent, author, author_id=None):
+        self.issue_key = sys.intern(issue_key)
+        self.started_ordinal = started.toordinal()
         self.time_spent = time_spent
-        self.author = author
+        self.author = sys.intern(author)
+        self.author_id = sys.intern(author_id) if author_id is not None else None
+
+    def __getstate__(self):
+        # Work logs are pickled when they are sorted on disk or sent between processes, a tuple is the most compact
+        return self.issue_key, self.started_ordinal, self.time_spent, self.author, self.author_id
+
+    def __setstate__(self, state):
+        issue_key, self.started_ordinal, self.time_spent, author, author_id = state
+        self.issue_key = sys.intern(issue_key)
+        self.author = sys.intern(author)
+        self.author_id = sys.intern(author_id) if author_id is not None else None
+
+    @property
+    def started(self):
+        return datetime.fromordinal(self.started_ordinal)
 
     def __eq__(self, other):
         try:
-            return (self.issue_key, self.started, self.time_spent, self.author) == \
-                   (other.issue_key, other.started, other.time_spent, other.author)
+            return (self.issue_key, self.started_ordinal, self.time_spent, self.author) == \
+                   (other.issue_key, other.started_ordinal, other.time_spent, other.author)
         except AttributeError:
             return NotImplemented
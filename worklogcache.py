@@ -0,0 +1,197 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from decoding import decode_json, parse_date_part
+from worklog import WorkLog
+
+CACHE_FILE_NAME = "jira-time-report-cache.sqlite"
+COMMIT_INTERVAL = 100
+# The number of seconds to wait for another process which is writing to the same cache directory
+BUSY_TIMEOUT = 60
+
+
+class WorkLogCache:
+    """A WorkLogCache object will store the complete work log history of Jira issues on disk
+
+    The work logs of an issue are stored together with the updated timestamp of the issue. Adding, changing or deleting
+    a work log changes the updated timestamp of the issue, so the cached work logs remain valid for as long as the
+    updated timestamp of the issue does not change. Optionally, cached work logs expire after a time to live.
+
+    The date of the first work log of an issue is stored separately, so that it is known without the complete work log
+    history of the issue, e.g. when only the work logs between the from and to date are retrieved.
+    """
+    def __init__(self, cache_dir, jira_url, ttl=None, commit_interval=COMMIT_INTERVAL):
+        """
+        :param cache_dir: the directory to store the cache in, None for a cache which is kept in memory
+        :param jira_url: The base Jira URL, issues of different Jira servers are cached separately
+        :param ttl: the number of seconds after which cached work logs expire, None if they never expire
+        :param commit_interval: the number of stored issues to commit at once, 1 when other processes write to the
+        same cache directory, as they wait for the commit before they can store issues themselves
+        """
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            database = os.path.join(cache_dir, CACHE_FILE_NAME)
+        else:
+            database = ":memory:"
+
+        self.cache_dir = cache_dir
+        self.jira_url = jira_url
+        self.ttl = ttl
+        self.commit_interval = commit_interval
+        self.lock = threading.Lock()
+        self.uncommitted = 0
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.expired = 0
+        self.connection = sqlite3.connect(database, timeout=BUSY_TIMEOUT, check_same_thread=False)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS work_logs ("
+                                "jira_url TEXT NOT NULL, "
+                                "issue_key TEXT NOT NULL, "
+                                "updated TEXT NOT NULL, "
+                                "synced REAL NOT NULL, "
+                                "work_logs TEXT NOT NULL, "
+                                "PRIMARY KEY (jira_url, issue_key))")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS issue_start_dates ("
+                                "jira_url TEXT NOT NULL, "
+                                "issue_key TEXT NOT NULL, "
+                                "updated TEXT NOT NULL, "
+                                "synced REAL NOT NULL, "
+                                "start_date TEXT NOT NULL, "
+                                "PRIMARY KEY (jira_url, issue_key))")
+        self.connection.commit()
+
+    def get(self, issue):
+        """
+        Retrieves the cached work logs of an issue
+        :param issue: the issue to retrieve the work logs for
+        :return: the list of all work logs of the issue or None when the work logs must be retrieved from Jira
+        """
+        if issue.updated is None:
+            return None
+
+        with self.lock:
+            row = self.connection.execute("SELECT updated, synced, work_logs FROM work_logs "
+                                          "WHERE jira_url = ? AND issue_key = ?",
+                                          (self.jira_url, issue.key)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            updated, synced, work_logs_json = row
+            if updated != issue.updated:
+                self.stale += 1
+                return None
+            if self.ttl is not None and time.time() - synced > self.ttl:
+                self.expired += 1
+                return None
+
+        entries = decode_json(work_logs_json)
+        with self.lock:
+            # Work logs cached without the ids of their authors cannot be selected by author, they are retrieved again
+            if entries and len(entries[0]) < 4:
+                self.stale += 1
+                return None
+            self.hits += 1
+
+        return [WorkLog(issue.key, parse_date_part(started), time_spent, author, author_id)
+                for started, time_spent, author, author_id in entries]
+
+    def put(self, issue, work_logs):
+        """
+        Stores the work logs of an issue
+        :param issue: the issue the work logs belong to
+        :param work_logs: the list of all work logs of the issue
+        """
+        if issue.updated is None:
+            return
+
+        work_logs_json = json.dumps([(work_log.started.strftime('%Y-%m-%d'), work_log.time_spent, work_log.author,
+                                      work_log.author_id) for work_log in work_logs])
+        with self.lock:
+            self.connection.execute("INSERT OR REPLACE INTO work_logs VALUES (?, ?, ?, ?, ?)",
+                                    (self.jira_url, issue.key, issue.updated, time.time(), work_logs_json))
+            if work_logs:
+                self.connection.execute("INSERT OR REPLACE INTO issue_start_dates VALUES (?, ?, ?, ?, ?)",
+                                        (self.jira_url, issue.key, issue.updated, time.time(),
+                                         work_logs[0].started.strftime('%Y-%m-%d')))
+            self.committed()
+
+    def get_start_date(self, issue):
+        """
+        Retrieves the stored date of the first work log of an issue
+        :param issue: the issue to retrieve the date of the first work log for
+        :return: the date as a datetime or None when it must be retrieved from Jira
+        """
+        if issue.updated is None:
+            return None
+
+        with self.lock:
+            row = self.connection.execute("SELECT updated, synced, start_date FROM issue_start_dates "
+                                          "WHERE jira_url = ? AND issue_key = ?",
+                                          (self.jira_url, issue.key)).fetchone()
+        if row is None or row[0] != issue.updated or (self.ttl is not None and time.time() - row[1] > self.ttl):
+            return None
+        return parse_date_part(row[2])
+
+    def put_start_date(self, issue, start_date):
+        """
+        Stores the date of the first work log of an issue
+        :param issue: the issue the date belongs to
+        :param start_date: the date of the first work log as a datetime, None when the issue has no work logs
+        """
+        if issue.updated is None or start_date is None:
+            return
+
+        with self.lock:
+            self.connection.execute("INSERT OR REPLACE INTO issue_start_dates VALUES (?, ?, ?, ?, ?)",
+                                    (self.jira_url, issue.key, issue.updated, time.time(),
+                                     start_date.strftime('%Y-%m-%d')))
+            self.committed()
+
+    def committed(self):
+        """
+        Counts a stored issue and commits once commit_interval issues have been stored, the lock must be held
+        """
+        self.uncommitted += 1
+        if self.uncommitted >= self.commit_interval:
+            self.connection.commit()
+            self.uncommitted = 0
+
+    def invalidate(self):
+        """
+        Removes all cached work logs of the Jira server
+        """
+        with self.lock:
+            self.connection.execute("DELETE FROM work_logs WHERE jira_url = ?", (self.jira_url,))
+            self.connection.execute("DELETE FROM issue_start_dates WHERE jira_url = ?", (self.jira_url,))
+            self.connection.commit()
+
+    def statistics(self):
+        """
+        Counts the cache lookups
+        :return: a dictionary containing the number of hits, misses, stale and expired issues
+        """
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'stale': self.stale, 'expired': self.expired}
+
+    def add_statistics(self, statistics):
+        """
+        Counts the cache lookups of another cache, e.g. of the same directory in another process
+        :param statistics: the statistics of the other cache
+        """
+        with self.lock:
+            self.hits += statistics['hits']
+            self.misses += statistics['misses']
+            self.stale += statistics['stale']
+            self.expired += statistics['expired']
+
+    def close(self):
+        """
+        Commits the stored work logs and closes the cache
+        """
+        with self.lock:
+            self.connection.commit()
+            self.connection.close()